@@ -0,0 +1,98 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import archive, pipeline
+
+OUTFITS = 5000
+LOOKUPS = 20000
+SEED = 1234
+
+bbfas_json = pipeline.bbfas_json
+json_cherax = pipeline.json_cherax
+cherax_bbfas = pipeline.cherax_bbfas
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    rng = random.Random(SEED)
+    outfits = [bbfas_json.bbfas_to_outfit(make_bbfas_code(rng, "full")) for _ in range(OUTFITS)]
+    lookups = [rng.randrange(OUTFITS) for _ in range(LOOKUPS)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Today: one indented Cherax JSON file per outfit
+        files_dir = os.path.join(directory, "CHERAX")
+        os.makedirs(files_dir)
+        paths = [os.path.join(files_dir, f"cherax_outfit_male-{i}.json") for i in range(OUTFITS)]
+
+        def write_files():
+            for path, outfit in zip(paths, outfits):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(json_cherax.outfit_to_cherax(outfit), indent=2, ensure_ascii=False))
+
+        def scan_files():
+            result = []
+            for path in paths:
+                with open(path, "r", encoding="utf-8") as f:
+                    result.append(cherax_bbfas.cherax_to_outfit(json.load(f)))
+            return result
+
+        def lookup_files():
+            for index in lookups:
+                with open(paths[index], "r", encoding="utf-8") as f:
+                    cherax_bbfas.cherax_to_outfit(json.load(f))
+
+        # One archive for all of them
+        archive_path = os.path.join(directory, "outfits" + archive.EXTENSION)
+
+        def write_archive():
+            with archive.ArchiveWriter(archive_path) as writer:
+                for i, outfit in enumerate(outfits):
+                    writer.add(outfit, f"cherax_outfit_male-{i}")
+
+        def scan_archive():
+            with archive.ArchiveReader(archive_path) as reader:
+                return list(reader)
+
+        def lookup_archive():
+            with archive.ArchiveReader(archive_path) as reader:
+                for index in lookups:
+                    reader.outfit(index)
+
+        files_write, _ = timed(write_files)
+        archive_write, _ = timed(write_archive)
+        files_scan, files_outfits = timed(scan_files)
+        archive_scan, archive_outfits = timed(scan_archive)
+        files_lookup, _ = timed(lookup_files)
+        archive_lookup, _ = timed(lookup_archive)
+
+        # Cherax files lose pCI0/pCT0; everything else must match
+        for files_outfit, archive_outfit, outfit in zip(files_outfits, archive_outfits, outfits):
+            assert archive_outfit == outfit
+            assert files_outfit.values[1:12] == outfit.values[1:12]
+
+        files_size = sum(os.path.getsize(path) for path in paths)
+        archive_size = os.path.getsize(archive_path)
+
+    print(f"⏱️  ARCHIVE BENCHMARK ({OUTFITS} outfits, {LOOKUPS} random lookups)")
+    print("=" * 60)
+    print(f"{'':<18} {'JSON files':>12} {'archive':>12} {'ratio':>9}")
+    print(f"{'size (KB)':<18} {files_size / 1024:>12.0f} {archive_size / 1024:>12.0f} {files_size / archive_size:>8.1f}x")
+    print(f"{'files':<18} {OUTFITS:>12} {1:>12} {OUTFITS:>8}x")
+    for name, files_time, archive_time in (("write (ms)", files_write, archive_write),
+                                           ("full scan (ms)", files_scan, archive_scan),
+                                           ("lookups (ms)", files_lookup, archive_lookup)):
+        print(f"{name:<18} {files_time * 1e3:>12.1f} {archive_time * 1e3:>12.1f} {files_time / archive_time:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import load_converter
+
+SIZES = [1000, 2000, 4000, 8000, 16000, 32000]
+LEGACY_MAX_SIZE = 4000  # the quadratic decoder gets too slow past this
+REPEAT = 3
+
+def make_payload(pairs):
+    """Build a synthetic BBFAS code holding `pairs` key/value pairs spread over the four sections"""
+    lines = ["Item"]
+    per_section = pairs // 4
+    for marker, prefix in (("DI", "pCI"), ("DT", "pCT"), ("Pi", "pPi"), ("Pt", "pPt")):
+        lines.append(marker)
+        for i in range(per_section):
+            lines.extend([f"{prefix}{i}", str(i % 500)])
+        lines.append(f"/{marker}")
+    lines.append("/Item")
+    return base64.b64encode("\n".join(lines).encode("utf-8")).decode("utf-8")
+
+def legacy_bbfas_to_json(code):
+    """Previous decoder, kept as the reference: one lookahead scan per key"""
+    decoded_data = base64.b64decode(code).decode("utf-8").strip()
+    lines = decoded_data.split("\n")
+    result = {"Clothes": {"Drawable": {}, "Texture": {}}, "Props": {"Drawable": {}, "Texture": {}}}
+    markers = {"DI": ("Clothes", "Drawable"), "DT": ("Clothes", "Texture"),
+               "Pi": ("Props", "Drawable"), "Pt": ("Props", "Texture")}
+    current = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line in markers:
+            current = markers[line]
+            continue
+        elif line.startswith("/"):
+            current = None
+            continue
+        if current and line.startswith("p"):
+            value = next((v for v in lines[lines.index(line)+1:] if not v.startswith("p") and not v.isalpha() and not v.startswith("/")), None)
+            if value is not None:
+                result[current[0]][current[1]][line] = int(value)
+    return result
+
+def best_time(func, code):
+    """Best wall time of REPEAT runs"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    bbfas_json = load_converter("bbfas_json")
+
+    print("⏱️  BBFAS DECODER BENCHMARK")
+    print("=" * 72)
+    print(f"{'pairs':>8} {'decoder (ms)':>14} {'µs / pair':>10} {'legacy (ms)':>14} {'speedup':>9}")
+
+    for size in SIZES:
+        code = make_payload(size)
+        elapsed = best_time(bbfas_json.bbfas_to_json, code)
+        line = f"{size:>8} {elapsed * 1000:>14.2f} {elapsed * 1e6 / size:>10.3f}"
+        if size <= LEGACY_MAX_SIZE:
+            legacy = best_time(legacy_bbfas_to_json, code)
+            line += f" {legacy * 1000:>14.2f} {legacy / elapsed:>8.1f}x"
+        print(line)
+
+    print("\n💡 A constant 'µs / pair' column means the decoder scales linearly.")
+
+if __name__ == "__main__":
+    main()
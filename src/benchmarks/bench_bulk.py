@@ -0,0 +1,55 @@
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import bulk, pipeline
+
+OUTFITS = 20000
+REPEAT = 3
+SEED = 1234
+
+bbfas_json = pipeline.bbfas_json
+json_cherax = pipeline.json_cherax
+
+def best_time(func):
+    """Best wall time in seconds of func() over REPEAT runs, and its last result"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    rng = random.Random(SEED)
+    codes = [make_bbfas_code(rng, "full" if i % 4 else "minimal") for i in range(OUTFITS)]
+
+    single_decode, outfits = best_time(lambda: [bbfas_json.bbfas_to_outfit(code) for code in codes])
+    bulk_decode, (matrix, errors) = best_time(lambda: bulk.decode_bbfas_codes(codes))
+    single_encode, single_codes = best_time(lambda: [outfit.to_bbfas_code() for outfit in outfits])
+    bulk_encode, bulk_codes = best_time(lambda: bulk.encode_bbfas_codes(matrix))
+    single_cherax, single_records = best_time(lambda: [json_cherax.outfit_to_cherax(outfit) for outfit in outfits])
+    bulk_cherax, bulk_records = best_time(lambda: bulk.encode_cherax_records(matrix))
+
+    # The bulk paths must give the same outfits as the converters one by one
+    assert not errors
+    assert (matrix == bulk.matrix_from_outfits(outfits)).all()
+    assert bulk_codes == single_codes
+    assert bulk_records == single_records
+
+    print(f"⏱️  BULK BENCHMARK ({OUTFITS} outfits)")
+    print("=" * 60)
+    print(f"{'conversion':<22} {'single (ms)':>12} {'bulk (ms)':>12} {'speedup':>9}")
+    for name, single, bulk_time in (("BBFAS code -> matrix", single_decode, bulk_decode),
+                                    ("matrix -> BBFAS code", single_encode, bulk_encode),
+                                    ("matrix -> Cherax", single_cherax, bulk_cherax)):
+        print(f"{name:<22} {single * 1e3:>12.1f} {bulk_time * 1e3:>12.1f} {single / bulk_time:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import pipeline
+
+OUTFITS = 20000
+REPEAT = 3
+SEED = 1234
+
+bbfas_json = pipeline.bbfas_json
+json_cherax = pipeline.json_cherax
+
+def best_time(func):
+    """Best wall time in seconds of func() over REPEAT runs, and its last result"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    rng = random.Random(SEED)
+    outfits = [bbfas_json.bbfas_to_outfit(make_bbfas_code(rng, "full" if i % 4 else "minimal")) for i in range(OUTFITS)]
+    genders = [rng.choice(["MALE", "FEMALE"]) for _ in range(OUTFITS)]
+
+    print(f"⏱️  CHERAX TEMPLATE BENCHMARK ({OUTFITS} outfits, Outfit -> Cherax file text)")
+    print("=" * 60)
+    print(f"{'format':<12} {'dict + json (ms)':>17} {'template (ms)':>14} {'speedup':>9}")
+    for compact in (False, True):
+        dumped_time, dumped = best_time(lambda: [json_cherax.serialize_cherax_json(json_cherax.outfit_to_cherax(outfit, gender), compact)
+                                                 for outfit, gender in zip(outfits, genders)])
+        template_time, templated = best_time(lambda: [json_cherax.outfit_to_cherax_json(outfit, gender, compact)
+                                                      for outfit, gender in zip(outfits, genders)])
+        # The template must give the exact bytes of the regular writer
+        assert templated == dumped
+        name = "compact" if compact else "indent=2"
+        print(f"{name:<12} {dumped_time * 1e3:>17.1f} {template_time * 1e3:>14.1f} {dumped_time / template_time:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import pipeline
+
+OUTFITS = 20000
+REPEAT = 3
+
+json_cherax = pipeline.json_cherax
+cherax_bbfas = pipeline.cherax_bbfas
+
+FACE_FEATURES = tuple(json_cherax.json_to_cherax({"Item": {}}, "MALE")["face_features"])
+
+def legacy_json_to_cherax(data, gender="MALE"):
+    """Previous converter: two scans of the whole mapping with startswith/replace per key"""
+    models = {"MALE": 1885233650, "FEMALE": 2627665880}
+    cherax_outfit = {
+        "format": "Cherax Entity",
+        "type": 2,
+        "model": models.get(gender, models["MALE"]),
+        "baseFlags": 66871,
+        "components": {},
+        "props": {},
+        "face_features": dict.fromkeys(FACE_FEATURES, 0.0),
+        "primary_hair_tint": 255,
+        "secondary_hair_tint": 255
+    }
+    clothes_drawable = data.get("Item", {}).get("Clothes", {}).get("Drawable", {})
+    clothes_texture = data.get("Item", {}).get("Clothes", {}).get("Texture", {})
+    for bbfas_key, cherax_key in json_cherax.BBFAS_TO_CHERAX_MAPPING.items():
+        if cherax_key and bbfas_key.startswith("pCI"):
+            drawable_value = clothes_drawable.get(bbfas_key, -1)
+            texture_value = clothes_texture.get(bbfas_key.replace("pCI", "pCT"), 0)
+            if isinstance(drawable_value, dict):
+                drawable_value = drawable_value.get("ID", -1)
+            if isinstance(texture_value, dict):
+                texture_value = texture_value.get("ID", 0)
+            cherax_outfit["components"][cherax_key] = {"drawable": drawable_value, "texture": texture_value, "palette": 0}
+    props_drawable = data.get("Item", {}).get("Props", {}).get("Drawable", {})
+    props_texture = data.get("Item", {}).get("Props", {}).get("Texture", {})
+    for bbfas_key, cherax_key in json_cherax.BBFAS_TO_CHERAX_MAPPING.items():
+        if cherax_key and bbfas_key.startswith("pPi"):
+            drawable_value = props_drawable.get(bbfas_key, -1)
+            texture_value = props_texture.get(bbfas_key.replace("pPi", "pPt"), -1)
+            if isinstance(drawable_value, dict):
+                drawable_value = drawable_value.get("ID", -1)
+            if isinstance(texture_value, dict):
+                texture_value = texture_value.get("ID", -1)
+            cherax_outfit["props"][cherax_key] = {"drawable": drawable_value, "texture": texture_value}
+    if "Head" not in cherax_outfit["components"]:
+        cherax_outfit["components"]["Head"] = {"drawable": 0, "texture": 0, "palette": 0}
+    if "Hip" not in cherax_outfit["props"]:
+        cherax_outfit["props"]["Hip"] = {"drawable": -1, "texture": -1}
+    return cherax_outfit
+
+def legacy_cherax_to_bbfas(data, gender):
+    """Previous converter: four scans of the whole mapping"""
+    mapping = cherax_bbfas.CHERAX_TO_BBFAS_MAPPING
+    components = data.get("components", {})
+    props = data.get("props", {})
+    lines = ["Item", "DI", "pCI0", "-1"]
+    for cherax_key, (drawable_key, texture_key) in mapping.items():
+        if drawable_key.startswith("pCI") and cherax_key in components:
+            lines.extend([drawable_key, str(components[cherax_key].get("drawable", -1))])
+    lines += ["/DI", "DT", "pCT0", "-1"]
+    for cherax_key, (drawable_key, texture_key) in mapping.items():
+        if texture_key.startswith("pCT") and cherax_key in components:
+            lines.extend([texture_key, str(components[cherax_key].get("texture", 0))])
+    lines += ["/DT", "Pi"]
+    for cherax_key, (drawable_key, texture_key) in mapping.items():
+        if drawable_key.startswith("pPi") and cherax_key in props:
+            lines.extend([drawable_key, str(props[cherax_key].get("drawable", -1))])
+    lines += ["/Pi", "Pt"]
+    for cherax_key, (drawable_key, texture_key) in mapping.items():
+        if texture_key.startswith("pPt") and cherax_key in props:
+            lines.extend([texture_key, str(props[cherax_key].get("texture", -1))])
+    lines += ["/Pt", "/Item"]
+    return base64.b64encode("\n".join(lines).encode("utf-8")).decode("utf-8")
+
+def make_bbfas_outfits(count):
+    outfits = []
+    for i in range(count):
+        outfits.append({"Code": "", "Item": {
+            "Clothes": {"Drawable": {f"pCI{k}": (i + k) % 300 for k in range(12)},
+                        "Texture": {f"pCT{k}": (i * k) % 12 for k in range(12)}},
+            "Props": {"Drawable": {f"pPi{k}": (i + k) % 40 - 1 for k in range(8)},
+                      "Texture": {f"pPt{k}": (i + k) % 5 - 1 for k in range(8)}}}})
+    return outfits
+
+def time_per_outfit(func, outfits, gender):
+    """Best per-outfit time in microseconds"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for outfit in outfits:
+            func(outfit, gender)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6 / len(outfits)
+
+def main():
+    bbfas_outfits = make_bbfas_outfits(OUTFITS)
+    cherax_outfits = [json_cherax.json_to_cherax(outfit, "MALE") for outfit in bbfas_outfits]
+
+    # The compiled slot tables must not change the output
+    for bbfas_outfit, cherax_outfit in zip(bbfas_outfits[:1000], cherax_outfits):
+        assert cherax_outfit == legacy_json_to_cherax(bbfas_outfit, "MALE")
+        assert cherax_bbfas.cherax_to_bbfas(cherax_outfit, "MALE") == legacy_cherax_to_bbfas(cherax_outfit, "MALE")
+
+    print("⏱️  MAPPING BENCHMARK (per outfit)")
+    print("=" * 60)
+    print(f"{'converter':<18} {'before (µs)':>12} {'after (µs)':>12} {'speedup':>9}")
+
+    for name, before, after, outfits in (
+            ("json_to_cherax", legacy_json_to_cherax, json_cherax.json_to_cherax, bbfas_outfits),
+            ("cherax_to_bbfas", legacy_cherax_to_bbfas, cherax_bbfas.cherax_to_bbfas, cherax_outfits)):
+        before_time = time_per_outfit(before, outfits, "MALE")
+        after_time = time_per_outfit(after, outfits, "MALE")
+        print(f"{name:<18} {before_time:>12.2f} {after_time:>12.2f} {before_time / after_time:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import output_sink, pipeline
+
+OUTFITS = 5000
+SEED = 1234
+
+CASES = (
+    ("direct", "none"),
+    ("buffered", "none"),
+    ("background", "none"),
+    ("direct", "each"),
+    ("buffered", "batch"),
+    ("background", "batch"),
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the output sink modes writing one Cherax file per outfit")
+    parser.add_argument("--dir", help="folder to write in, e.g. on the slow or network disk to measure (default: a temporary folder)")
+    options = parser.parse_args()
+
+    rng = random.Random(SEED)
+    json_cherax = pipeline.json_cherax
+    outfits = [pipeline.bbfas_json.bbfas_to_outfit(make_bbfas_code(rng, "full")) for _ in range(OUTFITS)]
+    contents = [json_cherax.outfit_to_cherax_json(outfit) for outfit in outfits]
+
+    print(f"⏱️  OUTPUT SINK BENCHMARK ({OUTFITS} Cherax files)")
+    print("=" * 60)
+    print(f"{'mode':<12} {'fsync':<7} {'time (ms)':>10} {'files/s':>10}")
+    for mode, fsync in CASES:
+        with tempfile.TemporaryDirectory(dir=options.dir) as directory:
+            paths = [os.path.join(directory, f"folder{i % 10}", f"cherax_outfit_male-{i}.json") for i in range(OUTFITS)]
+            start = time.perf_counter()
+            sink = output_sink.OutputSink(mode, fsync)
+            for path, content in zip(paths, contents):
+                output_sink.ensure_directory(os.path.dirname(path))
+                sink.write(path, content)
+            sink.close()
+            elapsed = time.perf_counter() - start
+
+            for path, content in zip(paths, contents):
+                with open(path, "r", encoding="utf-8") as f:
+                    assert f.read() == content
+            # Every run creates its folders again
+            output_sink._known_dirs.clear()
+        print(f"{mode:<12} {fsync:<7} {elapsed * 1e3:>10.1f} {OUTFITS / elapsed:>10.0f}")
+
+if __name__ == "__main__":
+    main()
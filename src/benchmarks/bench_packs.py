@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import packs, staged
+
+FILES = 5000
+FOLDERS = 50
+SEED = 1234
+
+def count_files(directory):
+    return sum(len(files) + len(folders) for _, folders, files in os.walk(directory))
+
+def convert_extracted(pack_path, work_dir, output_path, direction):
+    """The usual way: extract the pack, convert the folder, archive the output folder; returns the files created"""
+    source_dir = os.path.join(work_dir, "extracted")
+    output_dir = os.path.join(work_dir, "converted")
+    with zipfile.ZipFile(pack_path) as pack:
+        pack.extractall(source_dir)
+    staged.convert_directory(source_dir, direction, output_dir)
+    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, _, files in os.walk(output_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                archive.write(path, os.path.relpath(path, output_dir).replace(os.sep, "/"))
+    return count_files(source_dir) + count_files(output_dir)
+
+def main():
+    rng = random.Random(SEED)
+    codes = [make_bbfas_code(rng, "full") for _ in range(200)]
+    direction = "bbfas-cherax"
+
+    with tempfile.TemporaryDirectory() as directory:
+        pack_path = os.path.join(directory, "pack.zip")
+        with zipfile.ZipFile(pack_path, "w", zipfile.ZIP_DEFLATED) as pack:
+            for i in range(FILES):
+                pack.writestr(f"folder{i % FOLDERS}/outfit{i}.txt", codes[i % len(codes)])
+
+        extracted_path = os.path.join(directory, "extracted.zip")
+        start = time.perf_counter()
+        files_created = convert_extracted(pack_path, os.path.join(directory, "work"), extracted_path, direction)
+        extracted_time = time.perf_counter() - start
+
+        runs = []
+        for workers in sorted({1, os.cpu_count() or 1}):
+            output_path = os.path.join(directory, f"streamed{workers}.zip")
+            start = time.perf_counter()
+            result = packs.convert_pack(pack_path, output_path, direction, workers=workers)
+            runs.append((workers, time.perf_counter() - start))
+            assert result.converted == FILES and not result.failed
+            # Same members as the extract/convert/archive run
+            with zipfile.ZipFile(extracted_path) as expected, zipfile.ZipFile(output_path) as streamed:
+                assert sorted(expected.namelist()) == sorted(streamed.namelist())
+                for name in expected.namelist():
+                    assert expected.read(name) == streamed.read(name)
+
+    print(f"⏱️  OUTFIT PACK BENCHMARK ({FILES} BBFAS codes in a zip -> zip of Cherax files)")
+    print("=" * 60)
+    print(f"{'run':<30} {'time (s)':>9} {'files/s':>9} {'files on disk':>14}")
+    print(f"{'extract, convert, archive':<30} {extracted_time:>9.2f} {FILES / extracted_time:>9.0f} {files_created:>14}")
+    for workers, elapsed in runs:
+        name = f"streamed, {workers} worker{'s' if workers > 1 else ''}"
+        print(f"{name:<30} {elapsed:>9.2f} {FILES / elapsed:>9.0f} {1:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import parallel, pipeline
+
+FILE_COUNT = 20000
+CHUNK_SIZE = 256
+
+def write_cherax_files(directory, count):
+    """Fill a directory with Cherax JSON files built from a sample outfit"""
+    components = {name: {"drawable": i % 50, "texture": i % 7, "palette": 0}
+                  for i, name in enumerate(pipeline.cherax_bbfas.CHERAX_TO_BBFAS_MAPPING) if i < 11}
+    props = {name: {"drawable": i % 9, "texture": 0}
+             for i, name in enumerate(pipeline.cherax_bbfas.CHERAX_TO_BBFAS_MAPPING) if i >= 11}
+    for i in range(count):
+        outfit = {"format": "Cherax Entity", "type": 2, "model": 1885233650, "components": components, "props": props}
+        outfit["components"]["Legs"] = {"drawable": i % 200, "texture": 0, "palette": 0}
+        with open(os.path.join(directory, f"cherax_{i:06d}.json"), "w", encoding="utf-8") as f:
+            json.dump(outfit, f, indent=2)
+
+def main():
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+
+    print("⏱️  PARALLEL CONVERTER BENCHMARK (JSON CHERAX → BBFAS CODE)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_cherax_files(directory, FILE_COUNT)
+        print(f"📁 {FILE_COUNT} input files, chunk size {CHUNK_SIZE}\n")
+        print(f"{'workers':>8} {'seconds':>10} {'files / s':>12} {'speedup':>9}")
+
+        reference = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            failed = sum(1 for _, _, result, _ in parallel.convert_many(
+                "cherax-bbfas", parallel.iter_input_files(directory), "MALE", workers, CHUNK_SIZE, from_files=True) if not result)
+            elapsed = time.perf_counter() - start
+            reference = reference or elapsed
+            print(f"{workers:>8} {elapsed:>10.2f} {FILE_COUNT / elapsed:>12.0f} {reference / elapsed:>8.1f}x"
+                  + (f"  ({failed} failed)" if failed else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+from modules import server
+
+SPAWN_RUNS = 20
+REQUESTS = 20000
+DIRECTION = "bbfas-cherax-bbfas"
+
+SAMPLE_CODE = "SXRlbQpESQpwQ0kwCi0xCnBDSTEKNQovREkKRFQKcENUMQoyCi9EVApQaQpwUGkwCjMKL1BpClB0CnBQdDAKMQovUHQKL0l0ZW0="
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def wait_for_server(address, process, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Conversion server exited on startup")
+        try:
+            return server.ConversionClient(address)
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Conversion server did not start")
+
+def main():
+    print(f"⏱️  SERVER BENCHMARK ({DIRECTION})")
+    print("=" * 60)
+
+    # One process per conversion, as the bots do today
+    spawn_timings = []
+    for _ in range(SPAWN_RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "batch", DIRECTION], cwd=SRC_DIR, input=SAMPLE_CODE + "\n",
+                       capture_output=True, text=True, check=True)
+        spawn_timings.append((time.perf_counter() - start) * 1e6)
+    print(f"🐢 Process per conversion : {statistics.median(spawn_timings):10.0f} µs median")
+
+    with tempfile.TemporaryDirectory() as directory:
+        address = os.path.join(directory, "bench.sock") if hasattr(server.socket, "AF_UNIX") else None
+        command = [sys.executable, "main.py", "serve"] + (["--socket", address] if address else ["--port", str(server.DEFAULT_PORT)])
+        process = subprocess.Popen(command, cwd=SRC_DIR, stderr=subprocess.DEVNULL)
+        try:
+            with wait_for_server(address, process) as client:
+                timings = []
+                for _ in range(REQUESTS // 10):
+                    start = time.perf_counter()
+                    client.convert(DIRECTION, SAMPLE_CODE)
+                    timings.append((time.perf_counter() - start) * 1e6)
+                print(f"🛰️  Server, one at a time  : {statistics.median(timings):10.0f} µs median, "
+                      f"p99 {percentile(timings, 0.99):.0f} µs")
+
+                start = time.perf_counter()
+                failed = sum(1 for _, error in client.convert_many(DIRECTION, [SAMPLE_CODE] * REQUESTS) if error)
+                elapsed = time.perf_counter() - start
+                print(f"🚀 Server, pipelined      : {elapsed * 1e6 / REQUESTS:10.0f} µs per conversion, "
+                      f"{REQUESTS / elapsed:.0f} / s" + (f"  ({failed} failed)" if failed else ""))
+        finally:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
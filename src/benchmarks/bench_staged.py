@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import output_sink, parallel, staged, sync
+
+FILES = 5000
+FOLDERS = 50
+SEED = 1234
+
+def with_latency(func, seconds):
+    """func delayed like a slow disk: sleep releases the GIL as a blocking read or write does"""
+    if not seconds:
+        return func
+
+    def delayed(*args, **kwargs):
+        time.sleep(seconds)
+        return func(*args, **kwargs)
+    return delayed
+
+def convert_sequentially(source_dir, output_dir, direction, read, write):
+    """The file-by-file loop: read, convert, write, one file at a time"""
+    serialize = sync.serializer(direction)
+    extension = sync.EXTENSIONS[parallel.pipeline.DIRECTIONS[direction][1]]
+    for source, _, _ in sync.scan_sources(source_dir, ".txt"):
+        result, _ = parallel.run_quiet(direction, read(os.path.join(source_dir, source)))
+        path = os.path.join(output_dir, os.path.splitext(source)[0] + extension)
+        output_sink.ensure_directory(os.path.dirname(path))
+        write([(path, serialize(result))])
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a folder conversion file by file against the staged pipeline")
+    parser.add_argument("--latency", type=float, default=1.0, help="simulated disk latency per file read and write, in ms (default: 1)")
+    options = parser.parse_args()
+    latency = options.latency / 1000
+
+    rng = random.Random(SEED)
+    codes = [make_bbfas_code(rng, "full") for _ in range(200)]
+    direction = "bbfas-cherax"
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_dir = os.path.join(directory, "codes")
+        for i in range(FILES):
+            folder = os.path.join(source_dir, f"folder{i % FOLDERS}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"outfit{i}.txt"), "w", encoding="utf-8") as f:
+                f.write(codes[i % len(codes)])
+
+        # The same delays for both runs, in the functions the staged stages call
+        read_input_file, write_files = parallel.read_input_file, staged.write_files
+        parallel.read_input_file = with_latency(read_input_file, latency)
+        staged.write_files = with_latency(write_files, latency)
+        try:
+            sequential_dir = os.path.join(directory, "sequential")
+            start = time.perf_counter()
+            convert_sequentially(source_dir, sequential_dir, direction, parallel.read_input_file, staged.write_files)
+            sequential_time = time.perf_counter() - start
+
+            runs = []
+            for workers in sorted({1, os.cpu_count() or 1}):
+                output_dir = os.path.join(directory, f"staged{workers}")
+                runs.append((workers, staged.convert_directory(source_dir, direction, output_dir, workers=workers, readers=4, writers=4)))
+                # Same files as the sequential loop
+                for source, _, _ in sync.scan_sources(sequential_dir, ".json"):
+                    with open(os.path.join(sequential_dir, source), "rb") as f, open(os.path.join(output_dir, source), "rb") as g:
+                        assert f.read() == g.read()
+        finally:
+            parallel.read_input_file, staged.write_files = read_input_file, write_files
+
+    print(f"⏱️  STAGED CONVERSION BENCHMARK ({FILES} BBFAS files -> Cherax, {options.latency:g} ms per read and write)")
+    print("=" * 60)
+    print(f"{'run':<28} {'time (s)':>9} {'files/s':>9}")
+    print(f"{'file by file':<28} {sequential_time:>9.2f} {FILES / sequential_time:>9.0f}")
+    for workers, result in runs:
+        assert result.converted == FILES and not result.failed
+        name = f"staged, {workers} worker{'s' if workers > 1 else ''}"
+        print(f"{name:<28} {result.elapsed:>9.2f} {FILES / result.elapsed:>9.0f}")
+    print(f"{'stage':<8} {'busy (s)':>9} {'use':>6} {'queue avg':>10}   (last staged run)")
+    for stage in runs[-1][1].stages:
+        busy = "-" if stage["busy"] is None else f"{stage['busy']:.2f}"
+        use = "-" if stage["utilization"] is None else f"{stage['utilization']:.0%}"
+        print(f"{stage['stage']:<8} {busy:>9} {use:>6} {stage['queue_mean']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
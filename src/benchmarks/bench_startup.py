@@ -0,0 +1,61 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 20
+
+# Budgets over a bare interpreter start (python -c pass), in milliseconds
+MENU_BUDGET_MS = 10       # import main: everything done before the menu shows up
+BATCH_BUDGET_MS = 50      # python main.py batch bbfas-cherax on a single code
+
+# Measure the usual setup, where the bytecode cache is written on the first run
+ENV = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+
+SAMPLE_CODE = "SXRlbQpESQpwQ0kwCi0xCnBDSTEKNQovREkKRFQKcENUMQoyCi9EVApQaQpwUGkwCjMKL1BpClB0CnBQdDAKMQovUHQKL0l0ZW0="
+
+def median_ms(command, stdin=None):
+    """Median wall time of RUNS runs of a command, in milliseconds"""
+    timings = []
+    for run in range(RUNS + 1):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SRC_DIR, env=ENV, input=stdin, capture_output=True, text=True, check=True)
+        if run:   # the first run only warms up the bytecode cache
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def slowest_imports(count=8):
+    """Imports with the highest self time when importing main, from python -X importtime"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=SRC_DIR, env=ENV, capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+def main():
+    print("⏱️  STARTUP BENCHMARK")
+    print("=" * 60)
+
+    interpreter = median_ms([sys.executable, "-c", "pass"])
+    menu = median_ms([sys.executable, "-c", "import main"])
+    batch = median_ms([sys.executable, "main.py", "batch", "bbfas-cherax"], stdin=SAMPLE_CODE + "\n")
+
+    print(f"🐍 Bare interpreter        : {interpreter:7.1f} ms")
+    for label, total, budget in (("Menu startup (import)", menu, MENU_BUDGET_MS),
+                                 ("Batch, one code", batch, BATCH_BUDGET_MS)):
+        overhead = total - interpreter
+        status = "✅" if overhead <= budget else "❌"
+        print(f"{status} {label:<22} : {total:7.1f} ms  (+{overhead:.1f} ms, budget +{budget} ms)")
+
+    print("\n🔍 Slowest imports for 'import main' (self / cumulative µs):")
+    for self_us, cumulative_us, name in slowest_imports():
+        print(f"   {self_us:>7} / {cumulative_us:>7}  {name}")
+
+if __name__ == "__main__":
+    main()
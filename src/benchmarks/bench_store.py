@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from modules import store
+from modules.outfit import CLOTHES_COUNT, SLOT_COUNT, Outfit
+
+DEFAULT_OUTFITS = 200000
+QUERIES = 200
+SEED = 1234
+
+def random_outfit(rng):
+    """Outfit with realistic value ranges: drawables up to 200, textures up to 25, some slots empty"""
+    values = []
+    for index in range(SLOT_COUNT):
+        texture = CLOTHES_COUNT <= index < 2 * CLOTHES_COUNT or index >= 2 * CLOTHES_COUNT + 8
+        values.append(rng.randrange(-1, 26 if texture else 200))
+    return Outfit(None, values)
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest random outfits into an outfit store and time slot queries")
+    parser.add_argument("--outfits", type=int, default=DEFAULT_OUTFITS)
+    options = parser.parse_args()
+
+    rng = random.Random(SEED)
+    outfits = [random_outfit(rng) for _ in range(options.outfits)]
+    queries = [(rng.choice(["Tuxedo/Jacket Bib", "Hair", "Legs", "Head", "Eyes"]), rng.randrange(200)) for _ in range(QUERIES)]
+    combined = [(("Tuxedo/Jacket Bib", drawable, None), ("pCI4", None, rng.randrange(26))) for _, drawable in queries]
+
+    with tempfile.TemporaryDirectory() as directory:
+        with store.OutfitStore(os.path.join(directory, "outfits.sqlite3")) as outfit_store:
+            ingest_time, _ = timed(lambda: outfit_store.add_many(outfits))
+            find_time, found = timed(lambda: [outfit_store.find(slot, drawable) for slot, drawable in queries])
+            combined_time, combined_found = timed(lambda: [outfit_store.find_all(conditions) for conditions in combined])
+            count_time, _ = timed(lambda: [outfit_store.count(slot, drawable) for slot, drawable in queries])
+
+            # What a query costs without the store: looking at every outfit
+            slot, drawable = queries[0]
+            number = store.resolve_slot(slot)
+            scan_time, scanned = timed(lambda: [index + 1 for index, outfit in enumerate(outfits) if outfit.values[number] == drawable])
+            assert scanned == found[0]
+            size = os.path.getsize(outfit_store.db_path)
+
+    matches = sum(map(len, found)) / QUERIES
+    print(f"⏱️  OUTFIT STORE BENCHMARK ({options.outfits} outfits, {QUERIES} queries each)")
+    print("=" * 60)
+    print(f"ingest: {ingest_time:.1f} s ({options.outfits / ingest_time:.0f} outfits/s), database {size / 1e6:.0f} MB")
+    print(f"{'query':<34} {'per query (ms)':>15}")
+    print(f"{'slot + drawable (~' + format(matches, '.0f') + ' matches)':<34} {find_time / QUERIES * 1e3:>15.2f}")
+    print(f"{'two slot conditions':<34} {combined_time / QUERIES * 1e3:>15.2f}")
+    print(f"{'count slot + drawable':<34} {count_time / QUERIES * 1e3:>15.2f}")
+    print(f"{'in-memory scan of every outfit':<34} {scan_time * 1e3:>15.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import base64
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+from modules import pipeline
+from modules.outfit import SECTIONS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_TOLERANCE = 0.25   # slowdown over the baseline reported as a regression
+SEED = 1234
+ROUNDS = 3
+
+# Input size -> (extra entries per outfit, calls per case); calls are divided by 10 with --quick
+SIZES = {
+    "minimal": (0, 20000),
+    "full": (0, 20000),
+    "large": (2000, 500),            # thousands of duplicate / unknown entries
+    "huge": (100000, 10),            # megabyte-sized payloads
+}
+
+bbfas_json = pipeline.bbfas_json
+json_cherax = pipeline.json_cherax
+cherax_bbfas = pipeline.cherax_bbfas
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+def make_bbfas_code(rng, size):
+    """Synthetic BBFAS code: a few slots (minimal), every slot (full) or every slot plus padding"""
+    extra, _ = SIZES[size]
+    lines = ["Item"]
+    for marker, section, item_type, slots in SECTIONS:
+        lines.append(marker)
+        keys = list(slots)[:2] if size == "minimal" else list(slots)
+        for key in keys:
+            lines += (key, str(rng.randint(-1, 400)))
+        # Repeated and unknown keys, which the parser has to walk through
+        for i in range(extra // len(SECTIONS)):
+            key = keys[i % len(keys)] if i % 2 else f"{keys[0]}x{i}"
+            lines += (key, str(rng.randint(-1, 400)))
+        lines.append("/" + marker)
+    lines.append("/Item")
+    return base64.b64encode("\n".join(lines).encode("utf-8")).decode("utf-8")
+
+def make_cherax_outfit(rng, size, gender="MALE"):
+    """Synthetic Cherax JSON: a few components (minimal), all of them (full) or all plus unknown entries"""
+    extra, _ = SIZES[size]
+    component_keys = [key for key, _, _ in cherax_bbfas.COMPONENT_SLOTS]
+    prop_keys = [key for key, _, _ in cherax_bbfas.PROP_SLOTS]
+    if size == "minimal":
+        component_keys, prop_keys = component_keys[:2], prop_keys[:1]
+
+    outfit = {"format": "Cherax Entity", "type": 2, "model": json_cherax.MODELS[gender], "baseFlags": 66871}
+    outfit["components"] = {key: {"drawable": rng.randint(-1, 400), "texture": rng.randint(0, 20), "palette": 0}
+                            for key in component_keys}
+    outfit["props"] = {key: {"drawable": rng.randint(-1, 100), "texture": rng.randint(-1, 10)} for key in prop_keys}
+    for i in range(extra):
+        outfit["components"][f"Unknown{i}"] = {"drawable": i, "texture": 0, "palette": 0}
+    return outfit
+
+def build_inputs(rng, size, count):
+    """count distinct inputs of one size, reused round-robin by the timed calls"""
+    codes = [make_bbfas_code(rng, size) for _ in range(count)]
+    bbfas_outfits = [bbfas_json.bbfas_to_json(code) for code in codes]
+    cherax_outfits = [make_cherax_outfit(rng, size) for _ in range(count)]
+    return {"code": codes, "bbfas": bbfas_outfits, "cherax": cherax_outfits}
+
+# ---------------------------------------------------------------------------
+# Cases: name -> (input kind, function of one input)
+# ---------------------------------------------------------------------------
+
+def file_inputs(directory, outfits, prefix):
+    """Write outfits as JSON files and return their paths"""
+    paths = []
+    for i, outfit in enumerate(outfits):
+        path = os.path.join(directory, f"{prefix}_{i}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(outfit, f, indent=2)
+        paths.append(path)
+    return paths
+
+CASES = {
+    "bbfas_to_json": ("code", lambda code: bbfas_json.bbfas_to_json(code)),
+    "json_to_cherax": ("bbfas", lambda data: json_cherax.json_to_cherax(data, "MALE")),
+    "cherax_to_bbfas": ("cherax", lambda data: cherax_bbfas.cherax_to_bbfas(data, "MALE")),
+    "bbfas_to_cherax": ("code", lambda code: pipeline.bbfas_to_cherax(code, "MALE")),
+    "bbfas_round_trip": ("code", lambda code: pipeline.bbfas_round_trip(code, "MALE")),
+    "convert_bbfas_to_json": ("code", lambda code: bbfas_json.convert_bbfas_to_json(code)),
+    "convert_json_to_cherax": ("bbfas_file", lambda path: json_cherax.convert_json_to_cherax(path, "MALE")),
+    "convert_cherax_to_bbfas": ("cherax_file", lambda path: cherax_bbfas.convert_cherax_to_bbfas(path, "MALE")),
+    "convert_bbfas_to_cherax": ("code", lambda code: pipeline.convert_bbfas_to_cherax(code, "MALE")),
+    "convert_bbfas_round_trip": ("code", lambda code: pipeline.convert_bbfas_round_trip(code, "MALE")),
+}
+
+# File-level cases are slower; they get this fraction of the calls
+FILE_CASE_SHARE = 0.1
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_timings, fraction):
+    return sorted_timings[min(len(sorted_timings) - 1, int(len(sorted_timings) * fraction))]
+
+def measure(func, inputs, calls, rounds=ROUNDS):
+    """Time calls of func over inputs, then run a smaller pass under tracemalloc for the peak memory
+
+    The timed loop runs `rounds` times and the round with the lowest median is kept,
+    which filters out most of the noise from other processes.
+    """
+    clock = time.perf_counter_ns
+    count = len(inputs)
+    func(inputs[0])   # warm up
+    best = None
+    for _ in range(rounds):
+        timings = []
+        start = clock()
+        for i in range(calls):
+            data = inputs[i % count]
+            call_start = clock()
+            func(data)
+            timings.append(clock() - call_start)
+        elapsed = (clock() - start) / 1e9
+        timings.sort()
+        if best is None or percentile(timings, 0.50) < percentile(best[0], 0.50):
+            best = timings, elapsed
+    timings, elapsed = best
+
+    tracemalloc.start()
+    for data in inputs[:max(1, min(count, calls // 10))]:
+        func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "calls": calls,
+        "ops_per_sec": round(calls / elapsed, 1),
+        "p50_us": round(percentile(timings, 0.50) / 1000, 2),
+        "p90_us": round(percentile(timings, 0.90) / 1000, 2),
+        "p99_us": round(percentile(timings, 0.99) / 1000, 2),
+        "max_us": round(timings[-1] / 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def run_suite(quick=False, name_filter=None):
+    rng = random.Random(SEED)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w", encoding="utf-8") as devnull:
+        # The file-level converters write into a scratch folder
+        bbfas_dir = os.path.join(directory, "BBFAS")
+        cherax_dir = os.path.join(directory, "CHERAX")
+        bbfas_json.OUTPUT_DIR = cherax_bbfas.OUTPUT_DIR = bbfas_dir
+        json_cherax.OUTPUT_DIR = cherax_dir
+
+        for size, (_, calls) in SIZES.items():
+            calls = max(1, calls // 10) if quick else calls
+            with contextlib.redirect_stdout(devnull):
+                inputs = build_inputs(rng, size, min(calls, 100))
+            inputs["bbfas_file"] = file_inputs(directory, inputs["bbfas"], f"bbfas_{size}")
+            inputs["cherax_file"] = file_inputs(directory, inputs["cherax"], f"cherax_{size}")
+
+            for case, (kind, func) in CASES.items():
+                name = f"{case}[{size}]"
+                if name_filter and name_filter not in name:
+                    continue
+                case_calls = max(1, int(calls * FILE_CASE_SHARE)) if case.startswith("convert_") else calls
+                with contextlib.redirect_stdout(devnull):
+                    results[name] = measure(func, inputs[kind], case_calls)
+                print(f"  {name:<38} {results[name]['ops_per_sec']:>12.0f} /s  "
+                      f"p50 {results[name]['p50_us']:>10.1f} µs  peak {results[name]['peak_kb']:>9.1f} KB")
+
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Print the p50 and throughput changes against the baseline; return the regressed case names"""
+    regressions = []
+    print(f"\n{'case':<38} {'p50 before':>11} {'p50 after':>11} {'change':>8}")
+    for name, current in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        change = current["p50_us"] / previous["p50_us"] - 1 if previous["p50_us"] else 0.0
+        throughput_change = previous["ops_per_sec"] / current["ops_per_sec"] - 1 if current["ops_per_sec"] else 0.0
+        regressed = change > tolerance and throughput_change > tolerance
+        if regressed:
+            regressions.append(name)
+        status = "❌" if regressed else "✅"
+        print(f"{status} {name:<36} {previous['p50_us']:>11.1f} {current['p50_us']:>11.1f} {change:>+7.0%}")
+    return regressions
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark every conversion direction on synthetic inputs")
+    parser.add_argument("--quick", action="store_true", help="run a tenth of the calls")
+    parser.add_argument("--filter", help="only run the cases whose name contains this text")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH, help="where to write the results (JSON)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="save these results as the new baseline")
+    parser.add_argument("--tolerance", default=DEFAULT_TOLERANCE, type=float, help="slowdown reported as a regression (0.25 = 25%%)")
+    options = parser.parse_args(args)
+
+    print("⏱️  CONVERSION BENCHMARK SUITE")
+    print("=" * 60)
+    results = run_suite(options.quick, options.filter)
+
+    with open(options.results, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {options.results}")
+
+    if options.save_baseline:
+        with open(options.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to {options.baseline}")
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print("ℹ️  No baseline to compare with, save one with --save-baseline")
+        return 0
+
+    with open(options.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("quick") != options.quick:
+        print("⚠️  The baseline was not run with the same --quick setting, timings may not be comparable")
+    regressions = compare(results, baseline, options.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {options.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regression")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import sync
+
+FILES = 20000
+FOLDERS = 100
+CHANGED = 100
+SEED = 1234
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    rng = random.Random(SEED)
+    codes = [make_bbfas_code(rng, "full") for _ in range(500)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_dir = os.path.join(directory, "codes")
+        output_dir = os.path.join(directory, "CHERAX")
+        paths = []
+        for i in range(FILES):
+            folder = os.path.join(source_dir, f"folder{i % FOLDERS}")
+            os.makedirs(folder, exist_ok=True)
+            paths.append(os.path.join(folder, f"outfit{i}.txt"))
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                f.write(codes[i % len(codes)])
+
+        def run():
+            return sync.sync_directory(source_dir, "bbfas-cherax", output_dir)
+
+        full_time, full = timed(run)
+        nothing_time, nothing = timed(run)
+
+        # Edit some files, only touch others (same content, new mtime) and delete a few
+        for n, i in enumerate(rng.sample(range(FILES), 3 * CHANGED)):
+            if n < CHANGED:
+                with open(paths[i], "w", encoding="utf-8") as f:
+                    f.write(codes[(i + 1) % len(codes)])
+            elif n < 2 * CHANGED:
+                os.utime(paths[i], ns=(time.time_ns(), time.time_ns()))
+            else:
+                os.remove(paths[i])
+        partial_time, partial = timed(run)
+
+    assert full.added == FILES and not full.failed
+    assert nothing.unchanged == FILES and not (nothing.added or nothing.changed or nothing.removed)
+    assert partial.changed == CHANGED and partial.removed == CHANGED and partial.unchanged == FILES - 2 * CHANGED
+
+    print(f"⏱️  SYNC BENCHMARK ({FILES} BBFAS files in {FOLDERS} folders -> Cherax)")
+    print("=" * 60)
+    print(f"{'run':<34} {'time (ms)':>10} {'files/s':>12}")
+    for name, elapsed in (("first sync (all converted)", full_time),
+                          ("re-sync, nothing changed", nothing_time),
+                          (f"re-sync, {CHANGED} edited/touched/deleted", partial_time)):
+        print(f"{name:<34} {elapsed * 1e3:>10.1f} {FILES / elapsed:>12.0f}")
+
+if __name__ == "__main__":
+    main()
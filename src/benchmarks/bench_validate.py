@@ -0,0 +1,69 @@
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code
+from modules import pipeline, validate
+
+RECORDS = 20000
+SEED = 1234
+
+def bad_records(rng, codes, cherax):
+    """Malformed BBFAS codes and Cherax JSON of every kind the validator rejects"""
+    bad_codes = []
+    for code in codes:
+        kind = rng.randrange(3)
+        if kind == 0:
+            bad_codes.append(code[:10] + "!" + code[11:])
+        elif kind == 1:
+            bad_codes.append(code[:-1])
+        else:
+            payload = base64.b64decode(code).decode("utf-8").replace("pCI1\n", "pCI1\n1.", 1)
+            bad_codes.append(base64.b64encode(payload.encode("utf-8")).decode("utf-8"))
+    bad_cherax = []
+    for outfit in cherax:
+        outfit = json.loads(json.dumps(outfit))
+        outfit["components"]["Hair"]["drawable"] = "x" if rng.random() < 0.5 else 2 ** 31
+        bad_cherax.append(outfit)
+    return bad_codes, bad_cherax
+
+def per_record(func, records):
+    """Average microseconds of func(record), converter messages silenced"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for record in records:
+            func(record)
+        return (time.perf_counter() - start) / len(records) * 1e6
+
+def main():
+    rng = random.Random(SEED)
+    codes = [make_bbfas_code(rng, "full") for _ in range(RECORDS)]
+    cherax = [pipeline.bbfas_to_cherax(code) for code in codes]
+    bad_codes, bad_cherax = bad_records(rng, codes, cherax)
+    assert all(validate.check_bbfas_code(code) for code in bad_codes)
+    assert all(validate.check_cherax_json(outfit) for outfit in bad_cherax)
+    assert not any(validate.check_bbfas_code(code) for code in codes)
+
+    cherax_bbfas = pipeline.cherax_bbfas
+    print(f"⏱️  VALIDATOR BENCHMARK ({RECORDS} records)")
+    print("=" * 60)
+    print(f"{'input':<26} {'validate (µs)':>14} {'convert (µs)':>13}")
+    rows = (
+        ("valid BBFAS codes", validate.check_bbfas_code, pipeline.bbfas_to_cherax, codes),
+        ("malformed BBFAS codes", validate.check_bbfas_code, pipeline.bbfas_to_cherax, bad_codes),
+        ("valid Cherax JSON", validate.check_cherax_json, lambda outfit: cherax_bbfas.cherax_to_bbfas(outfit, "MALE"), cherax),
+        ("malformed Cherax JSON", validate.check_cherax_json, lambda outfit: cherax_bbfas.cherax_to_bbfas(outfit, "MALE"), bad_cherax),
+    )
+    for name, check, convert, records in rows:
+        print(f"{name:<26} {per_record(check, records):>14.1f} {per_record(convert, records):>13.1f}")
+
+if __name__ == "__main__":
+    main()
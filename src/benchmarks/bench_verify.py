@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from modules import verify
+
+DEFAULT_OUTFITS = 100000
+SEED = 1234
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the round-trip verifier on generated codes with growing worker counts")
+    parser.add_argument("--outfits", type=int, default=DEFAULT_OUTFITS)
+    options = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({count for count in (1, 2, 4, cores) if count <= cores})
+
+    print(f"⏱️  ROUND-TRIP VERIFIER BENCHMARK ({options.outfits} generated outfits)")
+    print("=" * 60)
+    print(f"{'workers':>7} {'time (s)':>9} {'outfits/s':>10} {'per million (s)':>16}")
+    reference = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        report = verify.verify_round_trip(generate=options.outfits, seed=SEED, workers=workers)
+        elapsed = time.perf_counter() - start
+        # Every worker count must find the same differences
+        assert report.ok and report.outfits == options.outfits
+        if reference is None:
+            reference = report.slots
+        assert report.slots == reference
+        print(f"{workers:>7} {elapsed:>9.2f} {options.outfits / elapsed:>10.0f} {1e6 / options.outfits * elapsed:>16.0f}")
+
+if __name__ == "__main__":
+    main()
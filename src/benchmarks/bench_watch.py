@@ -0,0 +1,83 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_suite import make_bbfas_code, make_cherax_outfit
+from modules import watch
+
+RATE = 300       # files per second
+DURATION = 3     # seconds
+SEED = 1234
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run(polling, rng):
+    """Drop RATE files per second in a watched folder; end-to-end latencies of their conversions"""
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)   # the converters write to src/output/ under the current folder
+        try:
+            inbox = os.path.join(directory, "inbox")
+            os.makedirs(inbox)
+            written = {}
+            latencies = []
+            done = threading.Event()
+            total = RATE * DURATION
+
+            def on_result(path, output, error, _):
+                assert error is None, error
+                latencies.append(time.monotonic() - written[path])
+                if len(latencies) == total:
+                    done.set()
+
+            watcher = watch.FolderWatcher(inbox, polling=polling, on_result=on_result)
+            thread = threading.Thread(target=watcher.run)
+            devnull = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, devnull
+            thread.start()
+            try:
+                start = time.monotonic()
+                for i in range(total):
+                    # Alternate BBFAS codes and Cherax JSON files
+                    if i % 2:
+                        path, text = os.path.join(inbox, f"outfit{i}.json"), json.dumps(make_cherax_outfit(rng, "full"))
+                    else:
+                        path, text = os.path.join(inbox, f"outfit{i}.txt"), make_bbfas_code(rng, "full")
+                    delay = start + i / RATE - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    written[path] = time.monotonic()
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(text)
+                done.wait(DURATION + 10)
+            finally:
+                watcher.stop()
+                thread.join()
+                sys.stdout = stdout
+                devnull.close()
+            assert len(latencies) == total, f"{len(latencies)} of {total} files converted"
+            return latencies, watcher.stats()["backend"]
+        finally:
+            os.chdir(cwd)
+
+def main():
+    rng = random.Random(SEED)
+    print(f"⏱️  WATCH BENCHMARK ({RATE} files/s for {DURATION} s, half BBFAS codes, half Cherax JSON)")
+    print("=" * 60)
+    print(f"{'backend':<10} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    for polling in (False, True):
+        latencies, backend = run(polling, rng)
+        print(f"{backend:<10} {percentile(latencies, 0.5) * 1e3:>10.1f} {percentile(latencies, 0.9) * 1e3:>10.1f} "
+              f"{percentile(latencies, 0.99) * 1e3:>10.1f} {max(latencies) * 1e3:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -2,43 +2,19 @@ import os
 import sys
 
 try:
-    import importlib.util
-
     # Always build paths relative to this file
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    bbfas_json_path = os.path.join(base_dir, "modules", "BBFAS-JSON.py")
-    json_cherax_path = os.path.join(base_dir, "modules", "JSON-CHERAX.py")
-    cherax_bbfas_path = os.path.join(base_dir, "modules", "CHERAX-BBFAS.py")
-
-    spec1 = importlib.util.spec_from_file_location("bbfas_json", bbfas_json_path)
-    bbfas_json_module = importlib.util.module_from_spec(spec1)
-    spec1.loader.exec_module(bbfas_json_module)
-
-    spec2 = importlib.util.spec_from_file_location("json_cherax", json_cherax_path)
-    json_cherax_module = importlib.util.module_from_spec(spec2)
-    spec2.loader.exec_module(json_cherax_module)
-
-    spec3 = importlib.util.spec_from_file_location("cherax_bbfas", cherax_bbfas_path)
-    cherax_bbfas_module = importlib.util.module_from_spec(spec3)
-    spec3.loader.exec_module(cherax_bbfas_module)
-
-    convert_bbfas_to_json = getattr(bbfas_json_module, 'convert_bbfas_to_json')
-
-    if hasattr(json_cherax_module, 'convert_json_to_cherax'):
-        convert_json_to_cherax = getattr(json_cherax_module, 'convert_json_to_cherax')
-    elif hasattr(cherax_bbfas_module, 'convert_json_to_cherax'):
-        convert_json_to_cherax = getattr(cherax_bbfas_module, 'convert_json_to_cherax')
-    else:
-        raise AttributeError("convert_json_to_cherax not found in any module")
-
-    if hasattr(cherax_bbfas_module, 'convert_cherax_to_bbfas'):
-        convert_cherax_to_bbfas = getattr(cherax_bbfas_module, 'convert_cherax_to_bbfas')
-    elif hasattr(json_cherax_module, 'convert_cherax_to_bbfas'):
-        convert_cherax_to_bbfas = getattr(json_cherax_module, 'convert_cherax_to_bbfas')
-    else:
-        raise AttributeError("convert_cherax_to_bbfas not found in any module")
-
-except (ImportError, FileNotFoundError, AttributeError) as e:
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    import modules
+
+    # Converter modules are only loaded on first use, just check that they are all there
+    for file_name in modules.CONVERTER_FILES.values():
+        file_path = os.path.join(base_dir, "modules", file_name)
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"{file_path} not found")
+
+except (ImportError, FileNotFoundError) as e:
     print(f"❌ Import error : {e}")
     print("Make sure all files are in the correct structure:")
     print("📁 Required structure :")
@@ -102,7 +78,7 @@ def option_1():
         print("❌ Empty code!")
         return
 
-    result = convert_bbfas_to_json(code)
+    result = modules.convert_bbfas_to_json(code)
     if result:
         print(f"✅ Bbfas JSON file generated successfully!")
 
@@ -121,7 +97,7 @@ def option_2():
         return
 
     gender = get_gender()
-    result = convert_json_to_cherax(file_path, gender)
+    result = modules.convert_json_to_cherax(file_path, gender)
     if result:
         print(f"✅ JSON CHERAX file ({gender}) generated successfully!")
 
@@ -140,7 +116,7 @@ def option_3():
         return
 
     gender = get_gender()
-    result = convert_cherax_to_bbfas(file_path, gender)
+    result = modules.convert_cherax_to_bbfas(file_path, gender)
     if result:
         print(f"✅ BBFAS code generated successfully!")
 
@@ -156,23 +132,12 @@ def option_4():
 
     gender = get_gender()
 
-    # Step 1: BBFAS → JSON
-    print("🔄 Step 1/2 : Converting BBFAS → JSON...")
-    temp_json = convert_bbfas_to_json(code, "temp_bbfas.json")
-    if not temp_json:
-        return
-
-    # Step 2: JSON → CHERAX
-    print("🔄 Step 2/2 : Converting JSON → CHERAX...")
-    result = convert_json_to_cherax(temp_json, gender, f"cherax_direct_{gender.lower()}.json")
+    # Both steps run in memory, only the Cherax file is written
+    print("🔄 Converting BBFAS → JSON → CHERAX...")
+    result = modules.convert_bbfas_to_cherax(code, gender, f"cherax_direct_{gender.lower()}.json")
     if result:
         print(f"✅ Direct conversion BBFAS → CHERAX ({gender}) successful!")
 
-    try:
-        os.remove(temp_json)
-    except:
-        pass
-
 def option_5():
     """JSON CHERAX → BBFAS CODE (direct)"""
     print("\n🚀 DIRECT CONVERSION : JSON CHERAX → BBFAS CODE")
@@ -188,7 +153,7 @@ def option_5():
         return
 
     gender = get_gender()
-    result = convert_cherax_to_bbfas(file_path, gender, f"bbfas_direct_{gender.lower()}.txt")
+    result = modules.convert_cherax_to_bbfas(file_path, gender, f"bbfas_direct_{gender.lower()}.txt")
     if result:
         print("✅ Direct conversion CHERAX → BBFAS successful!")
 
@@ -203,33 +168,33 @@ def option_6():
         return
 
     gender = get_gender()
-    # Step 1: BBFAS → JSON
-    print("🔄 Step 1/3 : Converting BBFAS → JSON...")
-    temp_json = convert_bbfas_to_json(code, "temp_bbfas_complete.json")
-    if not temp_json:
-        return
-
-    # Step 2: JSON → CHERAX
-    print("🔄 Step 2/3 : Converting JSON → CHERAX...")
-    temp_cherax = convert_json_to_cherax(temp_json, gender, "temp_cherax_complete.json")
-    if not temp_cherax:
-        return
-
-    # Step 3: CHERAX → BBFAS
-    print("🔄 Step 3/3: Converting CHERAX → BBFAS...")
-    result = convert_cherax_to_bbfas(temp_cherax, gender, f"bbfas_complete_{gender.lower()}.txt")
+    # All three steps run in memory, only the final BBFAS code is written
+    print("🔄 Converting BBFAS → JSON → CHERAX → BBFAS...")
+    result = modules.convert_bbfas_round_trip(code, gender, f"bbfas_complete_{gender.lower()}.txt")
     if result:
         print(f"✅ Complete conversion ({gender}) successful!")
-        print("📁 Generated files :")
-        print(f"   - JSON BBFAS : {temp_json}")
-        print(f"   - JSON CHERAX : {temp_cherax}")
-        print(f"   - BBFAS final : {result}")
-
-    try:
-        os.remove(temp_json)
-        os.remove(temp_cherax)
-    except:
-        pass
+        print(f"📁 Generated file : {result}")
+
+# Subcommand -> module of the modules package whose main(args) runs it (imported only when asked for)
+COMMANDS = {
+    "batch": "batch",
+    "serve": "server",
+    "archive": "archive",
+    "dedup": "dedup",
+    "sync": "sync",
+    "convert": "staged",
+    "convert-pack": "packs",
+    "watch": "watch",
+    "store": "store",
+    "validate": "validate",
+    "verify": "verify",
+}
+
+def run_command(name, args):
+    """Run a subcommand with its arguments; returns its exit code"""
+    import importlib
+
+    return importlib.import_module(f"modules.{COMMANDS[name]}").main(args)
 
 def main():
     """Main function"""
@@ -259,6 +224,9 @@ def main():
         input("\n⏸️  Press Enter to continue...")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(run_command(sys.argv[1], sys.argv[2:]))
+
     try:
         main()
     except KeyboardInterrupt:
@@ -2,102 +2,251 @@ import base64
 import json
 import os
 
+try:
+    from modules.cache import cached_convert, find_identical_output, remember_output
+    from modules.dedup import find_duplicate_output, link_output, remember_outfit
+    from modules.outfit import Outfit
+    from modules.output_naming import ensure_directory, get_unique_filename as allocate_filename, write_output
+    from modules.profiling import stage
+    from modules.validate import check_base64
+except ImportError:
+    from cache import cached_convert, find_identical_output, remember_output
+    from dedup import find_duplicate_output, link_output, remember_outfit
+    from outfit import Outfit
+    from output_naming import ensure_directory, get_unique_filename as allocate_filename, write_output
+    from profiling import stage
+    from validate import check_base64
+
 OUTPUT_DIR = r"src\output\BBFAS"
 
 def create_output_dir():
     """Create the output folder if it does not exist"""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    ensure_directory(OUTPUT_DIR)
 
 def get_unique_filename(base_name, extension):
     """Generate a unique filename"""
-    output_path = os.path.join(OUTPUT_DIR, f"{base_name}.{extension}")
-    if os.path.exists(output_path):
-        i = 1
-        while True:
-            new_path = os.path.join(OUTPUT_DIR, f"{base_name}-{i}.{extension}")
-            if not os.path.exists(new_path):
-                output_path = new_path
-                break
-            i += 1
-    return output_path
+    return allocate_filename(OUTPUT_DIR, base_name, extension)
 
-def bbfas_to_json(code):
-    """Convert a BBFAS code to raw JSON"""
-    try:
-        decoded_data = base64.b64decode(code).decode("utf-8").strip()
-    except Exception as e:
-        print(f"❌ Error: Invalid BBFAS code (base64 decoding failed) - {e}")
+# Section markers of a decoded BBFAS payload -> (section, type)
+SECTION_MARKERS = {
+    "DI": ("Clothes", "Drawable"),
+    "DT": ("Clothes", "Texture"),
+    "Pi": ("Props", "Drawable"),
+    "Pt": ("Props", "Texture"),
+}
+
+def _parse_canonical_payload(decoded_data):
+    """Items of a payload laid out exactly as the converters write it, or None for anything else
+
+    "Item", then DI, DT, Pi and Pt in this order, each holding key/integer line
+    pairs, then "/Item", with no blank lines or padding. Each section is read
+    with slices instead of a line-by-line walk.
+    """
+    if " " in decoded_data or "\t" in decoded_data or "\r" in decoded_data:
         return None
-    
     lines = decoded_data.split("\n")
-    
-    result = {
-        "Code": code,
-        "Item": {
-            "Clothes": {"Drawable": {}, "Texture": {}},
-            "Props": {"Drawable": {}, "Texture": {}}
-        }
+    if lines[0] != "Item" or lines[-1] != "/Item":
+        return None
+
+    items = {}
+    position = 1
+    for marker, (section, item_type) in SECTION_MARKERS.items():
+        if lines[position] != marker:
+            return None
+        try:
+            end = lines.index("/" + marker, position)
+        except ValueError:
+            return None
+        keys = lines[position + 1:end:2]
+        values = lines[position + 2:end:2]
+        if len(keys) != len(values) or not all(key[:1] == "p" for key in keys):
+            return None
+        try:
+            entries = dict(zip(keys, map(int, values)))
+        except ValueError:
+            return None
+        items.setdefault(section, {})[item_type] = entries
+        position = end + 1
+    if position != len(lines) - 1:
+        return None
+    return items
+
+@stage("parse")
+def parse_bbfas_payload(decoded_data):
+    """Walk a decoded BBFAS payload once, pairing every key with the line that follows it
+
+    Returns (items, errors) where errors lists the malformed sequences found.
+    """
+    items = _parse_canonical_payload(decoded_data)
+    if items is not None:
+        return items, []
+
+    items = {
+        "Clothes": {"Drawable": {}, "Texture": {}},
+        "Props": {"Drawable": {}, "Texture": {}}
     }
-    
-    current_section = None
-    current_type = None
-    
-    for line in lines:
+    errors = []
+
+    current = None          # dict receiving the pairs of the open section
+    current_marker = None
+    pending_key = None
+    pending_line = 0
+
+    for line_number, line in enumerate(decoded_data.split("\n"), 1):
         line = line.strip()
         if not line:
             continue
-        
-        if line == "DI":
-            current_section = "Clothes"
-            current_type = "Drawable"
+
+        section = SECTION_MARKERS.get(line)
+        if section is not None:
+            if pending_key is not None:
+                errors.append(f"line {pending_line}: key '{pending_key}' has no value")
+            if current_marker is not None:
+                errors.append(f"line {line_number}: section '{line}' opened before '/{current_marker}'")
+            current = items[section[0]][section[1]]
+            current_marker = line
+            pending_key = None
             continue
-        elif line == "DT":
-            current_section = "Clothes"
-            current_type = "Texture"
+
+        if line.startswith("/"):
+            if pending_key is not None:
+                errors.append(f"line {pending_line}: key '{pending_key}' has no value")
+            if current_marker is not None and line[1:] != current_marker:
+                errors.append(f"line {line_number}: '{line}' closes section '{current_marker}'")
+            current = None
+            current_marker = None
+            pending_key = None
             continue
-        elif line == "Pi":
-            current_section = "Props"
-            current_type = "Drawable"
+
+        # Anything outside a section (e.g. the "Item" wrapper) is not a key/value pair
+        if current is None:
             continue
-        elif line == "Pt":
-            current_section = "Props"
-            current_type = "Texture"
+
+        if pending_key is None:
+            if line.startswith("p"):
+                pending_key = line
+                pending_line = line_number
+            else:
+                errors.append(f"line {line_number}: value '{line}' has no key")
             continue
-        elif line.startswith("/"):
-            current_section = None
-            current_type = None
+
+        if line.startswith("p"):
+            errors.append(f"line {pending_line}: key '{pending_key}' has no value")
+            pending_key = line
+            pending_line = line_number
             continue
-        
-        if current_section and current_type:
-            if line.startswith("p"):
-                key = line
-                value = next((v for v in lines[lines.index(line)+1:] if not v.startswith("p") and not v.isalpha() and not v.startswith("/")), None)
-                if value is not None:
-                    try:
-                        item_id = int(value)
-                    except ValueError:
-                        item_id = value
-                    
-                    result["Item"][current_section][current_type][key] = item_id
-    
-    return result
 
-def convert_bbfas_to_json(code, output_filename=None):
-    """Main function to convert BBFAS to JSON"""
-    create_output_dir()
-    
+        if line.isalpha():
+            errors.append(f"line {line_number}: '{line}' is not a valid value for '{pending_key}'")
+            pending_key = None
+            continue
+
+        try:
+            value = int(line)
+        except ValueError:
+            value = line
+
+        # Positional pairing: a repeated key keeps its last value
+        current[pending_key] = value
+        pending_key = None
+
+    if pending_key is not None:
+        errors.append(f"line {pending_line}: key '{pending_key}' has no value")
+    if current_marker is not None:
+        errors.append(f"section '{current_marker}' is never closed")
+
+    return items, errors
+
+@stage("decode")
+def decode_bbfas_code(code):
+    """Decode the base64 payload of a BBFAS code"""
+    return base64.b64decode(code).decode("utf-8").strip()
+
+def bbfas_to_json(code, strict=False):
+    """Convert a BBFAS code to raw JSON
+
+    Malformed sequences are reported; with strict=True they make the conversion fail.
+    """
+    # Reject what is not base64 before decoding anything
+    rejection = check_base64(code)
+    if rejection:
+        print(f"❌ Error: Invalid BBFAS code {rejection}")
+        return None
+
+    try:
+        decoded_data = decode_bbfas_code(code)
+    except Exception as e:
+        print(f"❌ Error: Invalid BBFAS code (base64 decoding failed) - {e}")
+        return None
+
+    items, errors = parse_bbfas_payload(decoded_data)
+
+    if errors:
+        if strict:
+            print(f"❌ Error: Malformed BBFAS code - {errors[0]}")
+            return None
+        for error in errors:
+            print(f"⚠️  Malformed BBFAS code - {error}")
+
+    return {
+        "Code": code,
+        "Item": items
+    }
+
+def bbfas_to_outfit(code):
+    """Convert a BBFAS code to a compact Outfit"""
     result = bbfas_to_json(code)
-    if result:
-        if not output_filename:
-            output_path = get_unique_filename("bbfas_outfit", "json")
-        else:
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=4, ensure_ascii=False)
-        
-        print(f"✅ BBFAS → JSON conversion successful! File generated: {output_path}")
+    if not result:
+        return None
+    try:
+        return Outfit.from_bbfas_items(result["Item"])
+    except (ValueError, OverflowError) as e:
+        print(f"❌ Error: Invalid BBFAS value - {e}")
+        return None
+
+@stage("serialize")
+def serialize_bbfas_json(result, compact=False):
+    """Text of a BBFAS JSON file"""
+    if compact:
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(result, indent=4, ensure_ascii=False)
+
+def save_bbfas_json(result, output_filename=None, compact=False):
+    """Write a BBFAS JSON result to the output folder (without indentation when compact)"""
+    create_output_dir()
+    content = serialize_bbfas_json(result, compact)
+
+    duplicate = find_duplicate_output(result, "bbfas_json")
+    if duplicate and duplicate.mode == "skip":
+        print(f"♻️  Same outfit already generated: {duplicate.path}")
+        return duplicate.path
+
+    if not output_filename:
+        existing_path = find_identical_output(content)
+        if existing_path:
+            print(f"♻️  Identical file already generated: {existing_path}")
+            return existing_path
+        output_path = get_unique_filename("bbfas_outfit", "json")
+    else:
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+
+    if duplicate and duplicate.mode == "link" and link_output(duplicate.path, output_path):
+        print(f"🔗 Same outfit as {duplicate.path}, linked: {output_path}")
         return output_path
+    if duplicate:
+        print(f"♻️  Same outfit as {duplicate.path}")
+    write_output(output_path, content)
+    remember_output(content, output_path)
+    remember_outfit(result, output_path, "bbfas_json")
+
+    print(f"✅ BBFAS → JSON conversion successful! File generated: {output_path}")
+    return output_path
+
+def convert_bbfas_to_json(code, output_filename=None, compact=False):
+    """Main function to convert BBFAS to JSON"""
+    result = cached_convert("bbfas-json", bbfas_to_json, code)
+    if result:
+        return save_bbfas_json(result, output_filename, compact)
     else:
         print("❌ BBFAS → JSON conversion failed")
         return None
@@ -1,7 +1,23 @@
 import json
-import base64
 import os
 
+try:
+    from modules.cache import cached_convert, find_identical_output, remember_output
+    from modules.dedup import find_duplicate_output, link_output, remember_outfit
+    from modules.json_stream import iter_json_records
+    from modules.outfit import SLOT_INDEX, Outfit
+    from modules.output_naming import ensure_directory, get_unique_filename as allocate_filename, write_output
+    from modules.profiling import stage
+    from modules.validate import check_cherax_json
+except ImportError:
+    from cache import cached_convert, find_identical_output, remember_output
+    from dedup import find_duplicate_output, link_output, remember_outfit
+    from json_stream import iter_json_records
+    from outfit import SLOT_INDEX, Outfit
+    from output_naming import ensure_directory, get_unique_filename as allocate_filename, write_output
+    from profiling import stage
+    from validate import check_cherax_json
+
 # Mapping Cherax components to BBFAS
 CHERAX_TO_BBFAS_MAPPING = {
     # Components (Clothes) - Cherax key -> (BBFAS Drawable, BBFAS Texture)
@@ -28,25 +44,25 @@ CHERAX_TO_BBFAS_MAPPING = {
     "Right Wrist": ("pPi7", "pPt7"),   # Bracelets
 }
 
+# Mapping compiled once into per-section Outfit slots: (Cherax key, Drawable index, Texture index)
+COMPONENT_SLOTS = tuple((cherax_key, SLOT_INDEX[drawable_key], SLOT_INDEX[texture_key])
+                        for cherax_key, (drawable_key, texture_key) in CHERAX_TO_BBFAS_MAPPING.items()
+                        if drawable_key.startswith("pCI"))
+PROP_SLOTS = tuple((cherax_key, SLOT_INDEX[drawable_key], SLOT_INDEX[texture_key])
+                   for cherax_key, (drawable_key, texture_key) in CHERAX_TO_BBFAS_MAPPING.items()
+                   if drawable_key.startswith("pPi"))
+
 OUTPUT_DIR = r"src\output\BBFAS"
 
 def create_output_dir():
     """Create the output folder if it does not exist"""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    ensure_directory(OUTPUT_DIR)
 
 def get_unique_filename(base_name, extension):
     """Generate a unique filename"""
-    output_path = os.path.join(OUTPUT_DIR, f"{base_name}.{extension}")
-    if os.path.exists(output_path):
-        i = 1
-        while True:
-            new_path = os.path.join(OUTPUT_DIR, f"{base_name}-{i}.{extension}")
-            if not os.path.exists(new_path):
-                output_path = new_path
-                break
-            i += 1
-    return output_path
+    return allocate_filename(OUTPUT_DIR, base_name, extension)
 
+@stage("parse")
 def load_json_file(file_path):
     """Load a JSON file"""
     try:
@@ -56,6 +72,32 @@ def load_json_file(file_path):
         print(f"❌ Error loading file: {e}")
         return None
 
+@stage("map")
+def cherax_to_outfit(data):
+    """Read the components and props of a Cherax JSON into an Outfit"""
+    outfit = Outfit(data.get("model"))
+    values = outfit.values
+
+    # pCI0/pCT0 have no Cherax equivalent and are always -1
+    values[SLOT_INDEX["pCI0"]] = -1
+    values[SLOT_INDEX["pCT0"]] = -1
+
+    components = data.get("components", {})
+    for cherax_key, drawable_index, texture_index in COMPONENT_SLOTS:
+        if cherax_key in components:
+            comp_data = components[cherax_key]
+            values[drawable_index] = int(comp_data.get("drawable", -1))
+            values[texture_index] = int(comp_data.get("texture", 0))
+
+    props = data.get("props", {})
+    for cherax_key, drawable_index, texture_index in PROP_SLOTS:
+        if cherax_key in props:
+            prop_data = props[cherax_key]
+            values[drawable_index] = int(prop_data.get("drawable", -1))
+            values[texture_index] = int(prop_data.get("texture", -1))
+
+    return outfit
+
 def cherax_to_bbfas(json_data, gender):
     """Convert a real Cherax JSON to BBFAS code"""
     try:
@@ -63,97 +105,95 @@ def cherax_to_bbfas(json_data, gender):
             data = json.loads(json_data)
         else:
             data = json_data
-        
-        # Build the decoded content
-        lines = ["Item", "DI"]
-        
-        # Clothes Drawable (pCI0-pCI11)
-        components = data.get("components", {})
-        
-        # Add default pCI0
-        lines.extend(["pCI0", "-1"])
-        
-        # Process other components
-        for cherax_key, (drawable_key, texture_key) in CHERAX_TO_BBFAS_MAPPING.items():
-            if drawable_key.startswith("pCI") and cherax_key in components:
-                comp_data = components[cherax_key]
-                drawable_value = comp_data.get("drawable", -1)
-                lines.extend([drawable_key, str(drawable_value)])
-        
-        lines.append("/DI")
-        lines.append("DT")
-        
-        # Clothes Texture (pCT0-pCT11)
-        lines.extend(["pCT0", "-1"])  # Default pCT0
-        
-        for cherax_key, (drawable_key, texture_key) in CHERAX_TO_BBFAS_MAPPING.items():
-            if texture_key.startswith("pCT") and cherax_key in components:
-                comp_data = components[cherax_key]
-                texture_value = comp_data.get("texture", 0)
-                lines.extend([texture_key, str(texture_value)])
-        
-        lines.append("/DT")
-        lines.append("Pi")
-        
-        # Props Drawable (pPi0-pPi7)
-        props = data.get("props", {})
-        
-        for cherax_key, (drawable_key, texture_key) in CHERAX_TO_BBFAS_MAPPING.items():
-            if drawable_key.startswith("pPi") and cherax_key in props:
-                prop_data = props[cherax_key]
-                drawable_value = prop_data.get("drawable", -1)
-                lines.extend([drawable_key, str(drawable_value)])
-        
-        lines.append("/Pi")
-        lines.append("Pt")
-        
-        # Props Texture (pPt0-pPt7)
-        for cherax_key, (drawable_key, texture_key) in CHERAX_TO_BBFAS_MAPPING.items():
-            if texture_key.startswith("pPt") and cherax_key in props:
-                prop_data = props[cherax_key]
-                texture_value = prop_data.get("texture", -1)
-                lines.extend([texture_key, str(texture_value)])
-        
-        lines.extend(["/Pt", "/Item"])
-        
-        # Encode in base64
-        content = "\n".join(lines)
-        encoded_code = base64.b64encode(content.encode("utf-8")).decode("utf-8")
-        
-        return encoded_code
-        
+
+        rejection = check_cherax_json(data)
+        if rejection:
+            print(f"❌ Error: Invalid Cherax JSON {rejection}")
+            return None
+        return cherax_to_outfit(data).to_bbfas_code()
+
     except Exception as e:
         print(f"❌ Error during conversion: {e}")
         return None
 
+def save_bbfas_code(result, gender, output_filename=None):
+    """Write a BBFAS code to the output folder"""
+    create_output_dir()
+
+    duplicate = find_duplicate_output(result, "bbfas_code")
+    if duplicate and duplicate.mode == "skip":
+        print(f"♻️  Same outfit already generated: {duplicate.path}")
+        return duplicate.path
+
+    if not output_filename:
+        existing_path = find_identical_output(result)
+        if existing_path:
+            print(f"♻️  Identical file already generated: {existing_path}")
+            return existing_path
+        output_path = get_unique_filename(f"bbfas_outfit_{gender.lower()}", "txt")
+    else:
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+
+    if duplicate and duplicate.mode == "link" and link_output(duplicate.path, output_path):
+        print(f"🔗 Same outfit as {duplicate.path}, linked: {output_path}")
+        return output_path
+    if duplicate:
+        print(f"♻️  Same outfit as {duplicate.path}")
+    write_output(output_path, result)
+    remember_output(result, output_path)
+    remember_outfit(result, output_path, "bbfas_code")
+
+    print(f"✅ CHERAX → BBFAS conversion successful! Generated code: {output_path}")
+    print(f"📋 BBFAS Code ({gender}):")
+    print(result)
+    return output_path
+
 def convert_cherax_to_bbfas(input_file, gender, output_filename=None):
     """Main function to convert Cherax to BBFAS"""
-    create_output_dir()
-    
     # Load the JSON file
     json_data = load_json_file(input_file)
     if not json_data:
         return None
-    
+
     # Convert to BBFAS
-    result = cherax_to_bbfas(json_data, gender)
+    result = cached_convert("cherax-bbfas", cherax_to_bbfas, json_data, gender)
     if result:
-        if not output_filename:
-            output_path = get_unique_filename(f"bbfas_outfit_{gender.lower()}", "txt")
-        else:
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(result)
-        
-        print(f"✅ CHERAX → BBFAS conversion successful! Generated code: {output_path}")
-        print(f"📋 BBFAS Code ({gender}):")
-        print(result)
-        return output_path
+        return save_bbfas_code(result, gender, output_filename)
     else:
         print("❌ CHERAX → BBFAS conversion failed")
         return None
 
+def convert_cherax_stream_to_bbfas(input_file, gender, output_filename=None):
+    """Convert a stream of Cherax JSON records (JSON lines or a JSON array) record by record
+
+    The BBFAS codes are written one per line to a single output file.
+    """
+    create_output_dir()
+
+    if not output_filename:
+        output_path = get_unique_filename(f"bbfas_outfits_{gender.lower()}", "txt")
+    else:
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+
+    converted = 0
+    failed = 0
+    try:
+        with open(output_path, "w", encoding="utf-8", newline="\n") as f:
+            for number, record in enumerate(iter_json_records(input_file), 1):
+                result = cached_convert("cherax-bbfas", cherax_to_bbfas, record, gender)
+                if result:
+                    f.write(result + "\n")
+                    converted += 1
+                else:
+                    print(f"❌ Record {number}: CHERAX → BBFAS conversion failed")
+                    failed += 1
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading stream: {e}")
+        return None
+
+    print(f"✅ CHERAX stream → BBFAS ({gender}): {converted} converted, {failed} failed. Generated file: {output_path}")
+    return output_path
+
 if __name__ == "__main__":
     print("🔄 REAL CHERAX → BBFAS CONVERTER")
     print("=" * 40)
@@ -1,5 +1,23 @@
 import json
 import os
+import re
+
+try:
+    from modules.cache import cached_convert, find_identical_output, get_active_cache, remember_output
+    from modules.dedup import find_duplicate_output, link_output, remember_outfit
+    from modules.json_stream import JsonRecordWriter, iter_json_records
+    from modules.outfit import MISSING, SLOT_INDEX, Outfit
+    from modules.output_naming import ensure_directory, get_unique_filename as allocate_filename, write_output
+    from modules.profiling import stage
+    from modules.validate import check_bbfas_json
+except ImportError:
+    from cache import cached_convert, find_identical_output, get_active_cache, remember_output
+    from dedup import find_duplicate_output, link_output, remember_outfit
+    from json_stream import JsonRecordWriter, iter_json_records
+    from outfit import MISSING, SLOT_INDEX, Outfit
+    from output_naming import ensure_directory, get_unique_filename as allocate_filename, write_output
+    from profiling import stage
+    from validate import check_bbfas_json
 
 # Mapping of BBFAS components to Cherax
 BBFAS_TO_CHERAX_MAPPING = {
@@ -28,25 +46,30 @@ BBFAS_TO_CHERAX_MAPPING = {
     "pPi7": "Right Wrist",  # Bracelets
 }
 
+# Mapping compiled once into per-section Outfit slots: (Drawable index, Texture index, Cherax key)
+COMPONENT_SLOTS = tuple((SLOT_INDEX[bbfas_key], SLOT_INDEX["pCT" + bbfas_key[3:]], cherax_key)
+                        for bbfas_key, cherax_key in BBFAS_TO_CHERAX_MAPPING.items()
+                        if cherax_key and bbfas_key.startswith("pCI"))
+PROP_SLOTS = tuple((SLOT_INDEX[bbfas_key], SLOT_INDEX["pPt" + bbfas_key[3:]], cherax_key)
+                   for bbfas_key, cherax_key in BBFAS_TO_CHERAX_MAPPING.items()
+                   if cherax_key and bbfas_key.startswith("pPi"))
+
+MODELS = {
+    "MALE": 1885233650,    # mp_m_freemode_01
+    "FEMALE": 2627665880   # mp_f_freemode_01
+}
+
 OUTPUT_DIR = r"src\output\CHERAX"
 
 def create_output_dir():
     """Create the output directory if it doesn't exist"""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    ensure_directory(OUTPUT_DIR)
 
 def get_unique_filename(base_name, extension):
     """Generate a unique filename"""
-    output_path = os.path.join(OUTPUT_DIR, f"{base_name}.{extension}")
-    if os.path.exists(output_path):
-        i = 1
-        while True:
-            new_path = os.path.join(OUTPUT_DIR, f"{base_name}-{i}.{extension}")
-            if not os.path.exists(new_path):
-                output_path = new_path
-                break
-            i += 1
-    return output_path
+    return allocate_filename(OUTPUT_DIR, base_name, extension)
 
+@stage("parse")
 def load_json_file(file_path):
     """Load a JSON file"""
     try:
@@ -56,142 +79,238 @@ def load_json_file(file_path):
         print(f"❌ Error loading file: {e}")
         return None
 
-def json_to_cherax(json_data, gender="MALE"):
-    """Convert BBFAS JSON to Cherax format"""
-    try:
-        if isinstance(json_data, str):
-            data = json.loads(json_data)
-        else:
-            data = json_data
-
-        models = {
-            "MALE": 1885233650,    # mp_m_freemode_01
-            "FEMALE": 2627665880   # mp_f_freemode_01
+@stage("map")
+def outfit_to_cherax(outfit, gender="MALE"):
+    """Serialize an Outfit to Cherax format, filling undefined slots with the defaults"""
+    cherax_outfit = {
+        "format": "Cherax Entity",
+        "type": 2,
+        "model": MODELS.get(gender, MODELS["MALE"]),
+        "baseFlags": 66871,
+        "components": {},
+        "props": {},
+        "face_features": {
+            "Nose Width": 0.0,
+            "Nose Peak": 0.0,
+            "Nose Length": 0.0,
+            "Nose Bone Curveness": 0.0,
+            "Nose Tip": 0.0,
+            "Nose Bone Twist": 0.0,
+            "Eyebrow Height": 0.0,
+            "Eyebrow Indent": 0.0,
+            "Cheek Bones": 0.0,
+            "Cheek Sideways Bone Size": 0.0,
+            "Cheek Bones Width": 0.0,
+            "Eye Opening": 0.0,
+            "Lip Thickness": 0.0,
+            "Jaw Bone Width": 0.0,
+            "Jaw Bone Shape": 0.0,
+            "Chin Bone": 0.0,
+            "Chin Bone Length": 0.0,
+            "Chin Bone Shape": 0.0,
+            "Chin Hole": 0.0,
+            "Neck Thickness": 0.0
+        },
+        "primary_hair_tint": 255,
+        "secondary_hair_tint": 255
+    }
+
+    values = outfit.values
+
+    # Map BBFAS clothes components to Cherax format
+    components = cherax_outfit["components"]
+    for drawable_index, texture_index, cherax_key in COMPONENT_SLOTS:
+        drawable_value = values[drawable_index]
+        texture_value = values[texture_index]
+        components[cherax_key] = {
+            "drawable": -1 if drawable_value == MISSING else drawable_value,
+            "texture": 0 if texture_value == MISSING else texture_value,
+            "palette": 0
         }
 
-        cherax_outfit = {
-            "format": "Cherax Entity",
-            "type": 2,
-            "model": models.get(gender, models["MALE"]),
-            "baseFlags": 66871,
-            "components": {},
-            "props": {},
-            "face_features": {
-                "Nose Width": 0.0,
-                "Nose Peak": 0.0,
-                "Nose Length": 0.0,
-                "Nose Bone Curveness": 0.0,
-                "Nose Tip": 0.0,
-                "Nose Bone Twist": 0.0,
-                "Eyebrow Height": 0.0,
-                "Eyebrow Indent": 0.0,
-                "Cheek Bones": 0.0,
-                "Cheek Sideways Bone Size": 0.0,
-                "Cheek Bones Width": 0.0,
-                "Eye Opening": 0.0,
-                "Lip Thickness": 0.0,
-                "Jaw Bone Width": 0.0,
-                "Jaw Bone Shape": 0.0,
-                "Chin Bone": 0.0,
-                "Chin Bone Length": 0.0,
-                "Chin Bone Shape": 0.0,
-                "Chin Hole": 0.0,
-                "Neck Thickness": 0.0
-            },
-            "primary_hair_tint": 255,
-            "secondary_hair_tint": 255
+    # Map BBFAS props components to Cherax format
+    props = cherax_outfit["props"]
+    for drawable_index, texture_index, cherax_key in PROP_SLOTS:
+        drawable_value = values[drawable_index]
+        texture_value = values[texture_index]
+        props[cherax_key] = {
+            "drawable": -1 if drawable_value == MISSING else drawable_value,
+            "texture": -1 if texture_value == MISSING else texture_value
         }
 
-        clothes_drawable = data.get("Item", {}).get("Clothes", {}).get("Drawable", {})
-        clothes_texture = data.get("Item", {}).get("Clothes", {}).get("Texture", {})
-
-        # Map BBFAS clothes components to Cherax format
-        for bbfas_key, cherax_key in BBFAS_TO_CHERAX_MAPPING.items():
-            if cherax_key and bbfas_key.startswith("pCI"):
-                drawable_value = clothes_drawable.get(bbfas_key, -1)
-                texture_key = bbfas_key.replace("pCI", "pCT")
-                texture_value = clothes_texture.get(texture_key, 0)
-
-                if isinstance(drawable_value, dict):
-                    drawable_value = drawable_value.get("ID", -1)
-                if isinstance(texture_value, dict):
-                    texture_value = texture_value.get("ID", 0)
-
-                cherax_outfit["components"][cherax_key] = {
-                    "drawable": drawable_value,
-                    "texture": texture_value,
-                    "palette": 0
-                }
-
-        props_drawable = data.get("Item", {}).get("Props", {}).get("Drawable", {})
-        props_texture = data.get("Item", {}).get("Props", {}).get("Texture", {})
-
-        # Map BBFAS props components to Cherax format
-        for bbfas_key, cherax_key in BBFAS_TO_CHERAX_MAPPING.items():
-            if cherax_key and bbfas_key.startswith("pPi"):
-                drawable_value = props_drawable.get(bbfas_key, -1)
-                texture_key = bbfas_key.replace("pPi", "pPt")
-                texture_value = props_texture.get(texture_key, -1)
-
-                if isinstance(drawable_value, dict):
-                    drawable_value = drawable_value.get("ID", -1)
-                if isinstance(texture_value, dict):
-                    texture_value = texture_value.get("ID", -1)
-
-                cherax_outfit["props"][cherax_key] = {
-                    "drawable": drawable_value,
-                    "texture": texture_value
-                }
-
-        # Add default components if missing
-        default_components = {
-            "Head": {"drawable": 0, "texture": 0, "palette": 0}
-        }
+    # Add default components if missing
+    default_components = {
+        "Head": {"drawable": 0, "texture": 0, "palette": 0}
+    }
 
-        for comp_name, comp_data in default_components.items():
-            if comp_name not in cherax_outfit["components"]:
-                cherax_outfit["components"][comp_name] = comp_data
+    for comp_name, comp_data in default_components.items():
+        if comp_name not in components:
+            components[comp_name] = comp_data
 
-        # Add default props if missing
-        default_props = {
-            "Hip": {"drawable": -1, "texture": -1}
-        }
+    # Add default props if missing
+    default_props = {
+        "Hip": {"drawable": -1, "texture": -1}
+    }
 
-        for prop_name, prop_data in default_props.items():
-            if prop_name not in cherax_outfit["props"]:
-                cherax_outfit["props"][prop_name] = prop_data
+    for prop_name, prop_data in default_props.items():
+        if prop_name not in props:
+            props[prop_name] = prop_data
 
-        return cherax_outfit
+    return cherax_outfit
+
+def json_to_outfit(json_data):
+    """Outfit of a BBFAS JSON (object or text), or None after printing the error"""
+    try:
+        if isinstance(json_data, str):
+            data = json.loads(json_data)
+        else:
+            data = json_data
+
+        rejection = check_bbfas_json(data)
+        if rejection:
+            print(f"❌ Error: Invalid BBFAS JSON {rejection}")
+            return None
+        return Outfit.from_bbfas_items(data["Item"])
 
     except Exception as e:
         print(f"❌ Error during conversion: {e}")
         return None
 
-def convert_json_to_cherax(input_file, gender="MALE", output_filename=None):
-    """Convert BBFAS JSON to Cherax format and save to file"""
+def json_to_cherax(json_data, gender="MALE"):
+    """Convert BBFAS JSON to Cherax format"""
+    outfit = json_to_outfit(json_data)
+    if outfit is None:
+        return None
+    return outfit_to_cherax(outfit, gender)
+
+@stage("serialize")
+def serialize_cherax_json(result, compact=False):
+    """Text of a Cherax JSON file"""
+    if compact:
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(result, indent=2, ensure_ascii=False)
+
+# (gender, compact) -> (%-template of the whole Cherax file, (Outfit slot, default) of each %d field)
+_cherax_templates = {}
+
+def _cherax_template(gender, compact):
+    """Serialize the constant parts of a Cherax file once, leaving a %d field per drawable/texture value"""
+    template = _cherax_templates.get((gender, compact))
+    if template is not None:
+        return template
+
+    cherax_outfit = outfit_to_cherax(Outfit(), gender)
+    fields = []
+    for section, slots, texture_default in ((cherax_outfit["components"], COMPONENT_SLOTS, 0),
+                                            (cherax_outfit["props"], PROP_SLOTS, -1)):
+        for drawable_index, texture_index, cherax_key in slots:
+            section[cherax_key]["drawable"] = f"@{len(fields)}@"
+            fields.append((drawable_index, -1))
+            section[cherax_key]["texture"] = f"@{len(fields)}@"
+            fields.append((texture_index, texture_default))
+
+    text = serialize_cherax_json(cherax_outfit, compact).replace("%", "%%")
+    markers = re.findall(r'"@(\d+)@"', text)
+    assert markers == [str(number) for number in range(len(fields))], "Cherax fields out of order"
+    template = (re.sub(r'"@\d+@"', "%d", text), tuple(fields))
+    _cherax_templates[(gender, compact)] = template
+    return template
+
+@stage("serialize")
+def outfit_to_cherax_json(outfit, gender="MALE", compact=False):
+    """Text of the Cherax file of an Outfit, byte-identical to serialize_cherax_json(outfit_to_cherax(outfit, gender), compact)
+
+    Only the drawable/texture values are formatted; everything else comes from
+    a template serialized once per gender.
+    """
+    template, fields = _cherax_template(gender if gender in MODELS else "MALE", compact)
+    values = outfit.values
+    return template % tuple([default if values[index] == MISSING else values[index] for index, default in fields])
+
+def save_cherax_json(result, gender="MALE", output_filename=None, compact=False):
+    """Write a Cherax outfit (or an Outfit, in Cherax format) to the output directory (without indentation when compact)"""
     create_output_dir()
+    if isinstance(result, Outfit):
+        content = outfit_to_cherax_json(result, gender, compact)
+        # The outfit as the file describes it, model included (for dedup)
+        result = Outfit(MODELS.get(gender, MODELS["MALE"]), result.values)
+    else:
+        content = serialize_cherax_json(result, compact)
+
+    duplicate = find_duplicate_output(result, "cherax_json")
+    if duplicate and duplicate.mode == "skip":
+        print(f"♻️  Same outfit already generated: {duplicate.path}")
+        return duplicate.path
+
+    if not output_filename:
+        existing_path = find_identical_output(content)
+        if existing_path:
+            print(f"♻️  Identical file already generated: {existing_path}")
+            return existing_path
+        output_path = get_unique_filename(f"cherax_outfit_{gender.lower()}", "json")
+    else:
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+
+    if duplicate and duplicate.mode == "link" and link_output(duplicate.path, output_path):
+        print(f"🔗 Same outfit as {duplicate.path}, linked: {output_path}")
+        return output_path
+    if duplicate:
+        print(f"♻️  Same outfit as {duplicate.path}")
+    write_output(output_path, content)
+    remember_output(content, output_path)
+    remember_outfit(result, output_path, "cherax_json")
 
+    print(f"✅ JSON conversion → Cherax ({gender}) successful! Generated file: {output_path}")
+    return output_path
+
+def convert_json_to_cherax(input_file, gender="MALE", output_filename=None, compact=False):
+    """Convert BBFAS JSON to Cherax format and save to file"""
     json_data = load_json_file(input_file)
     if not json_data:
         return None
 
-    # Convert to Cherax
-    result = json_to_cherax(json_data, gender)
+    # Convert to Cherax: straight from the Outfit to the file text, unless conversions are cached
+    if get_active_cache() is None:
+        result = json_to_outfit(json_data)
+    else:
+        result = cached_convert("json-cherax", json_to_cherax, json_data, gender)
     if result:
-        if not output_filename:
-            output_path = get_unique_filename(f"cherax_outfit_{gender.lower()}", "json")
-        else:
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
+        return save_cherax_json(result, gender, output_filename, compact)
+    else:
+        print("❌ Error during JSON → CHERAX conversion")
+        return None
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+def convert_json_stream_to_cherax(input_file, gender="MALE", output_filename=None, as_array=False):
+    """Convert a stream of BBFAS JSON records (JSON lines or a JSON array) record by record
 
-        print(f"✅ JSON conversion → Cherax ({gender}) successful! Generated file: {output_path}")
-        return output_path
+    Results are written compact to one output file, as JSON lines or as a JSON array.
+    """
+    create_output_dir()
+
+    if not output_filename:
+        output_path = get_unique_filename(f"cherax_outfits_{gender.lower()}", "json" if as_array else "jsonl")
     else:
-        print("❌ Error during JSON → CHERAX conversion")
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+
+    converted = 0
+    failed = 0
+    try:
+        with JsonRecordWriter(output_path, as_array) as writer:
+            for number, record in enumerate(iter_json_records(input_file), 1):
+                result = cached_convert("json-cherax", json_to_cherax, record, gender)
+                if result:
+                    writer.write(result)
+                    converted += 1
+                else:
+                    print(f"❌ Record {number}: JSON → CHERAX conversion failed")
+                    failed += 1
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading stream: {e}")
         return None
 
+    print(f"✅ JSON stream → Cherax ({gender}): {converted} converted, {failed} failed. Generated file: {output_path}")
+    return output_path
+
 if __name__ == "__main__":
     print("🔄 JSON BBFAS converter → Cherax ")
     print("=" * 40)
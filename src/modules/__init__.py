@@ -0,0 +1,85 @@
+"""Outfits converter package
+
+The converter functions can be imported from here directly, e.g.
+`from modules import convert_cherax_to_bbfas`. Each converter module is only
+loaded the first time one of its functions is used.
+"""
+
+import importlib
+import os
+import sys
+
+MODULES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Converter modules (hyphen-named files) -> file name
+CONVERTER_FILES = {
+    "bbfas_json": "BBFAS-JSON.py",
+    "json_cherax": "JSON-CHERAX.py",
+    "cherax_bbfas": "CHERAX-BBFAS.py",
+}
+
+# Public name -> module providing it
+_EXPORTS = {
+    "parse_bbfas_payload": "bbfas_json",
+    "bbfas_to_json": "bbfas_json",
+    "bbfas_to_outfit": "bbfas_json",
+    "save_bbfas_json": "bbfas_json",
+    "convert_bbfas_to_json": "bbfas_json",
+
+    "json_to_cherax": "json_cherax",
+    "outfit_to_cherax": "json_cherax",
+    "save_cherax_json": "json_cherax",
+    "convert_json_to_cherax": "json_cherax",
+    "convert_json_stream_to_cherax": "json_cherax",
+
+    "cherax_to_bbfas": "cherax_bbfas",
+    "cherax_to_outfit": "cherax_bbfas",
+    "save_bbfas_code": "cherax_bbfas",
+    "convert_cherax_to_bbfas": "cherax_bbfas",
+    "convert_cherax_stream_to_bbfas": "cherax_bbfas",
+
+    "DIRECTIONS": "pipeline",
+    "convert": "pipeline",
+    "bbfas_to_cherax": "pipeline",
+    "bbfas_round_trip": "pipeline",
+    "convert_bbfas_to_cherax": "pipeline",
+    "convert_bbfas_round_trip": "pipeline",
+
+    "Outfit": "outfit",
+}
+
+__all__ = ["load_converter"] + list(_EXPORTS)
+
+def load_converter(module_name):
+    """Load one of the hyphen-named converter modules (only once per process)"""
+    module = sys.modules.get(module_name)
+    if module is None:
+        import importlib.util
+
+        file_path = os.path.join(MODULES_DIR, CONVERTER_FILES[module_name])
+        spec = importlib.util.spec_from_file_location(module_name, file_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+    return module
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    if module_name in CONVERTER_FILES:
+        module = load_converter(module_name)
+    else:
+        module = importlib.import_module(f"{__name__}.{module_name}")
+
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
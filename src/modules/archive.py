@@ -0,0 +1,355 @@
+"""Packed binary outfit archive (.ofa)
+
+One file holds any number of outfits as fixed-width records, read back through
+mmap with random access by index:
+
+    header   HEADER: magic, version, record size, slot count, flags, record count, index offset
+    records  RECORD per outfit: model hash (0 = none) then the 40 slot values
+             (int32, SLOT_KEYS order, MISSING for undefined slots)
+    index    (count + 1) uint64 offsets into the name table, then the UTF-8 names
+
+Everything is little-endian. Cherax palettes are not stored: the Outfit model
+does not carry them and the converters always write 0.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from . import load_converter
+from .outfit import SLOT_COUNT, Outfit
+
+MAGIC = b"OUTFITS\0"
+VERSION = 2   # 1 stored the slot values as int16
+EXTENSION = ".ofa"
+HEADER = struct.Struct("<8sHHHHQQ")
+RECORD = struct.Struct(f"<I{SLOT_COUNT}i")
+INDEX_ENTRY = struct.Struct("<Q")
+NO_MODEL = 0
+MAX_MODEL = 0xFFFFFFFF
+
+_MODEL = struct.Struct("<I")   # first field of a record, the slot values follow it
+_VALUES_OFFSET = _MODEL.size
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+def _model_hash(model):
+    """Stored form of Outfit.model: an unsigned 32-bit hash, 0 when there is none"""
+    if model is None:
+        return NO_MODEL
+    if isinstance(model, bool) or not isinstance(model, int) or not NO_MODEL < model <= MAX_MODEL:
+        raise ValueError(f"Model must be a 32-bit model hash, got {model!r}")
+    return model
+
+class ArchiveWriter:
+    """Write outfits to an archive; use as a context manager or call close()
+
+    Records are streamed to a temporary file next to the target, which replaces
+    the target on close, so readers never see a half-written archive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._names = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._temp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = open(self._temp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, SLOT_COUNT, 0, 0, 0))
+
+    def add(self, outfit, name=None):
+        """Append an Outfit; returns its index"""
+        values = outfit.values
+        if not _NATIVE_LITTLE_ENDIAN:
+            values = array("i", values)
+            values.byteswap()
+        self._file.write(_MODEL.pack(_model_hash(outfit.model)) + values.tobytes())
+        self._names.append(name or "")
+        self.count += 1
+        return self.count - 1
+
+    def add_bbfas_code(self, code, name=None):
+        """Append the outfit of a BBFAS code; returns its index, or None if the code is invalid"""
+        outfit = load_converter("bbfas_json").bbfas_to_outfit(code)
+        return None if outfit is None else self.add(outfit, name)
+
+    def add_bbfas_json(self, data, name=None):
+        """Append the outfit of a BBFAS JSON; returns its index, or None if it is invalid"""
+        try:
+            outfit = Outfit.from_bbfas_items(data.get("Item", {}))
+        except (AttributeError, TypeError, ValueError, OverflowError) as e:
+            print(f"❌ Error during conversion: {e}")
+            return None
+        return self.add(outfit, name)
+
+    def add_cherax(self, data, name=None):
+        """Append the outfit of a Cherax JSON; returns its index, or None if it is invalid"""
+        try:
+            outfit = load_converter("cherax_bbfas").cherax_to_outfit(data)
+            return self.add(outfit, name)
+        except (AttributeError, TypeError, ValueError, OverflowError) as e:
+            print(f"❌ Error during conversion: {e}")
+            return None
+
+    def add_record(self, data, name=None):
+        """Append a BBFAS code, BBFAS JSON or Cherax JSON, telling them apart by their shape"""
+        if isinstance(data, str) and not data.lstrip().startswith("{"):
+            return self.add_bbfas_code(data.strip(), name)
+        if isinstance(data, str):
+            import json
+
+            try:
+                data = json.loads(data)
+            except ValueError as e:
+                print(f"❌ Invalid JSON: {e}")
+                return None
+        if isinstance(data, dict) and "Item" in data:
+            return self.add_bbfas_json(data, name)
+        return self.add_cherax(data, name)
+
+    def close(self):
+        """Write the name index and the final header, then move the archive into place"""
+        if self._file is None:
+            return
+        index_offset = self._file.tell()
+        names = [name.encode("utf-8") for name in self._names]
+        offset = 0
+        offsets = [0]
+        for name in names:
+            offset += len(name)
+            offsets.append(offset)
+        self._file.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        self._file.write(b"".join(names))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, SLOT_COUNT, 0, self.count, index_offset))
+        self._file.close()
+        self._file = None
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        """Drop the archive being written"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class ArchiveReader:
+    """Memory-mapped archive with random access by index
+
+    values(i) is a zero-copy view of a record's slots; outfit(i) copies them into
+    an Outfit. Cherax JSON and BBFAS codes are only built when asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path} is not an outfit archive (file too short)")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, version, record_size, slot_count, _, count, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an outfit archive")
+        if version != VERSION or record_size != RECORD.size or slot_count != SLOT_COUNT:
+            self.close()
+            raise ValueError(f"{path}: unsupported archive version {version} ({slot_count} slots, {record_size}-byte records)")
+        names_offset = index_offset + (count + 1) * INDEX_ENTRY.size
+        if index_offset != HEADER.size + count * RECORD.size or names_offset > size:
+            self.close()
+            raise ValueError(f"{path} is truncated or corrupted")
+        self.count = count
+        self._index_offset = index_offset
+        self._names_offset = names_offset
+
+    def __len__(self):
+        return self.count
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("archive index out of range")
+        return index
+
+    def _record_offset(self, index):
+        return HEADER.size + self._check_index(index) * RECORD.size
+
+    def model(self, index):
+        """Model hash of a record, or None"""
+        model = _MODEL.unpack_from(self._map, self._record_offset(index))[0]
+        return None if model == NO_MODEL else model
+
+    def values(self, index):
+        """The 40 slot values of a record as a read-only int32 memoryview into the archive"""
+        start = self._record_offset(index) + _VALUES_OFFSET
+        raw = self._view[start:start + RECORD.size - _VALUES_OFFSET]
+        if _NATIVE_LITTLE_ENDIAN:
+            return raw.cast("i")
+        values = array("i", raw.tobytes())
+        values.byteswap()
+        return memoryview(values)
+
+    def name(self, index):
+        """Name the record was added with ("" if none)"""
+        index = self._check_index(index)
+        start, end = struct.unpack_from("<2Q", self._map, self._index_offset + index * INDEX_ENTRY.size)
+        return bytes(self._view[self._names_offset + start:self._names_offset + end]).decode("utf-8")
+
+    def outfit(self, index):
+        """Outfit of a record"""
+        return Outfit(self.model(index), self.values(index))
+
+    __getitem__ = outfit
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.outfit(index)
+
+    def gender(self, index, default="MALE"):
+        """Gender of a record from its model hash, default when the model is unknown"""
+        model = self.model(index)
+        for gender, model_hash in load_converter("json_cherax").MODELS.items():
+            if model == model_hash:
+                return gender
+        return default
+
+    def to_cherax(self, index, gender=None):
+        """Cherax JSON of a record, for its model's gender unless one is given"""
+        return load_converter("json_cherax").outfit_to_cherax(self.outfit(index), gender or self.gender(index))
+
+    def to_cherax_json(self, index, gender=None, compact=False):
+        """Text of the Cherax JSON file of a record, from the pre-serialized template"""
+        return load_converter("json_cherax").outfit_to_cherax_json(self.outfit(index), gender or self.gender(index), compact)
+
+    def to_bbfas_code(self, index):
+        """BBFAS code of a record"""
+        return self.outfit(index).to_bbfas_code()
+
+    def matrix(self):
+        """(count, 40) int32 NumPy view of every record's slots, without copying (needs NumPy)"""
+        import numpy as np
+
+        records = np.ndarray((self.count,), dtype=np.dtype([("model", "<u4"), ("values", "<i4", (SLOT_COUNT,))]),
+                             buffer=self._map, offset=HEADER.size)
+        return records["values"]
+
+    def close(self):
+        """Unmap the archive
+
+        Raises BufferError while views from values() or matrix() are still in
+        use: the archive stays open and usable until they are released and
+        close() is called again.
+        """
+        if self._map is None:
+            return
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError as e:
+            self._view = memoryview(self._map)
+            raise BufferError(f"{self.path}: views of values() or matrix() are still in use, release them before closing the archive") from e
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def main(args):
+    """Archive entry point: python main.py archive pack|export|info ARCHIVE"""
+    import argparse
+
+    from . import json_stream, parallel
+    from .cli import close_stream, open_output
+
+    parser = argparse.ArgumentParser(prog="main.py archive", description="Pack outfits into a binary archive and export them back")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack_parser = commands.add_parser("pack", help="convert outfits into a new archive")
+    pack_parser.add_argument("archive", help=f"archive to write (*{EXTENSION})")
+    pack_parser.add_argument("-i", "--input", default="-", help="BBFAS codes (one per line), JSON lines or a JSON array of BBFAS / Cherax outfits, or a directory of input files (default: stdin)")
+    export_parser = commands.add_parser("export", help="write outfits of an archive as Cherax JSON or BBFAS codes")
+    export_parser.add_argument("archive")
+    export_parser.add_argument("--to", required=True, choices=["cherax", "bbfas"])
+    export_parser.add_argument("--index", type=int, action="append", help="record to export, may be repeated (default: all)")
+    export_parser.add_argument("-o", "--output", default="-", help="output file, one result per line (default: stdout)")
+    export_parser.add_argument("--json-array", action="store_true", help="write Cherax outfits as a single JSON array instead of JSON lines")
+    export_parser.add_argument("-g", "--gender", type=str.upper, choices=["MALE", "FEMALE"], help="Cherax model (default: from each record, else MALE)")
+    info_parser = commands.add_parser("info", help="show the header and first records of an archive")
+    info_parser.add_argument("archive")
+    options = parser.parse_args(args)
+
+    if options.command == "pack":
+        from_files = options.input != "-" and os.path.isdir(options.input)
+        if from_files:
+            items = parallel.iter_input_files(options.input)
+        else:
+            items = json_stream.iter_json_records(sys.stdin if options.input == "-" else options.input)
+
+        failed = 0
+        try:
+            with ArchiveWriter(options.archive) as writer:
+                for number, item in enumerate(items, 1):
+                    source = item if from_files else f"Record {number}"
+                    index = None
+                    try:
+                        record, name = (parallel.read_input_file(item), os.path.splitext(os.path.basename(item))[0]) if from_files else (item, None)
+                    except (OSError, UnicodeDecodeError) as e:
+                        error = f"Error loading file: {e}"
+                    else:
+                        index, error = parallel.capture_messages(writer.add_record, record, name)
+                    if index is None:
+                        print(f"❌ {source}: {error or 'conversion failed'}", file=sys.stderr)
+                        failed += 1
+        except (OSError, ValueError) as e:
+            print(f"❌ Archive error: {e}", file=sys.stderr)
+            return 1
+        print(f"📦 Packed {writer.count} outfits into {options.archive} ({os.path.getsize(options.archive)} bytes), {failed} failed", file=sys.stderr)
+        return 1 if failed else 0
+
+    try:
+        reader = ArchiveReader(options.archive)
+    except (OSError, ValueError) as e:
+        print(f"❌ Archive error: {e}", file=sys.stderr)
+        return 1
+
+    with reader:
+        if options.command == "info":
+            print(f"📦 {options.archive}: {len(reader)} outfits, {RECORD.size}-byte records, format version {VERSION}")
+            for index in range(min(len(reader), 10)):
+                print(f"   {index:>6}  {reader.name(index) or '-':<24} model {reader.model(index) or '-'}")
+            return 0
+
+        indexes = options.index if options.index else range(len(reader))
+        output_stream = open_output(options.output)
+        try:
+            json_writer = json_stream.JsonRecordWriter(output_stream, options.json_array) if options.to == "cherax" else None
+            for index in indexes:
+                try:
+                    if json_writer is not None:
+                        json_writer.write_text(reader.to_cherax_json(index, options.gender, compact=True))
+                    else:
+                        output_stream.write(reader.to_bbfas_code(index) + "\n")
+                except IndexError:
+                    print(f"❌ Record {index}: not in the archive ({len(reader)} records)", file=sys.stderr)
+                    return 1
+            if json_writer is not None:
+                json_writer.close()
+        finally:
+            close_stream(output_stream)
+    return 0
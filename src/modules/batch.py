@@ -0,0 +1,120 @@
+"""Batch mode: convert newline-delimited outfits (or a folder of input files) without the menu
+
+    python main.py batch DIRECTION [-i INPUT] [-o OUTPUT] [-g GENDER]
+
+Records are read as a stream, converted by parallel.convert_many and written
+one result per line (or as a JSON array), so memory stays flat whatever the
+number of records.
+"""
+
+import os
+import sys
+
+from . import cache, dedup, json_stream, parallel, pipeline
+from .cli import add_gender_argument, add_profile_arguments, close_stream, enable_profiling, iter_stream_records, open_input, open_output
+
+def run_batch(direction, records, output_stream, gender="MALE", workers=1, chunk_size=None, ordered=True, from_files=False, as_array=False, dedup_mode=None, dedup_index=None):
+    """Convert records (or input files when from_files=True) and stream the results to output_stream
+
+    JSON results are written compact, one per line or as a JSON array with as_array=True.
+    With dedup_mode "skip" or "report", results describing an outfit already seen in this
+    run (or indexed in dedup_index) are left out or only reported.
+    Returns (converted, failed, duplicates) counts.
+    """
+    json_writer = None
+    if pipeline.DIRECTIONS[direction][1] == "json":
+        json_writer = json_stream.JsonRecordWriter(output_stream, as_array)
+    converted = 0
+    failed = 0
+    duplicates = 0
+    seen = {}   # dedup key -> first record with that outfit
+
+    for index, item, result, error in parallel.convert_many(direction, records, gender, workers, chunk_size or parallel.DEFAULT_CHUNK_SIZE, ordered, from_files):
+        source = item if from_files else f"Record {index + 1}"
+        if result and dedup_mode:
+            key = dedup_index.key(result) if dedup_index else dedup.fingerprint(result)
+            original = seen.get(key) or (dedup_index.find(key) if dedup_index else None)
+            if original is None:
+                seen[key] = source
+            else:
+                print(f"♻️  {source}: same outfit as {original}", file=sys.stderr)
+                duplicates += 1
+                if dedup_mode == "skip":
+                    continue
+        if result:
+            if json_writer is not None:
+                json_writer.write(result)
+            else:
+                output_stream.write(result + "\n")
+            converted += 1
+        else:
+            print(f"❌ {source}: {error}", file=sys.stderr)
+            failed += 1
+
+    if json_writer is not None:
+        json_writer.close()
+    return converted, failed, duplicates
+
+def main(args):
+    """Non-interactive entry point: python main.py batch DIRECTION [-i INPUT] [-o OUTPUT] [-g GENDER]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Convert newline-delimited outfits without the menu")
+    parser.add_argument("direction", choices=list(pipeline.DIRECTIONS))
+    parser.add_argument("-i", "--input", default="-", help="input file with one code per line, JSON lines or a JSON array, or a directory of input files (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file, one result per line (default: stdout)")
+    parser.add_argument("--json-array", action="store_true", help="write JSON results as a single JSON array instead of JSON lines")
+    add_gender_argument(parser)
+    parser.add_argument("-w", "--workers", default=1, type=int, help="worker processes, 0 for one per core (default: 1)")
+    parser.add_argument("--chunk-size", default=parallel.DEFAULT_CHUNK_SIZE, type=int, help="records sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true", help="write results as they complete instead of in input order")
+    parser.add_argument("--cache", action="store_true", help="reuse the results of outfits already converted")
+    parser.add_argument("--cache-db", nargs="?", const=cache.DEFAULT_DB_PATH, help=f"also keep the cache in a SQLite file (default: {cache.DEFAULT_DB_PATH})")
+    parser.add_argument("--dedup", choices=["skip", "report"], help="leave out (skip) or only report results describing an outfit already converted")
+    parser.add_argument("--dedup-db", nargs="?", const=dedup.DEFAULT_DB_PATH, help=f"also compare with the outputs indexed by `main.py dedup` (default: {dedup.DEFAULT_DB_PATH})")
+    add_profile_arguments(parser)
+    options = parser.parse_args(args)
+
+    enable_profiling(parser, options)
+    if options.cache or options.cache_db:
+        cache.enable_cache(db_path=options.cache_db)
+    dedup_index = dedup.DedupIndex(options.dedup_db) if options.dedup_db else None
+
+    from_files = options.input != "-" and os.path.isdir(options.input)
+    if from_files:
+        input_stream = None
+        records = parallel.iter_input_files(options.input)
+    else:
+        input_stream = open_input(options.input)
+        if pipeline.DIRECTIONS[options.direction][0] == "json":
+            records = json_stream.iter_json_records(input_stream)
+        else:
+            records = iter_stream_records(input_stream)
+
+    output_stream = open_output(options.output)
+    try:
+        converted, failed, duplicates = run_batch(options.direction, records, output_stream, options.gender,
+                                                  options.workers or None, options.chunk_size, not options.unordered, from_files,
+                                                  options.json_array, options.dedup or ("report" if dedup_index else None), dedup_index)
+    except ValueError as e:
+        # A broken JSON array input, found while reading it
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if dedup_index is not None:
+            dedup_index.close()
+        close_stream(input_stream)
+        close_stream(output_stream)
+
+    summary = f"📊 Batch {options.direction}: {converted} converted, {failed} failed"
+    if duplicates:
+        summary += f", {duplicates} duplicates {'skipped' if options.dedup == 'skip' else 'reported'}"
+    print(summary, file=sys.stderr)
+
+    active_cache = cache.get_active_cache()
+    if active_cache is not None:
+        stats = active_cache.stats()
+        if stats["hits"] or stats["misses"]:
+            print(f"🗃️  Cache: {stats['hits']} hits ({stats['disk_hits']} from disk), {stats['misses']} misses", file=sys.stderr)
+        cache.disable_cache()
+    return 1 if failed else 0
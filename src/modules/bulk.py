@@ -0,0 +1,359 @@
+"""Bulk BBFAS / Cherax conversions on NumPy matrices
+
+A batch of N outfits is an (N, 40) int32 matrix whose columns follow
+outfit.SLOT_KEYS (pCI0-11, pCT0-11, pPi0-7, pPt0-7), undefined slots holding
+MISSING. The decoded BBFAS payloads of a whole batch are tokenized, validated
+and mapped as one byte array, and codes are encoded back the same way. Codes
+that are not plain well-formed ASCII payloads are handed to the regular
+converter, so results and error messages are the same as one by one.
+
+NumPy is optional: the rest of the converter works without it, this module
+raises ImportError when used without it.
+"""
+
+import binascii
+import functools
+
+from . import load_converter
+from .parallel import capture_messages
+from .outfit import MAX_VALUE, MISSING, SLOT_COUNT, SLOT_KEYS, Outfit
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SECTION_SIZES = (12, 12, 8, 8)   # DI, DT, Pi, Pt columns
+PACKED_WIDTH = 8                 # lines are read and written as uint64 words of 8 bytes
+MAX_VALUE_DIGITS = 6             # longer values go through the regular converter
+FIELD_RANGE = (-32768, 32767)    # values encoded from the field table; rows with others are encoded one by one
+
+_PLAIN_BYTES = bytes(range(0x21, 0x7F)) + b"\n"
+
+# Payload text around the slots of each section when encoding
+_SEPARATORS = (b"Item\nDI\n", b"/DI\nDT\n", b"/DT\nPi\n", b"/Pi\nPt\n", b"/Pt\n/Item")
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for bulk conversions (pip install numpy)")
+
+def _pack(text):
+    """A line of up to 8 ASCII bytes as the integer its zero-padded bytes read as"""
+    return int(np.frombuffer(text.encode("ascii").ljust(PACKED_WIDTH, b"\0"), dtype=np.uint64)[0])
+
+if np is not None:
+    # Low bytes kept by a line of 0 to 8 bytes (9 = longer than a packed word), and per-byte constants
+    _BYTE_MASKS = np.array([(1 << (8 * width)) - 1 for width in range(PACKED_WIDTH + 1)] + [0], dtype=np.uint64)
+    _ZEROS = np.uint64(0x3030303030303030)
+    _SIXES = np.uint64(0x4646464646464646)
+    _HIGH_BITS = np.uint64(0x8080808080808080)
+
+    # Slot keys packed, their section (1-4), and a multiplicative hash with no collision between them
+    _KEY_TABLE = np.array([_pack(key) for key in SLOT_KEYS], dtype=np.uint64)
+    _KEY_SECTIONS = np.repeat(np.arange(1, len(SECTION_SIZES) + 1, dtype=np.int8), SECTION_SIZES)
+    _KEY_HASH = np.uint64(0x552AE5CA4124405B)
+    _KEY_HASH_BITS = 6
+    _KEY_COLUMNS = np.zeros(1 << _KEY_HASH_BITS, dtype=np.int64)
+    _KEY_COLUMNS[(_KEY_TABLE * _KEY_HASH) >> np.uint64(64 - _KEY_HASH_BITS)] = np.arange(SLOT_COUNT)
+
+def empty_matrix(count):
+    """(count, 40) int32 matrix with every slot undefined"""
+    _require_numpy()
+    return np.full((count, SLOT_COUNT), MISSING, dtype=np.int32)
+
+def matrix_from_outfits(outfits):
+    """Stack Outfit objects into a matrix"""
+    _require_numpy()
+    matrix = empty_matrix(len(outfits))
+    for row, outfit in enumerate(outfits):
+        matrix[row] = outfit.values
+    return matrix
+
+def outfit_from_row(row, model=None):
+    """Outfit of one matrix row"""
+    return Outfit(model, row.tolist())
+
+def _convert_one(code):
+    """Regular converter for one code: (Outfit or None, error message or None)"""
+    outfit, error = capture_messages(load_converter("bbfas_json").bbfas_to_outfit, code)
+    if outfit is not None:
+        return outfit, None
+    return None, error or "conversion failed"
+
+def decode_bbfas_codes(codes):
+    """Decode BBFAS codes into an (N, 40) int32 matrix
+
+    Returns (matrix, errors) where errors maps the row of every code that could
+    not be converted to its error message; those rows are left undefined.
+    """
+    _require_numpy()
+    codes = list(codes)
+    count = len(codes)
+    matrix = empty_matrix(count)
+    if not count:
+        return matrix, {}
+
+    payloads = []
+    irregular = np.zeros(count, dtype=bool)
+    a2b = binascii.a2b_base64
+    for row, code in enumerate(codes):
+        try:
+            payloads.append(a2b(code))
+        except (binascii.Error, ValueError, TypeError):
+            payloads.append(b"")
+            irregular[row] = True
+
+    # All payloads in one byte array, each one ending with a newline and the whole padded
+    # so that the 8 bytes from any position can be read as one (unaligned) uint64
+    row_ends = PACKED_WIDTH + np.cumsum(np.fromiter(map(len, payloads), dtype=np.int64, count=count) + 1) - 1
+    padding = bytes(PACKED_WIDTH)
+    text = b"\n".join(payloads)
+    data = np.frombuffer(padding + text + b"\n" + padding, dtype=np.uint8)
+    words = np.ndarray((len(data) - PACKED_WIDTH + 1,), dtype=np.uint64, buffer=data, strides=(1,))
+
+    # Lines: [start, end) without the line break
+    ends = np.flatnonzero(data == 10)
+    starts = np.empty_like(ends)
+    starts[0] = PACKED_WIDTH
+    starts[1:] = ends[:-1] + 1
+    is_row_end = np.zeros(len(data), dtype=bool)
+    is_row_end[row_ends] = True
+    last_of_row = is_row_end[ends]
+    rows = np.cumsum(last_of_row, dtype=np.int32) - last_of_row
+
+    # Only plain ASCII without spaces, control characters or empty lines takes the fast path
+    if text.translate(None, _PLAIN_BYTES):
+        unusual = (data < 0x21) | (data >= 0x7F)
+        unusual[ends] = False
+        unusual[:PACKED_WIDTH] = unusual[-PACKED_WIDTH:] = False
+        irregular[rows[np.searchsorted(ends, np.flatnonzero(unusual))]] = True
+    line_lengths = ends - starts
+    irregular[rows[line_lengths == 0]] = True
+
+    size = len(starts)
+    positions = np.arange(size, dtype=np.int32)
+    first_of_row = np.ones(size, dtype=bool)
+    first_of_row[1:] = last_of_row[:-1]
+
+    # The first 8 bytes of every line as one integer, lines longer than that left at 0
+    packed = words[starts] & _BYTE_MASKS[np.minimum(line_lengths, PACKED_WIDTH + 1)]
+    first = data[starts]
+
+    # Section of every line: forward fill of the last marker seen in the same row
+    opened = np.zeros(size, dtype=np.int8)
+    for marker, number in (("DI", 1), ("DT", 2), ("Pi", 3), ("Pt", 4)):
+        opened[packed == _pack(marker)] = number
+    is_open = opened > 0
+    is_marker = is_open | (first == ord("/"))
+    last_marker = np.maximum.accumulate(np.where(is_marker | first_of_row, positions, 0))
+    section = np.where(is_marker[last_marker], opened[last_marker], 0)
+    content = (section > 0) & ~is_marker
+
+    # Inside a section, lines alternate key / value
+    is_value = content & ((positions - last_marker) & 1 == 0)
+    is_key = content & ~is_value
+    starts_with_p = first == ord("p")
+    bad = (is_key & ~starts_with_p) | (is_value & starts_with_p)
+
+    # Values must be plain integers (of up to 6 digits, so they fit a slot). The 8 bytes ending with the
+    # line hold the digits right-aligned: bytes before them are set to "0", then the
+    # digits are checked and summed pairwise within the word (SWAR)
+    value_lines = np.flatnonzero(is_value)
+    negative = first[value_lines] == ord("-")
+    digit_counts = line_lengths[value_lines] - negative
+    well_formed = (digit_counts >= 1) & (digit_counts <= MAX_VALUE_DIGITS)
+    digit_masks = ~_BYTE_MASKS[PACKED_WIDTH - np.clip(digit_counts, 0, PACKED_WIDTH)]
+    tail = words[ends[value_lines] - PACKED_WIDTH]
+    tail = (tail & digit_masks) | (_ZEROS & ~digit_masks)
+    well_formed &= (((tail + _SIXES) | (tail - _ZEROS)) & _HIGH_BITS) == 0
+    tail -= _ZEROS
+    tail = (tail * np.uint64(10) + (tail >> np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    tail = (tail * np.uint64(100) + (tail >> np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    tail = (tail * np.uint64(10000) + (tail >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    values = tail.astype(np.int32)
+    np.negative(values, out=values, where=negative)
+    bad[value_lines[~well_formed]] = True
+    line_values = np.zeros(size, dtype=np.int32)
+    line_values[value_lines] = values
+
+    # Sections must be closed by their own marker before the next one opens or the row ends,
+    # and no key may be left without its value
+    marker_lines = np.flatnonzero(is_marker)
+    marker_rows = rows[marker_lines]
+    previous_open = np.zeros(len(marker_lines), dtype=opened.dtype)
+    previous_open[1:] = np.where(marker_rows[1:] == marker_rows[:-1], opened[marker_lines[:-1]], 0)
+    closes = np.zeros(len(marker_lines), dtype=opened.dtype)
+    marker_packed = packed[marker_lines]
+    for marker, number in (("/DI", 1), ("/DT", 2), ("/Pi", 3), ("/Pt", 4)):
+        closes[marker_packed == _pack(marker)] = number
+    bad[marker_lines[(previous_open > 0) & (is_open[marker_lines] | (closes != previous_open))]] = True
+    after_key = np.zeros(size, dtype=bool)
+    after_key[1:] = is_key[:-1] & ~first_of_row[1:]
+    bad |= (is_marker & after_key) | (last_of_row & (section > 0))
+    irregular[rows[bad]] = True
+
+    # Pair each key with the value that follows it; the column comes from a perfect hash of
+    # the packed key, checked against the key and its section (unknown keys are ignored)
+    key_lines = np.flatnonzero(is_key & ~irregular[rows])
+    key_packed = packed[key_lines]
+    columns = _KEY_COLUMNS[(key_packed * _KEY_HASH) >> np.uint64(64 - _KEY_HASH_BITS)]
+    known = (_KEY_TABLE[columns] == key_packed) & (_KEY_SECTIONS[columns] == section[key_lines])
+    key_lines, columns = key_lines[known], columns[known]
+    pair_values = line_values[key_lines + 1]
+
+    # A repeated key keeps its last value
+    flat = rows[key_lines].astype(np.int64) * SLOT_COUNT + columns
+    repeated = np.bincount(flat, minlength=count * SLOT_COUNT)[flat] > 1
+    matrix.reshape(-1)[flat[~repeated]] = pair_values[~repeated]
+    if repeated.any():
+        flat, pair_values = flat[repeated], pair_values[repeated]
+        _, last = np.unique(flat[::-1], return_index=True)
+        last = len(flat) - 1 - last
+        matrix.reshape(-1)[flat[last]] = pair_values[last]
+
+    errors = {}
+    for row in np.flatnonzero(irregular).tolist():
+        outfit, error = _convert_one(codes[row])
+        if outfit is None:
+            matrix[row] = MISSING
+            errors[row] = error
+        else:
+            matrix[row] = outfit.values
+    return matrix, errors
+
+@functools.lru_cache(maxsize=None)
+def _encoding_tables():
+    """Lookup tables used to encode rows as 8-byte words
+
+    An encoded row is laid out as 41 pieces of three words: the section separator
+    if the slot opens a section, the key line and the value field (right-aligned
+    value and line break), each right-aligned in its word; the last piece only
+    holds the closing separator. Unused bytes are zero and dropped afterwards.
+    Returns the separator, key line and field words, and the key line and field lengths.
+    """
+    separators = np.zeros((SLOT_COUNT + 1, 2, PACKED_WIDTH), dtype=np.uint8)
+    key_lines = np.zeros((SLOT_COUNT, PACKED_WIDTH), dtype=np.uint8)
+    section_starts = np.cumsum((0,) + SECTION_SIZES)
+    for section, column in enumerate(section_starts):
+        separator = np.frombuffer(_SEPARATORS[section], dtype=np.uint8)
+        if column < SLOT_COUNT:
+            separators[column, 0, PACKED_WIDTH - len(separator):] = separator
+        else:
+            separators[column].reshape(-1)[2 * PACKED_WIDTH - len(separator):] = separator
+    for column, key in enumerate(SLOT_KEYS):
+        key_line = key.encode("ascii") + b"\n"
+        key_lines[column, PACKED_WIDTH - len(key_line):] = np.frombuffer(key_line, dtype=np.uint8)
+
+    # Field of every value of FIELD_RANGE
+    values = np.arange(FIELD_RANGE[0], FIELD_RANGE[1] + 1)
+    fields = np.zeros((len(values), PACKED_WIDTH), dtype=np.uint8)
+    fields[:, -1] = ord("\n")
+    magnitude = np.abs(values)
+    digit_counts = 1 + sum((magnitude >= 10 ** power).astype(np.int64) for power in range(1, 5))
+    for position in range(PACKED_WIDTH - 2, PACKED_WIDTH - 7, -1):
+        fields[:, position] = magnitude % 10 + ord("0")
+        magnitude //= 10
+    negative = np.flatnonzero(values < 0)
+    fields[negative, PACKED_WIDTH - 2 - digit_counts[negative]] = ord("-")
+    field_lengths = digit_counts + (values < 0) + 1
+    fields[np.arange(PACKED_WIDTH) < PACKED_WIDTH - field_lengths[:, None]] = 0
+
+    as_words = lambda table: np.ascontiguousarray(table).view(np.uint64).reshape(table.shape[:-1])
+    key_lengths = np.array([len(key) + 1 for key in SLOT_KEYS])
+    return as_words(separators), as_words(key_lines), as_words(fields), key_lengths, field_lengths
+
+def encode_bbfas_codes(matrix):
+    """BBFAS code of every row of the matrix, as a list of strings"""
+    _require_numpy()
+    matrix = np.asarray(matrix)
+    count = len(matrix)
+    if not count:
+        return []
+    if not validate_matrix(matrix).all():
+        raise ValueError(f"Matrix values must fit an Outfit slot ({MISSING + 1} to {MAX_VALUE})")
+    separators, key_lines, fields, key_lengths, field_lengths = _encoding_tables()
+
+    # Every row laid out as words (separators, key lines, values), then the unused (zero) bytes dropped
+    defined = matrix != MISSING
+    outside = defined & ((matrix < FIELD_RANGE[0]) | (matrix > FIELD_RANGE[1]))
+    indexes = np.where(defined & ~outside, matrix.astype(np.int64) - FIELD_RANGE[0], 0)
+    words = np.empty((count, SLOT_COUNT + 1, 3), dtype=np.uint64)
+    words[:, :, :2] = separators
+    words[:, :SLOT_COUNT, 1] = np.where(defined, key_lines, 0)
+    words[:, :SLOT_COUNT, 2] = np.where(defined, fields[indexes], 0)
+    words[:, SLOT_COUNT, 2] = 0
+
+    lengths = len(b"".join(_SEPARATORS)) + np.where(defined, key_lengths + field_lengths[indexes], 0).sum(axis=1)
+    row_ends = np.cumsum(lengths).tolist()
+    raw = words.tobytes().translate(None, b"\0")
+    b2a = binascii.b2a_base64
+    codes = [b2a(raw[start:end], newline=False).decode("ascii") for start, end in zip([0] + row_ends[:-1], row_ends)]
+    for row in np.flatnonzero(outside.any(axis=1)).tolist():
+        codes[row] = outfit_from_row(matrix[row]).to_bbfas_code()
+    return codes
+
+def cherax_defaults(matrix):
+    """Matrix with undefined slots set to the Cherax defaults: drawables -1, component textures 0, prop textures -1"""
+    _require_numpy()
+    matrix = np.asarray(matrix, dtype=np.int32)
+    defaults = np.full(SLOT_COUNT, -1, dtype=np.int32)
+    defaults[12:24] = 0
+    return np.where(matrix == MISSING, defaults, matrix)
+
+def encode_cherax_records(matrix, gender="MALE"):
+    """Cherax outfit of every row of the matrix, identical to json_to_cherax one by one"""
+    _require_numpy()
+    json_cherax = load_converter("json_cherax")
+    template = json_cherax.outfit_to_cherax(Outfit(), gender)
+    face_features = template["face_features"]
+    component_keys = [cherax_key for _, _, cherax_key in json_cherax.COMPONENT_SLOTS]
+    prop_keys = [cherax_key for _, _, cherax_key in json_cherax.PROP_SLOTS]
+    # Slots the mapping never fills keep the template entry (Head, Hip)
+    extra_components = {key: value for key, value in template["components"].items() if key not in component_keys}
+    extra_props = {key: value for key, value in template["props"].items() if key not in prop_keys}
+
+    # Columns in the order they are read: drawable, texture of each component, then of each prop
+    columns = [index for slots in (json_cherax.COMPONENT_SLOTS, json_cherax.PROP_SLOTS)
+               for drawable, texture, _ in slots for index in (drawable, texture)]
+    split = 2 * len(component_keys)
+    records = []
+    for values in cherax_defaults(matrix)[:, columns].tolist():
+        component_values = iter(values[:split])
+        prop_values = iter(values[split:])
+        components = {key: {"drawable": drawable, "texture": texture, "palette": 0}
+                      for key, drawable, texture in zip(component_keys, component_values, component_values)}
+        for key, value in extra_components.items():
+            components[key] = dict(value)
+        props = {key: {"drawable": drawable, "texture": texture}
+                 for key, drawable, texture in zip(prop_keys, prop_values, prop_values)}
+        for key, value in extra_props.items():
+            props[key] = dict(value)
+
+        record = template.copy()
+        record["components"] = components
+        record["props"] = props
+        record["face_features"] = face_features.copy()
+        records.append(record)
+    return records
+
+def matrix_from_cherax(records):
+    """Read Cherax outfits into a matrix, as cherax_to_outfit does one by one
+
+    Returns (matrix, errors) where errors maps the row of every invalid record to its message.
+    """
+    _require_numpy()
+    cherax_bbfas = load_converter("cherax_bbfas")
+    matrix = empty_matrix(len(records))
+    errors = {}
+    for row, record in enumerate(records):
+        try:
+            matrix[row] = cherax_bbfas.cherax_to_outfit(record).values
+        except (AttributeError, TypeError, ValueError, OverflowError) as e:
+            errors[row] = f"Error during conversion: {e}"
+    return matrix, errors
+
+def validate_matrix(matrix):
+    """Boolean mask of the rows whose slots all hold a value an Outfit can store (or MISSING)"""
+    _require_numpy()
+    matrix = np.asarray(matrix)
+    return ((matrix >= MISSING) & (matrix <= MAX_VALUE)).all(axis=1)
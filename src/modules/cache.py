@@ -0,0 +1,181 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from modules.output_sink import output_exists
+except ImportError:
+    from output_sink import output_exists
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_DB_PATH = os.path.join("src", "output", "conversion_cache.sqlite3")
+
+# Only these directions depend on the gender, the others share one cache entry
+GENDER_DIRECTIONS = {"json-cherax", "bbfas-cherax"}
+
+def canonical_input(data):
+    """Canonical text of a conversion input: a stripped code or sorted compact JSON"""
+    if isinstance(data, str):
+        data = data.strip()
+        if not data.startswith(("{", "[")):
+            return data
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return data
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ConversionCache:
+    """Content-addressed conversion cache: an in-memory LRU in front of an optional SQLite file
+
+    Cached results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, db_path=None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._outputs = {}
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            import sqlite3
+
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS conversions (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS outputs (content_hash TEXT PRIMARY KEY, path TEXT NOT NULL)")
+
+    def make_key(self, direction, data, gender=None):
+        """Hash of the canonical input plus the direction and, when it matters, the gender"""
+        gender = (gender or "MALE").upper() if direction in GENDER_DIRECTIONS else ""
+        return content_hash(f"{direction}\0{gender}\0{canonical_input(data)}")
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+            if self._db is not None:
+                row = self._db.execute("SELECT result FROM conversions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """Store a successful conversion result"""
+        with self._lock:
+            self._remember(key, result)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO conversions (key, result) VALUES (?, ?)",
+                                 (key, json.dumps(result, ensure_ascii=False)))
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def convert(self, direction, convert_func, data, gender=None):
+        """Return convert_func(data[, gender]) from the cache, running it only on a miss"""
+        key = self.make_key(direction, data, gender)
+        result = self.get(key)
+        if result is None:
+            result = convert_func(data) if gender is None else convert_func(data, gender)
+            if result:
+                self.put(key, result)
+        return result
+
+    def find_output(self, content):
+        """Path of an existing output file with exactly this content, or None"""
+        digest = content_hash(content)
+        with self._lock:
+            path = self._outputs.get(digest)
+            if path is None and self._db is not None:
+                row = self._db.execute("SELECT path FROM outputs WHERE content_hash = ?", (digest,)).fetchone()
+                path = row[0] if row else None
+        if path and output_exists(path):
+            return path
+        return None
+
+    def add_output(self, content, path):
+        """Record that path holds content"""
+        digest = content_hash(content)
+        with self._lock:
+            self._outputs[digest] = path
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO outputs (content_hash, path) VALUES (?, ?)", (digest, path))
+
+    def settings(self):
+        """Arguments needed to open an equivalent cache in another process"""
+        return {"max_entries": self.max_entries, "db_path": self.db_path}
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+_active_cache = None
+
+def enable_cache(max_entries=DEFAULT_MAX_ENTRIES, db_path=None):
+    """Turn on caching for every converter in this process"""
+    global _active_cache
+    disable_cache()
+    _active_cache = ConversionCache(max_entries, db_path)
+    return _active_cache
+
+def disable_cache():
+    global _active_cache
+    if _active_cache is not None:
+        _active_cache.close()
+        _active_cache = None
+
+def detach_cache():
+    """Drop the active cache without closing it, e.g. in a forked worker sharing the parent's connection"""
+    global _active_cache
+    _active_cache = None
+
+def get_active_cache():
+    return _active_cache
+
+def cached_convert(direction, convert_func, data, gender=None):
+    """Run convert_func through the active cache, or directly when caching is off"""
+    if _active_cache is None:
+        return convert_func(data) if gender is None else convert_func(data, gender)
+    return _active_cache.convert(direction, convert_func, data, gender)
+
+def find_identical_output(content):
+    """Existing output file with this exact content, when caching is on"""
+    if _active_cache is None:
+        return None
+    return _active_cache.find_output(content)
+
+def remember_output(content, path):
+    if _active_cache is not None:
+        _active_cache.add_output(content, path)
@@ -0,0 +1,64 @@
+"""Helpers shared by the command line entry points of the modules
+
+Each subcommand of main.py is the main(args) function of one module (batch,
+server, archive, dedup, sync, staged, packs, watch, store, validate, verify),
+returning the exit code. These helpers add the options several of them accept.
+"""
+
+import sys
+
+GENDERS = ["MALE", "FEMALE"]
+
+def iter_stream_records(input_stream):
+    """Yield the non-empty lines of a newline-delimited input stream"""
+    for line in input_stream:
+        record = line.strip()
+        if record:
+            yield record
+
+def add_gender_argument(parser):
+    parser.add_argument("-g", "--gender", default="MALE", type=str.upper, choices=GENDERS)
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", nargs="?", const="stages", metavar="MODES",
+                        help="print per-stage timings at exit; MODES may add cprofile and/or tracemalloc, e.g. stages,cprofile")
+    parser.add_argument("--profile-output", metavar="PATH", help="also save the cProfile data to PATH (for pstats / snakeviz)")
+
+def enable_profiling(parser, options):
+    """Turn profiling on when --profile is given"""
+    if not options.profile:
+        return
+    from . import profiling
+
+    try:
+        modes = profiling.parse_modes(options.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    profiling.enable(modes, options.profile_output)
+
+def add_write_arguments(parser):
+    from . import output_sink
+
+    parser.add_argument("--write-mode", default="direct", choices=output_sink.MODES,
+                        help="write each output at once (direct), in batches (buffered) or from writer threads (background)")
+    parser.add_argument("--fsync", default="none", choices=output_sink.FSYNC_MODES,
+                        help="fsync no output (none), every output (each) or each batch of outputs at once (batch)")
+
+def enable_output_sink(options):
+    if options.write_mode != "direct" or options.fsync != "none":
+        from . import output_sink
+
+        output_sink.enable_sink(options.write_mode, options.fsync)
+
+def open_output(path):
+    """Text stream to write results to: stdout for "-", else the file (close it with close_stream)"""
+    return sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="\n")
+
+def open_input(path):
+    """Text stream to read records from: stdin for "-", else the file (close it with close_stream)"""
+    return sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+
+def close_stream(stream):
+    """Close a stream from open_input/open_output, leaving stdin and stdout open"""
+    if stream is not None and stream not in (sys.stdin, sys.stdout):
+        stream.close()
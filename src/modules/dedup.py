@@ -0,0 +1,304 @@
+"""Outfit deduplication: normalized fingerprints and a persistent index of outputs
+
+Two files describe the same outfit when their slots are equal once converted to
+an Outfit, whatever their format, field order or "Code", and once undefined
+slots are given the values the converters fill in (drawables -1, clothes
+textures 0, props textures -1). The Cherax "Head" component and "Hip" prop
+defaults have no BBFAS slot and are ignored. The model (gender) is left out
+unless asked for, since BBFAS codes do not carry it. pCI0/pCT0 do not exist in
+Cherax, so a Cherax file only matches BBFAS outfits where they are -1 or undefined.
+
+Outputs are indexed by (format, fingerprint): a BBFAS code, a BBFAS JSON and a
+Cherax JSON of the same outfit are not duplicates of each other, as one file
+cannot stand in for another. With an index enabled, the converters check every
+output against the outfits already generated in its format and, depending on
+the mode, skip it (returning the existing file), write it as a hard link to the
+existing file, or only report it.
+"""
+
+import collections
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+from array import array
+
+try:
+    from modules import load_converter
+    from modules.outfit import CLOTHES_COUNT, MISSING, SLOT_COUNT, Outfit
+    from modules.output_sink import output_exists
+except ImportError:
+    # Converter run as a script, where dedup is never enabled: only Outfit objects can be fingerprinted
+    from outfit import CLOTHES_COUNT, MISSING, SLOT_COUNT, Outfit
+    from output_sink import output_exists
+    load_converter = None
+
+MODES = ("skip", "link", "report")
+FORMATS = ("bbfas_code", "bbfas_json", "cherax_json")
+Duplicate = collections.namedtuple("Duplicate", "mode path")
+DEFAULT_DB_PATH = os.path.join("src", "output", "dedup_index.sqlite3")
+
+# Value the converters give an undefined slot, in SLOT_KEYS order
+DEFAULT_VALUES = array("i", [-1] * CLOTHES_COUNT + [0] * CLOTHES_COUNT + [-1] * (SLOT_COUNT - 2 * CLOTHES_COUNT))
+
+def canonical_outfit(data):
+    """Outfit of a BBFAS code, BBFAS JSON or Cherax JSON (object or text), or of an Outfit
+
+    Raises ValueError when data is none of these.
+    """
+    if isinstance(data, Outfit):
+        return data
+    if isinstance(data, str):
+        text = data.strip()
+        if not text.startswith("{"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                outfit = load_converter("bbfas_json").bbfas_to_outfit(text)
+            if outfit is None:
+                raise ValueError("Invalid BBFAS code")
+            return outfit
+        data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Not an outfit")
+    try:
+        if "Item" in data:
+            return Outfit.from_bbfas_items(data["Item"])
+        if "components" in data or "props" in data:
+            return load_converter("cherax_bbfas").cherax_to_outfit(data)
+    except (AttributeError, TypeError, OverflowError) as e:
+        raise ValueError(f"Invalid outfit: {e}") from e
+    raise ValueError("Not a BBFAS or Cherax outfit")
+
+def data_format(data):
+    """Format of outfit data (one of FORMATS), or None for an Outfit or anything else"""
+    if isinstance(data, str):
+        text = data.strip()
+        if not text.startswith("{"):
+            return "bbfas_code" if text else None
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+    if isinstance(data, dict):
+        if "Item" in data:
+            return "bbfas_json"
+        if "components" in data or "props" in data:
+            return "cherax_json"
+    return None
+
+def normalized_values(outfit):
+    """Slot values with every undefined slot set to the value the converters fill in"""
+    values = array("i", outfit.values)
+    for index, value in enumerate(values):
+        if value == MISSING:
+            values[index] = DEFAULT_VALUES[index]
+    return values
+
+def fingerprint(data, with_model=False):
+    """Fingerprint of the outfit data describes (hex string), equal for every form of the same outfit"""
+    outfit = canonical_outfit(data)
+    digest = hashlib.blake2b(normalized_values(outfit).tobytes(), digest_size=16)
+    if with_model and outfit.model is not None:
+        digest.update(str(outfit.model).encode("ascii"))
+    return digest.hexdigest()
+
+class DedupIndex:
+    """(format, fingerprint) -> path of the first output holding that outfit, in memory and optionally in SQLite"""
+
+    def __init__(self, db_path=None, with_model=False):
+        self.db_path = db_path
+        self.with_model = with_model
+        self.duplicates = 0
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            import sqlite3
+
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            # Index of an earlier version, keyed by fingerprint only: rebuilt by the next scan
+            self._db.execute("DROP TABLE IF EXISTS outfits")
+            self._db.execute("CREATE TABLE IF NOT EXISTS outputs (format TEXT NOT NULL, fingerprint TEXT NOT NULL,"
+                             " path TEXT NOT NULL, PRIMARY KEY (format, fingerprint)) WITHOUT ROWID")
+
+    def key(self, data, output_format=None):
+        """(format, fingerprint) an output is indexed under; its format is found from data unless given
+
+        Raises ValueError when data is not an outfit or its format is unknown.
+        """
+        output_format = output_format or data_format(data)
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown outfit format: {output_format}")
+        return output_format, fingerprint(data, self.with_model)
+
+    def find(self, key):
+        """Path already indexed under this (format, fingerprint) key, or None (also when that file is gone)"""
+        with self._lock:
+            path = self._paths.get(key)
+            if path is None and self._db is not None:
+                row = self._db.execute("SELECT path FROM outputs WHERE format = ? AND fingerprint = ?", key).fetchone()
+                path = row[0] if row else None
+        if path is None:
+            return None
+        if output_exists(path):
+            return path
+        self.forget(key)
+        return None
+
+    def add(self, key, path):
+        with self._lock:
+            self._paths[key] = path
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO outputs (format, fingerprint, path) VALUES (?, ?, ?)", key + (path,))
+
+    def forget(self, key):
+        with self._lock:
+            self._paths.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM outputs WHERE format = ? AND fingerprint = ?", key)
+
+    def check(self, key, path=None):
+        """Existing path for this key (a duplicate), or None after indexing path under it"""
+        existing = self.find(key)
+        if existing is not None and existing != path:
+            self.duplicates += 1
+            return existing
+        if path is not None:
+            self.add(key, path)
+        return None
+
+    def scan(self, paths):
+        """Index existing files; yield (path, original path) for every duplicate found
+
+        A duplicate is a file of the same format as the original. Files that
+        cannot be read or are not outfits are skipped.
+        """
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                key = self.key(json.loads(text) if text.lstrip().startswith("{") else text)
+            except (OSError, UnicodeDecodeError, ValueError):
+                continue
+            original = self.check(key, path)
+            if original is not None:
+                yield path, original
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+def link_output(existing_path, output_path):
+    """Make output_path a hard link to existing_path (a symbolic link where hard links fail)
+
+    Returns False when neither is possible, e.g. across drives on Windows.
+    """
+    temp_path = f"{output_path}.{os.getpid()}.link"
+    for make_link in (os.link, os.symlink):
+        try:
+            make_link(os.path.abspath(existing_path) if make_link is os.symlink else existing_path, temp_path)
+        except (OSError, NotImplementedError, AttributeError):
+            continue
+        os.replace(temp_path, output_path)
+        return True
+    return False
+
+_active_index = None
+_active_mode = None
+
+def enable_dedup(mode="skip", db_path=None, with_model=False):
+    """Turn on deduplication of the converters' outputs in this process"""
+    global _active_index, _active_mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown dedup mode: {mode} (expected {', '.join(MODES)})")
+    disable_dedup()
+    _active_index = DedupIndex(db_path, with_model)
+    _active_mode = mode
+    return _active_index
+
+def disable_dedup():
+    global _active_index, _active_mode
+    if _active_index is not None:
+        _active_index.close()
+        _active_index = None
+        _active_mode = None
+
+def get_active_index():
+    return _active_index
+
+def find_duplicate_output(result, output_format):
+    """Duplicate(mode, path of the output of that format holding the same outfit) when dedup is on and result repeats one, else None"""
+    if _active_index is None:
+        return None
+    try:
+        existing = _active_index.check(_active_index.key(result, output_format))
+    except ValueError:
+        return None
+    return Duplicate(_active_mode, existing) if existing else None
+
+def remember_outfit(result, path, output_format):
+    """Index a written output under its format and the fingerprint of its outfit, when dedup is on"""
+    if _active_index is None:
+        return
+    try:
+        key = _active_index.key(result, output_format)
+    except ValueError:
+        return
+    if _active_index.find(key) is None:
+        _active_index.add(key, path)
+
+def main(args):
+    """Deduplication entry point: python main.py dedup [FOLDER ...] [--link | --remove]"""
+    import argparse
+    import sys
+
+    from modules import parallel
+
+    default_folders = [os.path.join("src", "output", "CHERAX"), os.path.join("src", "output", "BBFAS")]
+    parser = argparse.ArgumentParser(prog="main.py dedup", description="Index the outfits of output folders and find the files of one format describing the same outfit")
+    parser.add_argument("folders", nargs="*", default=default_folders, help=f"folders to scan (default: {' '.join(default_folders)})")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--link", action="store_true", help="replace each duplicate with a hard link to the first file")
+    action.add_argument("--remove", action="store_true", help="delete the duplicates")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"fingerprint index to update (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--with-model", action="store_true", help="tell male and female versions of an outfit apart")
+    options = parser.parse_args(args)
+
+    index = DedupIndex(options.db, options.with_model)
+    scanned = 0
+    duplicates = 0
+    saved = 0
+    try:
+        for folder in options.folders:
+            if not os.path.isdir(folder):
+                print(f"⚠️  {folder}: not a folder, skipped", file=sys.stderr)
+                continue
+            paths = list(parallel.iter_input_files(folder))
+            scanned += len(paths)
+            for path, original in index.scan(paths):
+                if os.path.samefile(path, original):
+                    continue
+                duplicates += 1
+                size = os.path.getsize(path)
+                if options.remove:
+                    os.remove(path)
+                    saved += size
+                elif options.link and link_output(original, path):
+                    saved += size
+                print(f"♻️  {path}: same outfit as {original}")
+    finally:
+        index.close()
+
+    done = "removed" if options.remove else "linked" if options.link else "found"
+    print(f"📊 {scanned} files scanned, {duplicates} duplicates {done}"
+          + (f" ({duplicates / scanned:.0%})" if scanned else "")
+          + (f", {saved / 1024:.0f} KB freed" if saved else ""), file=sys.stderr)
+    return 0
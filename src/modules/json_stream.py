@@ -0,0 +1,158 @@
+import json
+
+try:
+    from modules.profiling import stage
+except ImportError:
+    from profiling import stage
+
+CHUNK_SIZE = 1 << 16
+MAX_RECORD_SIZE = 1 << 24   # give up on a record still undecodable past 16 MB
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+def _open_source(source):
+    if isinstance(source, str):
+        return open(source, "r", encoding="utf-8"), True
+    return source, False
+
+def iter_json_records(source, chunk_size=CHUNK_SIZE, max_record_size=MAX_RECORD_SIZE):
+    """Yield the JSON records of a file (path or text stream) one at a time, with bounded memory
+
+    Reads newline-delimited JSON, concatenated JSON documents and a top-level
+    JSON array of records. In a newline-delimited file, a line that is not valid
+    JSON is yielded as its raw text, as soon as its line break is read, so the
+    converter reports it and the stream goes on. A broken JSON array (missing or
+    extra commas, no closing ']', or data after it) raises ValueError.
+    """
+    stream, owned = _open_source(source)
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def refill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+    try:
+        in_array = None   # unknown until the first non-blank character
+        last = "["   # in an array: the last token read, "[", "," or "record"
+
+        while True:
+            # Skip whitespace between records
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+
+            if not eof and len(buffer) - pos < chunk_size:
+                refill()
+                continue
+
+            if pos >= len(buffer):
+                if in_array:
+                    raise ValueError("Invalid JSON array: missing closing ']'")
+                return
+
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                if in_array:
+                    pos += 1
+                continue
+
+            if in_array:
+                char = buffer[pos]
+                if char == "]" and last != ",":
+                    _check_end(stream, buffer, pos + 1, chunk_size)
+                    return
+                if char in ",]" and last != "record":
+                    raise ValueError(f"Invalid JSON array: {char!r} after {last!r}")
+                if char not in ",]" and last == "record":
+                    raise ValueError(f"Invalid JSON array: expected ',' or ']', found {char!r}")
+                if char == ",":
+                    pos += 1
+                    last = ","
+                    continue
+
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+                if end == len(buffer) and not eof:
+                    # A number or literal could continue in the next chunk
+                    refill()
+                    continue
+            except json.JSONDecodeError as e:
+                # Strings cannot span lines: with a line break after the error, more data would not help
+                if not eof and "\n" not in buffer[e.pos:] and len(buffer) - pos < max_record_size:
+                    # The record may simply be cut by the end of the buffer
+                    refill()
+                    continue
+                if in_array:
+                    raise ValueError(f"Invalid JSON array: {e}") from e
+                end = buffer.find("\n", pos)
+                end = len(buffer) if end == -1 else end
+                record = buffer[pos:end].strip()
+
+            pos = end
+            last = "record"
+            yield record
+    finally:
+        if owned:
+            stream.close()
+
+def _check_end(stream, buffer, pos, chunk_size):
+    """Raise ValueError if anything but whitespace follows the closing ']' of a top-level array"""
+    while True:
+        rest = buffer[pos:].lstrip(_WHITESPACE)
+        if rest:
+            raise ValueError(f"Invalid JSON array: data after the closing ']': {rest[:20]!r}")
+        buffer, pos = stream.read(chunk_size), 0
+        if not buffer:
+            return
+
+class JsonRecordWriter:
+    """Write records as newline-delimited JSON, or as one JSON array with as_array=True
+
+    Records are compact by default; indent is only allowed for JSON arrays since
+    newline-delimited records must stay on one line.
+    """
+
+    def __init__(self, target, as_array=False, indent=None):
+        if indent is not None and not as_array:
+            raise ValueError("indent requires as_array=True")
+        self.stream, self._owned = (open(target, "w", encoding="utf-8", newline="\n"), True) if isinstance(target, str) else (target, False)
+        self.as_array = as_array
+        self.indent = indent
+        self.separators = (",", ":") if indent is None else (",", ": ")
+        self.count = 0
+
+    @stage("serialize")
+    def serialize(self, record):
+        """Text of a record as this writer writes it"""
+        return json.dumps(record, ensure_ascii=False, indent=self.indent, separators=self.separators)
+
+    def write(self, record):
+        self.write_text(self.serialize(record))
+
+    @stage("write")
+    def write_text(self, text):
+        """Write a record already serialized the way this writer would (compact unless indent is set)"""
+        if self.as_array:
+            self.stream.write(("[" if self.count == 0 else ",") + "\n" + text)
+        else:
+            self.stream.write(text + "\n")
+        self.count += 1
+
+    def close(self):
+        if self.as_array:
+            self.stream.write("[]\n" if self.count == 0 else "\n]\n")
+            self.as_array = False
+        if self._owned:
+            self.stream.close()
+            self._owned = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
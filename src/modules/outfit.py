@@ -0,0 +1,125 @@
+import base64
+from array import array
+
+try:
+    from modules.profiling import stage
+except ImportError:
+    from profiling import stage
+
+CLOTHES_COUNT = 12   # pCI0-pCI11 / pCT0-pCT11
+PROPS_COUNT = 8      # pPi0-pPi7 / pPt0-pPt7
+
+# Slot values are 32-bit integers; the lowest one marks a slot the outfit does not define
+MISSING = -2 ** 31
+MIN_VALUE = MISSING + 1
+MAX_VALUE = 2 ** 31 - 1
+
+# BBFAS key of every slot, in the order of Outfit.values
+CLOTHES_DRAWABLE_KEYS = tuple(f"pCI{i}" for i in range(CLOTHES_COUNT))
+CLOTHES_TEXTURE_KEYS = tuple(f"pCT{i}" for i in range(CLOTHES_COUNT))
+PROPS_DRAWABLE_KEYS = tuple(f"pPi{i}" for i in range(PROPS_COUNT))
+PROPS_TEXTURE_KEYS = tuple(f"pPt{i}" for i in range(PROPS_COUNT))
+SLOT_KEYS = CLOTHES_DRAWABLE_KEYS + CLOTHES_TEXTURE_KEYS + PROPS_DRAWABLE_KEYS + PROPS_TEXTURE_KEYS
+SLOT_COUNT = len(SLOT_KEYS)
+SLOT_INDEX = {key: index for index, key in enumerate(SLOT_KEYS)}
+
+# BBFAS sections: (section marker, section, type, {BBFAS key: slot index})
+SECTIONS = tuple(
+    (marker, section, item_type, {key: SLOT_INDEX[key] for key in keys})
+    for marker, section, item_type, keys in (
+        ("DI", "Clothes", "Drawable", CLOTHES_DRAWABLE_KEYS),
+        ("DT", "Clothes", "Texture", CLOTHES_TEXTURE_KEYS),
+        ("Pi", "Props", "Drawable", PROPS_DRAWABLE_KEYS),
+        ("Pt", "Props", "Texture", PROPS_TEXTURE_KEYS),
+    )
+)
+
+_EMPTY_VALUES = array("i", [MISSING] * SLOT_COUNT)
+
+def _slot_value(value):
+    """Integer value of a BBFAS JSON entry, which may be wrapped as {"ID": value}"""
+    if isinstance(value, dict):
+        value = value.get("ID", MISSING)
+    return int(value)
+
+class Outfit:
+    """Compact outfit shared by all converters
+
+    The 40 drawable/texture values (clothes then props, in SLOT_KEYS order) live in
+    a single array('i'); undefined slots hold MISSING. The BBFAS and Cherax forms
+    are only built when asked for.
+    """
+
+    __slots__ = ("model", "values")
+
+    def __init__(self, model=None, values=None):
+        self.model = model
+        self.values = array("i", values) if values is not None else array("i", _EMPTY_VALUES)
+
+    @classmethod
+    @stage("map")
+    def from_bbfas_items(cls, items):
+        """Build an outfit from the "Item" tree of a BBFAS JSON; unknown keys are ignored"""
+        outfit = cls()
+        values = outfit.values
+        for marker, section, item_type, slots in SECTIONS:
+            for key, value in items.get(section, {}).get(item_type, {}).items():
+                index = slots.get(key)
+                if index is not None:
+                    values[index] = value if type(value) is int else _slot_value(value)
+        return outfit
+
+    def get(self, key, default=None):
+        """Value of a slot by BBFAS key, or default when it is missing"""
+        value = self.values[SLOT_INDEX[key]]
+        return default if value == MISSING else value
+
+    def set(self, key, value):
+        self.values[SLOT_INDEX[key]] = MISSING if value is None else value
+
+    def to_bbfas_items(self):
+        """The "Item" tree of a BBFAS JSON"""
+        items = {"Clothes": {"Drawable": {}, "Texture": {}}, "Props": {"Drawable": {}, "Texture": {}}}
+        values = self.values
+        for marker, section, item_type, slots in SECTIONS:
+            entries = items[section][item_type]
+            for key, index in slots.items():
+                value = values[index]
+                if value != MISSING:
+                    entries[key] = value
+        return items
+
+    def to_bbfas_lines(self):
+        """Decoded BBFAS payload lines: every defined slot, section by section"""
+        lines = ["Item"]
+        values = self.values
+        for marker, section, item_type, slots in SECTIONS:
+            lines.append(marker)
+            for key, index in slots.items():
+                value = values[index]
+                if value != MISSING:
+                    lines += (key, str(value))
+            lines.append("/" + marker)
+        lines.append("/Item")
+        return lines
+
+    @stage("serialize")
+    def to_bbfas_code(self):
+        """BBFAS base64 code"""
+        return base64.b64encode("\n".join(self.to_bbfas_lines()).encode("utf-8")).decode("utf-8")
+
+    def key(self):
+        """Hashable identity of the slot values"""
+        return self.values.tobytes()
+
+    def __eq__(self, other):
+        if not isinstance(other, Outfit):
+            return NotImplemented
+        return self.model == other.model and self.values == other.values
+
+    def __hash__(self):
+        return hash((self.model, self.key()))
+
+    def __repr__(self):
+        defined = {key: value for key, value in zip(SLOT_KEYS, self.values) if value != MISSING}
+        return f"Outfit(model={self.model!r}, {defined})"
@@ -0,0 +1,63 @@
+import os
+import re
+import threading
+
+try:
+    from modules.output_sink import ensure_directory, reserve_path, write_output_file
+    from modules.profiling import stage
+except ImportError:
+    from output_sink import ensure_directory, reserve_path, write_output_file
+    from profiling import stage
+
+# (directory, base_name, extension) -> next suffix to try, 0 standing for the bare name
+_next_suffix = {}
+_lock = threading.Lock()
+
+def _scan_next_suffix(directory, base_name, extension):
+    """Scan the directory once and return the suffix following the highest one in use"""
+    pattern = re.compile(rf"{re.escape(base_name)}(?:-(\d+))?\.{re.escape(extension)}")
+    highest = -1
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                match = pattern.fullmatch(entry.name)
+                if match:
+                    highest = max(highest, int(match.group(1) or 0))
+    except FileNotFoundError:
+        pass
+    return highest + 1
+
+def _candidate_path(directory, base_name, extension, suffix):
+    if suffix == 0:
+        return os.path.join(directory, f"{base_name}.{extension}")
+    return os.path.join(directory, f"{base_name}-{suffix}.{extension}")
+
+@stage("allocate")
+def get_unique_filename(directory, base_name, extension):
+    """Allocate a unique "base_name[-N].extension" path in directory
+
+    The directory is scanned only the first time a name is requested, then a
+    counter is kept in memory. The file is reserved with an exclusive create so
+    concurrent workers never get the same name; a worker losing the race simply
+    moves on to the next suffix. The empty placeholder is removed again if the
+    output is never written (see output_sink.reserve_path).
+    """
+    key = (os.path.abspath(directory), base_name, extension)
+    while True:
+        with _lock:
+            suffix = _next_suffix.get(key)
+            if suffix is None:
+                suffix = _scan_next_suffix(directory, base_name, extension)
+            _next_suffix[key] = suffix + 1
+
+        output_path = _candidate_path(directory, base_name, extension, suffix)
+        try:
+            reserve_path(output_path)
+            return output_path
+        except FileExistsError:
+            continue
+
+@stage("write")
+def write_output(output_path, content):
+    """Write a generated file, through the active output sink if there is one"""
+    write_output_file(output_path, content)
@@ -0,0 +1,291 @@
+"""Output sink: where the converters' generated files are written
+
+By default every output is written straight away (open, write, close), as it
+always was. A sink can be enabled for a run to cut the per-file syscalls:
+
+    direct       write each file at once (default)
+    buffered     keep files in memory and write them in batches (write-behind)
+    background   hand files to writer threads through a bounded queue
+
+with fsync "none" (default), "each" (every file before it is closed) or
+"batch" (a whole batch is written, then fsynced together, then each folder
+once). Output folders are created once per run and remembered.
+
+Files waiting in a buffer count as existing for output_exists(), so the cache
+and dedup lookups see them. flush() and close() report the first write error.
+
+Output names are reserved with reserve_path(), which creates an empty file.
+A placeholder is removed again when its write fails, and at exit when it was
+never written (e.g. the content was still buffered when a flush failed).
+"""
+
+import atexit
+import os
+import queue
+import threading
+
+MODES = ("direct", "buffered", "background")
+FSYNC_MODES = ("none", "each", "batch")
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_BUFFER_BYTES = 8 << 20
+DEFAULT_THREADS = 2
+
+# Folders already created in this process
+_known_dirs = set()
+_dirs_lock = threading.Lock()
+
+# Paths reserved by reserve_path() that no write has filled yet
+_placeholders = set()
+_placeholders_lock = threading.Lock()
+
+def ensure_directory(directory):
+    """os.makedirs(directory, exist_ok=True), only the first time a folder is asked for"""
+    if directory in _known_dirs:
+        return
+    os.makedirs(directory, exist_ok=True)
+    with _dirs_lock:
+        _known_dirs.add(directory)
+
+def reserve_path(path):
+    """Create path as an empty placeholder, exclusively: FileExistsError if it is already there
+
+    Concurrent threads and processes never get the same path. The placeholder
+    is removed if its write fails, or at exit if it is never written.
+    """
+    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+    with _placeholders_lock:
+        _placeholders.add(path)
+
+def _filled(paths):
+    if _placeholders:
+        with _placeholders_lock:
+            _placeholders.difference_update(paths)
+
+def _drop_placeholders(paths, only_empty=False):
+    """Remove the placeholders among paths, as their outputs will not be written"""
+    with _placeholders_lock:
+        dropped = [path for path in paths if path in _placeholders]
+        _placeholders.difference_update(dropped)
+    for path in dropped:
+        try:
+            if not only_empty or os.path.getsize(path) == 0:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _open_output(path):
+    try:
+        return open(path, "w", encoding="utf-8")
+    except FileNotFoundError:
+        # The folder was removed during the run: create it again
+        directory = os.path.dirname(path)
+        with _dirs_lock:
+            _known_dirs.discard(directory)
+        if not directory:
+            raise
+        ensure_directory(directory)
+        return open(path, "w", encoding="utf-8")
+
+def _fsync_directory(directory):
+    """Make new directory entries durable (POSIX only; a no-op on Windows)"""
+    if os.name != "posix":
+        return
+    fd = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_files(items, fsync="none"):
+    """Write (path, content) pairs; with fsync="batch" they are fsynced together after all are written
+
+    When a write fails, the placeholders of the outputs not written are removed before the error is raised.
+    """
+    if fsync != "batch":
+        for number, (path, content) in enumerate(items):
+            try:
+                with _open_output(path) as f:
+                    f.write(content)
+                    if fsync == "each":
+                        f.flush()
+                        os.fsync(f.fileno())
+            except BaseException:
+                _drop_placeholders([path for path, _ in items[number:]])
+                raise
+        _filled([path for path, _ in items])
+        return
+
+    opened = []
+    try:
+        for path, content in items:
+            f = _open_output(path)
+            opened.append(f)
+            f.write(content)
+            f.flush()
+    except BaseException:
+        # The last file opened may hold part of its content
+        _drop_placeholders([path for path, _ in items[max(0, len(opened) - 1):]])
+        for f in opened:
+            f.close()
+        raise
+    _filled([path for path, _ in items])
+    try:
+        for f in opened:
+            os.fsync(f.fileno())
+    finally:
+        for f in opened:
+            f.close()
+    for directory in {os.path.dirname(path) for path, _ in items}:
+        _fsync_directory(directory)
+
+class OutputSink:
+    """Writes outputs according to a mode; use flush() to wait for pending writes and close() at the end"""
+
+    def __init__(self, mode="direct", fsync="none", batch_size=DEFAULT_BATCH_SIZE, buffer_bytes=DEFAULT_BUFFER_BYTES, threads=DEFAULT_THREADS):
+        if mode not in MODES:
+            raise ValueError(f"Unknown write mode: {mode} (expected {', '.join(MODES)})")
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"Unknown fsync mode: {fsync} (expected {', '.join(FSYNC_MODES)})")
+        self.mode = mode
+        self.fsync = fsync
+        self.batch_size = max(1, batch_size)
+        self.buffer_bytes = buffer_bytes
+        self.written = 0
+        self._pending = {}   # path -> content, not written yet
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._error = None
+        self._queue = None
+        self._threads = []
+
+        if mode == "background":
+            self._queue = queue.Queue(maxsize=self.batch_size * max(1, threads) * 2)
+            for number in range(max(1, threads)):
+                thread = threading.Thread(target=self._writer_loop, name=f"output-writer-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def write(self, path, content):
+        if self.mode == "direct":
+            write_files([(path, content)], self.fsync)
+            self.written += 1
+            return
+        with self._lock:
+            # A rewrite of a pending file replaces its content
+            self._pending_bytes += len(content) - len(self._pending.get(path, ""))
+            self._pending[path] = content
+            full = self.mode == "buffered" and (len(self._pending) >= self.batch_size or self._pending_bytes >= self.buffer_bytes)
+        if self.mode == "background":
+            self._queue.put(path)
+        elif full:
+            self.flush()
+
+    def is_pending(self, path):
+        return path in self._pending
+
+    def _take(self, paths):
+        """Remove paths from the pending files; (path, content) pairs still to write"""
+        items = []
+        with self._lock:
+            for path in paths:
+                content = self._pending.pop(path, None)
+                if content is not None:
+                    self._pending_bytes -= len(content)
+                    items.append((path, content))
+        return items
+
+    def _write(self, items):
+        try:
+            write_files(items, self.fsync)
+        except OSError as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+            return
+        with self._lock:
+            self.written += len(items)
+
+    def _writer_loop(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                self._queue.task_done()
+                return
+            # Group whatever else is queued into one batch
+            paths = [path]
+            while len(paths) < self.batch_size:
+                try:
+                    path = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if path is None:
+                    self._queue.put(None)
+                    self._queue.task_done()
+                    break
+                paths.append(path)
+            self._write(self._take(paths))
+            for _ in paths:
+                self._queue.task_done()
+
+    def flush(self):
+        """Write everything pending; raises the first write error since the last flush"""
+        if self.mode == "background":
+            self._queue.join()
+        elif self.mode == "buffered":
+            self._write(self._take(list(self._pending)))
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+_direct_sink = OutputSink()
+_active_sink = None
+
+def enable_sink(mode="buffered", fsync="none", batch_size=DEFAULT_BATCH_SIZE, threads=DEFAULT_THREADS):
+    """Route the converters' output writes through a sink for this process"""
+    global _active_sink
+    disable_sink()
+    _active_sink = OutputSink(mode, fsync, batch_size, threads=threads)
+    return _active_sink
+
+def disable_sink():
+    """Write what is pending and go back to direct writes"""
+    global _active_sink
+    if _active_sink is not None:
+        sink, _active_sink = _active_sink, None
+        sink.close()
+
+def get_active_sink():
+    return _active_sink
+
+def write_output_file(path, content):
+    (_active_sink or _direct_sink).write(path, content)
+
+def flush_outputs():
+    """Wait until every output written so far is on disk (as durable as the fsync mode makes it)"""
+    if _active_sink is not None:
+        _active_sink.flush()
+
+def output_exists(path):
+    """os.path.exists, also true for an output still waiting in the sink"""
+    return (_active_sink is not None and _active_sink.is_pending(path)) or os.path.exists(path)
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        disable_sink()
+    except OSError as e:
+        print(f"❌ Error writing outputs: {e}")
+    finally:
+        # Names reserved for outputs that were never written (a linked output is no longer empty)
+        _drop_placeholders(list(_placeholders), only_empty=True)
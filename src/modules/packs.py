@@ -0,0 +1,308 @@
+"""Outfit packs: convert the files of a zip or tar archive straight into another archive
+
+Members are read one at a time from the pack (a tar is read as a stream, so
+a compressed tar can come from a pipe), converted in memory with the usual
+converters and written as members of the output archive, with the same path
+and the extension of the output format. Nothing is extracted to disk.
+
+Each member is converted by its kind unless a direction is given:
+
+    .txt  BBFAS code   → Cherax JSON
+    .json BBFAS JSON   → Cherax JSON
+    .json Cherax JSON  → BBFAS code
+
+The output archive is zip or tar (.tar, .tar.gz/.tgz, .tar.bz2, .tar.xz)
+according to its name. It is written under a temporary name and renamed once
+complete.
+"""
+
+import collections
+import contextlib
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+
+from . import parallel, pipeline
+from .sync import EXTENSIONS, OUTPUT_ROOT, serializer
+
+INPUT_EXTENSIONS = (".txt", ".json")
+MAX_MEMBER_SIZE = 1 << 24   # a single outfit file is a few KB: larger members are not outfits
+DEFAULT_CHUNK_SIZE = 64
+
+PackReport = collections.namedtuple("PackReport", "converted failed skipped")
+
+# Pack member read from an archive: path inside it, modification time and UTF-8 text (None if unreadable)
+Member = collections.namedtuple("Member", "name mtime text error")
+
+_TAR_WRITE_MODES = (
+    (".tar.gz", "w|gz"),
+    (".tgz", "w|gz"),
+    (".tar.bz2", "w|bz2"),
+    (".tar.xz", "w|xz"),
+    (".tar", "w|"),
+)
+
+def is_outfit_member(name):
+    """Whether a member path names an outfit file (and not macOS metadata)"""
+    base = name.rsplit("/", 1)[-1]
+    return name.lower().endswith(INPUT_EXTENSIONS) and not base.startswith("._") and not name.startswith("__MACOSX/")
+
+def _decode(data):
+    return data.decode("utf-8").strip()
+
+def _iter_zip_members(source, skipped):
+    with zipfile.ZipFile(source) as pack:
+        for info in pack.infolist():
+            if info.is_dir():
+                continue
+            if not is_outfit_member(info.filename):
+                skipped.append(info.filename)
+                continue
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            if info.file_size > MAX_MEMBER_SIZE:
+                yield Member(info.filename, mtime, None, f"member of {info.file_size} bytes is too large")
+                continue
+            try:
+                with pack.open(info) as f:
+                    yield Member(info.filename, mtime, _decode(f.read(MAX_MEMBER_SIZE + 1)), None)
+            except (OSError, UnicodeDecodeError, zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                # RuntimeError: encrypted member
+                yield Member(info.filename, mtime, None, f"Error reading member: {e}")
+
+def _iter_tar_members(stream, skipped):
+    # Stream mode: members are read in order without seeking, compression detected
+    with tarfile.open(fileobj=stream, mode="r|*") as pack:
+        for info in pack:
+            if not info.isfile():
+                continue
+            if not is_outfit_member(info.name):
+                skipped.append(info.name)
+                continue
+            if info.size > MAX_MEMBER_SIZE:
+                yield Member(info.name, info.mtime, None, f"member of {info.size} bytes is too large")
+                continue
+            try:
+                yield Member(info.name, info.mtime, _decode(pack.extractfile(info).read()), None)
+            except (OSError, UnicodeDecodeError, tarfile.TarError) as e:
+                yield Member(info.name, info.mtime, None, f"Error reading member: {e}")
+
+def iter_pack_members(source, skipped=None):
+    """Yield the outfit files of a zip or tar pack (a path, or "-" for a tar on stdin) as Members
+
+    The names of the other files are appended to skipped when a list is given.
+    Raises ValueError when the source is neither a zip nor a tar archive.
+    """
+    skipped = skipped if skipped is not None else []
+    if source == "-":
+        yield from _iter_tar_members(sys.stdin.buffer, skipped)
+        return
+    if zipfile.is_zipfile(source):
+        yield from _iter_zip_members(source, skipped)
+        return
+    if not tarfile.is_tarfile(source):
+        raise ValueError(f"{source} is not a zip or tar archive")
+    with open(source, "rb") as f:
+        yield from _iter_tar_members(f, skipped)
+
+def member_direction(name, text):
+    """Conversion direction of a pack member by its kind: (direction, data to convert)"""
+    if name.lower().endswith(".txt"):
+        return "bbfas-cherax", text
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Left to the converter, which reports the JSON error
+        return "cherax-bbfas", text
+    if isinstance(data, dict) and "Item" in data:
+        return "json-cherax", data
+    return "cherax-bbfas", data
+
+class PackWriter:
+    """Output archive (zip or tar by its name) written under a temporary name, renamed by close()"""
+
+    def __init__(self, path):
+        self.path = path
+        self._temporary = f"{path}.part"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._names = set()
+        lower = path.lower()
+        self._tar_mode = next((mode for extension, mode in _TAR_WRITE_MODES if lower.endswith(extension)), None)
+        if self._tar_mode is None and not lower.endswith(".zip"):
+            raise ValueError(f"Unknown archive type: {path} (expected .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz)")
+        if self._tar_mode is None:
+            self._zip = zipfile.ZipFile(self._temporary, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self._tar = tarfile.open(self._temporary, self._tar_mode)
+
+    def _unique_name(self, name):
+        """name, or name-1, name-2... when it is already in the archive"""
+        stem, extension = os.path.splitext(name)
+        counter = 1
+        while name in self._names:
+            name = f"{stem}-{counter}{extension}"
+            counter += 1
+        self._names.add(name)
+        return name
+
+    def write(self, name, text, mtime=None):
+        """Add a member; returns its name, suffixed if the name was already used"""
+        name = self._unique_name(name)
+        data = text.encode("utf-8")
+        mtime = time.time() if mtime is None else mtime
+        if self._tar_mode is None:
+            info = zipfile.ZipInfo(name, time.localtime(max(mtime, 315532800))[:6])   # zip dates start in 1980
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(mtime)
+            self._tar.addfile(info, io.BytesIO(data))
+        return name
+
+    def close(self, keep=True):
+        """Finish the archive and give it its name, or remove it with keep=False"""
+        (self._zip if self._tar_mode is None else self._tar).close()
+        if keep:
+            os.replace(self._temporary, self.path)
+        else:
+            os.remove(self._temporary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(keep=exc_type is None)
+
+def default_output_path(source):
+    """src/output/<pack name>_converted.zip"""
+    name = os.path.basename(source) if source != "-" else "pack"
+    for extension in (".zip", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar"):
+        if name.lower().endswith(extension):
+            name = name[:-len(extension)]
+            break
+    return os.path.join(OUTPUT_ROOT, f"{name}_converted.zip")
+
+def _convert_member(task):
+    """Worker entry point: convert one (index, direction, data, gender) task"""
+    index, direction, data, gender = task
+    return (index,) + parallel.run_quiet(direction, data, gender)
+
+def _tasks(members, direction, gender, pending, failures):
+    """Conversion tasks of the readable members; pending keeps (member, direction) by index"""
+    for index, member in enumerate(members):
+        if member.error is not None:
+            failures.append((member.name, member.error))
+            continue
+        if direction is None:
+            member_dir, data = member_direction(member.name, member.text)
+        else:
+            member_dir, data = direction, member.text
+        pending[index] = (member, member_dir)
+        yield index, member_dir, data, gender
+
+def convert_pack(source, output=None, direction=None, gender="MALE", workers=1, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    """Convert the outfit files of a zip/tar pack into an output archive; returns a PackReport
+
+    direction=None converts each member by its kind. report(action, member,
+    detail) is called for every converted member (detail is its name in the
+    output archive) and every failed one (detail is the error). workers=None
+    uses every core and workers=1 converts in this process; with several
+    workers, at most parallel.WINDOW_CHUNKS chunks per worker are read from
+    the pack ahead of the members written. Raises ValueError for a source that
+    is not an archive or an unknown output type.
+    """
+    if direction is not None and direction not in pipeline.DIRECTIONS:
+        raise ValueError(f"Unknown conversion direction: {direction}")
+    output = output or default_output_path(source)
+    report = report or (lambda action, member, detail: None)
+    workers = workers or os.cpu_count() or 1
+
+    skipped = []
+    failures = []    # unreadable members, reported as the conversions go
+    pending = {}     # index -> (Member, direction) of the conversions under way
+    serializers = {}
+    converted = 0
+    failed = 0
+
+    members = iter_pack_members(source, skipped)
+    tasks = _tasks(members, direction, gender, pending, failures)
+    with PackWriter(output) as writer:
+        if workers == 1:
+            results = (_convert_member(task) for task in tasks)
+            pool = None
+        else:
+            import multiprocessing
+
+            pool = multiprocessing.Pool(workers)
+            results = parallel.imap_bounded(pool, _convert_member, tasks, parallel.WINDOW_CHUNKS * workers * max(1, chunk_size), chunk_size)
+        try:
+            # Closed before the pool terminates, so its task thread stops waiting for a slot
+            with contextlib.closing(results):
+                for index, result, error in results:
+                    while failures:
+                        report("failed", *failures.pop(0))
+                        failed += 1
+                    member, member_dir = pending.pop(index)
+                    if not result:
+                        report("failed", member.name, error)
+                        failed += 1
+                        continue
+                    if member_dir not in serializers:
+                        serializers[member_dir] = serializer(member_dir)
+                    output_name = os.path.splitext(member.name)[0] + EXTENSIONS[pipeline.DIRECTIONS[member_dir][1]]
+                    report("converted", member.name, writer.write(output_name, serializers[member_dir](result), member.mtime))
+                    converted += 1
+        finally:
+            if pool is not None:
+                pool.terminate()
+        for name, error in failures:
+            report("failed", name, error)
+            failed += 1
+    return PackReport(converted, failed, len(skipped))
+
+def main(args):
+    """Outfit pack conversion entry point: python main.py convert-pack PACK [-o OUTPUT]"""
+    import argparse
+
+    from .cli import add_gender_argument, add_profile_arguments, enable_profiling
+
+    parser = argparse.ArgumentParser(prog="main.py convert-pack",
+                                     description="Convert the outfit files of a zip or tar pack into another archive, without extracting them")
+    parser.add_argument("pack", help="zip or tar archive (.tar, .tar.gz, .tgz, .tar.bz2, .tar.xz), or - for a tar on stdin")
+    parser.add_argument("-o", "--output", help="output archive, zip or tar by its extension (default: src/output/<pack name>_converted.zip)")
+    parser.add_argument("-d", "--direction", choices=list(pipeline.DIRECTIONS),
+                        help="convert every member this way (default: by kind, .txt BBFAS codes and BBFAS JSON to Cherax, Cherax JSON to BBFAS)")
+    add_gender_argument(parser)
+    parser.add_argument("-w", "--workers", default=1, type=int, help="conversion processes, 0 for one per core (default: 1, in this process)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list every converted member")
+    add_profile_arguments(parser)
+    options = parser.parse_args(args)
+
+    enable_profiling(parser, options)
+    if options.pack != "-" and not os.path.isfile(options.pack):
+        parser.error(f"{options.pack} is not a file")
+
+    def report(action, member, detail):
+        if action == "failed":
+            print(f"❌ {member}: {detail}", file=sys.stderr)
+        elif options.verbose:
+            print(f"➕ {member} -> {detail}")
+
+    output = options.output or default_output_path(options.pack)
+    start = time.perf_counter()
+    try:
+        result = convert_pack(options.pack, output, options.direction, options.gender, options.workers or None, report=report)
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+    print(f"📦 {output}: {result.converted} converted, {result.failed} failed, {result.skipped} other files skipped in {elapsed:.2f} s "
+          f"({result.converted / elapsed if elapsed else 0:.0f} files/s)", file=sys.stderr)
+    return 1 if result.failed else 0
@@ -0,0 +1,186 @@
+import contextlib
+import io
+import os
+import threading
+
+from . import cache, pipeline, profiling
+
+DEFAULT_CHUNK_SIZE = 64
+WINDOW_CHUNKS = 4   # chunks per worker taken from the input ahead of the results
+
+# Per-worker settings, set once by _init_worker instead of being shipped with every item
+_direction = None
+_gender = None
+_from_files = False
+
+def _set_batch_settings(direction, gender, from_files):
+    global _direction, _gender, _from_files
+    _direction = direction
+    _gender = gender
+    _from_files = from_files
+
+def _init_worker(direction, gender, from_files, cache_settings=None):
+    """Store the batch settings in the worker process"""
+    _set_batch_settings(direction, gender, from_files)
+
+    # A forked worker starts with a copy of the parent's profiling state
+    profiling.start_worker()
+
+    # Each worker opens its own cache; a forked worker must not reuse the parent's connection
+    cache.detach_cache()
+    if cache_settings is not None:
+        cache.enable_cache(**cache_settings)
+
+def _cache_settings():
+    """Settings workers open the active cache with, or None when there is none"""
+    active_cache = cache.get_active_cache()
+    return active_cache.settings() if active_cache is not None else None
+
+def make_executor(workers):
+    """ProcessPoolExecutor for run_quiet calls, its workers set up like those of convert_many
+
+    Each worker opens its own connection to the active cache and keeps profiling if it is on.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(None, "MALE", False, _cache_settings()))
+
+def read_input_file(file_path):
+    """Read one input file: a BBFAS code (.txt) or a JSON document, returned as text"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+# Marks the converter messages start with, left out of the errors reported
+_MESSAGE_MARKS = ("❌", "⚠️", "⚠")
+
+def error_message(output):
+    """Error of captured converter output: its non-empty lines without their leading mark, joined with " | " """
+    errors = []
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        for mark in _MESSAGE_MARKS:
+            if line.startswith(mark):
+                line = line[len(mark):].lstrip()
+                break
+        errors.append(line)
+    return " | ".join(errors)
+
+def capture_messages(func, *args):
+    """Call func(*args) with the messages it prints captured; returns (result, error_message of the messages)"""
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        result = func(*args)
+    return result, error_message(messages.getvalue())
+
+def _convert_reporting_errors(direction, data, gender):
+    try:
+        return pipeline.convert(direction, data, gender)
+    except Exception as e:
+        print(f"❌ Error during conversion: {e}")
+        return None
+
+def run_quiet(direction, data, gender="MALE"):
+    """Run one conversion, capturing the converter messages
+
+    Returns (result, error) where error is None on success.
+    """
+    result, error = capture_messages(_convert_reporting_errors, direction, data, gender)
+    if result:
+        return result, None
+    return None, error or "conversion failed"
+
+def _convert_item(task):
+    """Worker entry point: convert one (index, item) task"""
+    index, item = task
+    data = item
+    if _from_files:
+        try:
+            data = read_input_file(item)
+        except (OSError, UnicodeDecodeError) as e:
+            return index, item, None, f"Error loading file: {e}"
+
+    result, error = run_quiet(_direction, data, _gender)
+    return index, item, result, error
+
+def _convert_item_profiled(task):
+    """Worker entry point when profiling: also send back the stage counters of the worker"""
+    return _convert_item(task), profiling.take_stats()
+
+def iter_input_files(directory, extensions=(".json", ".txt")):
+    """Yield the input files of a directory in name order"""
+    with os.scandir(directory) as entries:
+        names = sorted(entry.name for entry in entries if entry.is_file() and entry.name.lower().endswith(extensions))
+    for name in names:
+        yield os.path.join(directory, name)
+
+def _windowed(tasks, window, stopped):
+    """Tasks taken one window slot at a time: the pool reads its input as fast as it can otherwise
+
+    Runs in the pool's task thread; gives up waiting once stopped is set, so the pool can be terminated.
+    """
+    while True:
+        while not window.acquire(timeout=0.1):
+            if stopped.is_set():
+                return
+        if stopped.is_set():
+            return
+        task = next(tasks, None)
+        if task is None:
+            return
+        yield task
+
+def imap_bounded(pool, func, tasks, max_in_flight, chunk_size=1, ordered=True):
+    """pool.imap (imap_unordered with ordered=False) taking at most max_in_flight tasks ahead of the results yielded
+
+    Close the generator (contextlib.closing) before terminating the pool when
+    stopping early, so the pool's task thread stops waiting for a slot.
+    """
+    chunk_size = max(1, chunk_size)
+    # The pool hands out whole chunks: two must fit in the window for one to always be under way
+    window = threading.Semaphore(max(max_in_flight, 2 * chunk_size))
+    stopped = threading.Event()
+    mapper = pool.imap if ordered else pool.imap_unordered
+    try:
+        for result in mapper(func, _windowed(iter(tasks), window, stopped), chunksize=chunk_size):
+            yield result
+            window.release()
+    finally:
+        stopped.set()
+
+def convert_many(direction, items, gender="MALE", workers=None, chunk_size=DEFAULT_CHUNK_SIZE, ordered=True, from_files=False, max_in_flight=None):
+    """Convert many records (or files when from_files=True) across a process pool
+
+    Yields (index, item, result, error) tuples, in input order when ordered=True or
+    as soon as each chunk completes otherwise. workers=None uses every core and
+    workers=1 converts in the current process. At most max_in_flight items
+    (default WINDOW_CHUNKS chunks per worker) are read from items ahead of the
+    results yielded, so memory stays bounded on a large input stream.
+    """
+    if direction not in pipeline.DIRECTIONS:
+        raise ValueError(f"Unknown conversion direction: {direction}")
+
+    workers = workers or os.cpu_count() or 1
+    tasks = enumerate(items)
+
+    if workers == 1:
+        _set_batch_settings(direction, gender, from_files)
+        for task in tasks:
+            yield _convert_item(task)
+        return
+
+    import multiprocessing
+
+    chunk_size = max(1, chunk_size)
+    profiled = profiling.is_enabled()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(direction, gender, from_files, _cache_settings())) as pool:
+        # Closed before the pool terminates, also when the caller stops early
+        with contextlib.closing(imap_bounded(pool, _convert_item_profiled if profiled else _convert_item, tasks,
+                                             max_in_flight or WINDOW_CHUNKS * workers * chunk_size, chunk_size, ordered)) as results:
+            for converted in results:
+                if profiled:
+                    converted, stage_stats = converted
+                    if stage_stats:
+                        profiling.merge_stats(stage_stats)
+                yield converted
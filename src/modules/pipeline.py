@@ -0,0 +1,77 @@
+from . import CONVERTER_FILES, cache, load_converter
+
+def __getattr__(name):
+    """pipeline.bbfas_json / json_cherax / cherax_bbfas: the converter modules, loaded on first use"""
+    if name in CONVERTER_FILES:
+        return load_converter(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Conversion directions -> (input kind, output kind)
+DIRECTIONS = {
+    "bbfas-json": ("code", "json"),            # BBFAS CODE → JSON BBFAS
+    "json-cherax": ("json", "json"),           # JSON BBFAS → JSON CHERAX
+    "cherax-bbfas": ("json", "code"),          # JSON CHERAX → BBFAS CODE
+    "bbfas-cherax": ("code", "json"),          # BBFAS CODE → JSON CHERAX (direct)
+    "bbfas-cherax-bbfas": ("code", "code"),    # BBFAS → CHERAX → BBFAS (complete)
+}
+
+def bbfas_to_cherax(code, gender="MALE"):
+    """BBFAS CODE → CHERAX outfit, entirely in memory"""
+    bbfas_data = load_converter("bbfas_json").bbfas_to_json(code)
+    if not bbfas_data:
+        return None
+    return load_converter("json_cherax").json_to_cherax(bbfas_data, gender)
+
+def bbfas_round_trip(code, gender="MALE"):
+    """BBFAS → CHERAX → BBFAS, entirely in memory
+
+    Returns (bbfas_data, cherax_outfit, bbfas_code), stopping at the first failed step.
+    """
+    bbfas_data = load_converter("bbfas_json").bbfas_to_json(code)
+    if not bbfas_data:
+        return None, None, None
+
+    cherax_outfit = load_converter("json_cherax").json_to_cherax(bbfas_data, gender)
+    if not cherax_outfit:
+        return bbfas_data, None, None
+
+    return bbfas_data, cherax_outfit, load_converter("cherax_bbfas").cherax_to_bbfas(cherax_outfit, gender)
+
+# Conversion directions -> in-memory converter taking (data, gender)
+CONVERTERS = {
+    "bbfas-json": lambda code, gender: load_converter("bbfas_json").bbfas_to_json(code),
+    "json-cherax": lambda data, gender: load_converter("json_cherax").json_to_cherax(data, gender),
+    "cherax-bbfas": lambda data, gender: load_converter("cherax_bbfas").cherax_to_bbfas(data, gender),
+    "bbfas-cherax": bbfas_to_cherax,
+    "bbfas-cherax-bbfas": lambda code, gender: bbfas_round_trip(code, gender)[2],
+}
+
+def convert(direction, data, gender="MALE"):
+    """Run one conversion direction on a Python object or string, without touching the disk
+
+    Goes through the conversion cache when it is enabled.
+    """
+    converter = CONVERTERS.get(direction)
+    if converter is None:
+        raise ValueError(f"Unknown conversion direction: {direction}")
+    return cache.cached_convert(direction, converter, data, gender)
+
+def convert_bbfas_to_cherax(code, gender="MALE", output_filename=None):
+    """BBFAS CODE → JSON CHERAX file, with the Cherax file as the only write"""
+    if cache.get_active_cache() is None:
+        # Straight from the Outfit to the file text, without building the Cherax dict
+        cherax_outfit = load_converter("bbfas_json").bbfas_to_outfit(code)
+    else:
+        cherax_outfit = convert("bbfas-cherax", code, gender)
+    if not cherax_outfit:
+        print("❌ Error during BBFAS → CHERAX conversion")
+        return None
+    return load_converter("json_cherax").save_cherax_json(cherax_outfit, gender, output_filename)
+
+def convert_bbfas_round_trip(code, gender="MALE", output_filename=None):
+    """BBFAS → CHERAX → BBFAS code file, with the final code as the only write"""
+    bbfas_code = convert("bbfas-cherax-bbfas", code, gender)
+    if not bbfas_code:
+        print("❌ Error during BBFAS → CHERAX → BBFAS conversion")
+        return None
+    return load_converter("cherax_bbfas").save_bbfas_code(bbfas_code, gender, output_filename)
@@ -0,0 +1,167 @@
+"""Opt-in profiling of the conversion stages
+
+Functions decorated with @stage(name) are timed per stage (decode, parse, map,
+serialize, allocate, write) once profiling is enabled, with enable() or the
+OUTFITS_PROFILE environment variable (e.g. OUTFITS_PROFILE=stages,cprofile).
+The timers check at each call whether profiling is on, so functions of
+modules loaded before enable() are timed as well; with profiling off, a
+call only pays for that check.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import time
+
+ENV_VAR = "OUTFITS_PROFILE"
+MODES = ("stages", "cprofile", "tracemalloc")
+STAGES = ("decode", "parse", "map", "serialize", "allocate", "write")
+TOP_ENTRIES = 20
+
+_enabled = False
+_modes = ()
+_started_at = None
+_counters = {}          # stage -> [calls, total ns, max ns]
+_profiler = None
+_cprofile_output = None
+
+def _stage_counters(name):
+    counters = _counters.get(name)
+    if counters is None:
+        counters = _counters[name] = [0, 0, 0]
+    return counters
+
+def stage(name):
+    """Decorator timing every call of a function under the given stage while profiling is enabled"""
+    def decorate(func):
+        counters = _stage_counters(name)
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                counters[0] += 1
+                counters[1] += elapsed
+                if elapsed > counters[2]:
+                    counters[2] = elapsed
+        return timed
+    return decorate
+
+def parse_modes(text):
+    """Profiling modes from a comma-separated list such as "stages,tracemalloc" ("1" means stages)"""
+    modes = {"stages" if mode in ("1", "on", "true") else mode for mode in text.lower().replace(" ", "").split(",") if mode}
+    unknown = modes - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown profiling mode: {', '.join(sorted(unknown))} (expected {', '.join(MODES)})")
+    return tuple(mode for mode in MODES if mode in modes) or ("stages",)
+
+def enable(modes=("stages",), cprofile_output=None, report_at_exit=True):
+    """Start profiling: stage timers, plus a cProfile and/or tracemalloc capture when asked
+
+    Worker processes started afterwards inherit the stage timers (only) through OUTFITS_PROFILE.
+    """
+    global _enabled, _modes, _started_at, _profiler, _cprofile_output
+    if _enabled:
+        return
+    _enabled = True
+    _modes = tuple(modes)
+    _started_at = time.perf_counter()
+    _cprofile_output = cprofile_output
+    os.environ[ENV_VAR] = "stages"
+
+    if "cprofile" in _modes:
+        import cProfile
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if "tracemalloc" in _modes:
+        import tracemalloc
+
+        tracemalloc.start()
+    if report_at_exit:
+        atexit.register(report)
+
+def is_enabled():
+    return _enabled
+
+def take_stats():
+    """Return the stage counters recorded since the last call and reset them, or None if there are none"""
+    stats = {name: tuple(counters) for name, counters in _counters.items() if counters[0]}
+    for counters in _counters.values():
+        counters[:] = (0, 0, 0)
+    return stats or None
+
+def start_worker():
+    """In a forked worker process: drop the parent's counters and captures, keeping the stage timers"""
+    global _profiler, _modes
+    take_stats()
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler = None
+    if "tracemalloc" in _modes:
+        import tracemalloc
+
+        tracemalloc.stop()
+    _modes = ("stages",) if _enabled else ()
+
+def merge_stats(stats):
+    """Add stage counters taken in another process"""
+    for name, (calls, total, longest) in stats.items():
+        counters = _stage_counters(name)
+        counters[0] += calls
+        counters[1] += total
+        if longest > counters[2]:
+            counters[2] = longest
+
+def report(file=None):
+    """Print the stage timers and the cProfile / tracemalloc captures, once"""
+    global _enabled, _profiler
+    if not _enabled:
+        return
+    _enabled = False
+    file = file or sys.stderr
+    wall_ns = (time.perf_counter() - _started_at) * 1e9
+
+    print(f"\n⏱️  Profile ({', '.join(_modes)}), {wall_ns / 1e6:.0f} ms wall", file=file)
+    print(f"{'stage':<10} {'calls':>9} {'total ms':>10} {'mean µs':>9} {'max µs':>9} {'share':>7}", file=file)
+    names = [name for name in STAGES if name in _counters] + sorted(set(_counters) - set(STAGES))
+    for name in names:
+        calls, total, longest = _counters[name]
+        if calls:
+            print(f"{name:<10} {calls:>9} {total / 1e6:>10.1f} {total / calls / 1e3:>9.1f} {longest / 1e3:>9.1f} "
+                  f"{total / wall_ns:>7.1%}", file=file)
+
+    if _profiler is not None:
+        import pstats
+
+        _profiler.disable()
+        if _cprofile_output:
+            _profiler.dump_stats(_cprofile_output)
+            print(f"💾 cProfile data written to {_cprofile_output}", file=file)
+        print(f"\n🔍 Top {TOP_ENTRIES} functions by cumulative time:", file=file)
+        pstats.Stats(_profiler, stream=file).sort_stats("cumulative").print_stats(TOP_ENTRIES)
+        _profiler = None
+
+    if "tracemalloc" in _modes:
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"\n🧠 Memory: {current / 1024:.0f} KB allocated, {peak / 1024:.0f} KB peak", file=file)
+            for statistic in tracemalloc.take_snapshot().statistics("lineno")[:10]:
+                print(f"   {statistic}", file=file)
+            tracemalloc.stop()
+
+# Processes started with OUTFITS_PROFILE set (including worker processes) profile from the start
+if os.environ.get(ENV_VAR):
+    try:
+        enable(parse_modes(os.environ[ENV_VAR]))
+    except ValueError as e:
+        print(f"⚠️  {ENV_VAR} ignored: {e}", file=sys.stderr)
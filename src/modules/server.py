@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+
+from . import cache, parallel, pipeline
+from .cli import add_profile_arguments, enable_profiling
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "outfits-converter.sock")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CONCURRENCY = 64   # requests in flight per server, further requests wait to be read
+DEFAULT_WINDOW = 32            # requests a client sends ahead of the responses
+MAX_REQUEST_SIZE = 1 << 24     # same limit as a streamed JSON record
+
+_END = object()
+
+def _encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+class ConversionServer:
+    """Long-running conversion daemon speaking newline-delimited JSON over a Unix socket or localhost TCP
+
+    Each request is one line {"id": ..., "direction": ..., "data": ..., "gender": ...}
+    and gets one response line {"id": ..., "result": ...} or {"id": ..., "error": ...}.
+    A client may send many requests without waiting (pipelining); responses carry
+    the request id and are written as soon as each conversion completes.
+
+    Conversions run in the event loop (they take microseconds) or, with workers > 1,
+    in a process pool. At most max_concurrency requests are in flight at a time.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, workers=1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.workers = workers
+        self.served = 0
+        self.failed = 0
+        self._slots = None
+        self._executor = None
+
+    async def _convert(self, direction, data, gender):
+        if self._executor is None:
+            return parallel.run_quiet(direction, data, gender)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, parallel.run_quiet, direction, data, gender)
+
+    async def _serve_request(self, line, writer):
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                direction = request["direction"]
+                gender = str(request.get("gender") or "MALE").upper()
+                data = request["data"]
+            except (ValueError, AttributeError) as e:
+                result, error = None, f"Invalid request: {e}"
+            except KeyError as e:
+                result, error = None, f"Invalid request: missing {e}"
+            else:
+                if direction not in pipeline.DIRECTIONS:
+                    result, error = None, f"Unknown conversion direction: {direction}"
+                else:
+                    try:
+                        result, error = await self._convert(direction, data, gender)
+                    except Exception as e:   # e.g. a worker process died
+                        result, error = None, f"Error during conversion: {e}"
+
+            if error is None:
+                self.served += 1
+                writer.write(_encode({"id": request_id, "result": result}))
+            else:
+                self.failed += 1
+                writer.write(_encode({"id": request_id, "error": error}))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._slots.release()
+
+    async def _handle_connection(self, reader, writer):
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(_encode({"id": None, "error": "Invalid request: line too long"}))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                # Stop reading once the limit is reached: the client waits in the socket buffer
+                await self._slots.acquire()
+                task = asyncio.create_task(self._serve_request(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path=None, host=None, port=None, ready=None):
+        """Serve until cancelled, on the Unix socket path (default) or on host:port
+
+        ready, if given, is called with the listening address once the server accepts connections.
+        """
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self.workers > 1:
+            self._executor = parallel.make_executor(self.workers)
+
+        if host is None and port is None and hasattr(socket, "AF_UNIX"):
+            path = path or DEFAULT_SOCKET_PATH
+            _remove_stale_socket(path)
+            server = await asyncio.start_unix_server(self._handle_connection, path, limit=MAX_REQUEST_SIZE)
+            address = path
+        else:
+            path = None
+            host = host or DEFAULT_HOST
+            port = DEFAULT_PORT if port is None else port
+            server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_REQUEST_SIZE)
+            address = server.sockets[0].getsockname()[:2]
+
+        # Stop cleanly on SIGTERM too, where the event loop supports signal handlers
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, AttributeError):
+            pass
+
+        try:
+            async with server:
+                if ready is not None:
+                    ready(address)
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+
+def _remove_stale_socket(path):
+    """Remove a socket file left behind by a server that is no longer running"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+    else:
+        raise OSError(f"A conversion server is already running on {path}")
+    finally:
+        probe.close()
+
+class ConversionClient:
+    """Thin blocking client for ConversionServer
+
+    address is a Unix socket path or a (host, port) tuple. Use as a context manager
+    or call close().
+    """
+
+    def __init__(self, address=None, timeout=None):
+        if address is None:
+            address = DEFAULT_SOCKET_PATH if hasattr(socket, "AF_UNIX") else (DEFAULT_HOST, DEFAULT_PORT)
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.settimeout(timeout)
+        self._socket.connect(address)
+        self._responses = self._socket.makefile("rb")
+        self._next_id = 0
+
+    def _read_response(self):
+        line = self._responses.readline()
+        if not line:
+            raise ConnectionError("Conversion server closed the connection")
+        return json.loads(line)
+
+    def convert(self, direction, data, gender="MALE"):
+        """Convert one record; raises ValueError with the server message when it fails"""
+        for result, error in self.convert_many(direction, [data], gender):
+            if error is not None:
+                raise ValueError(error)
+            return result
+
+    def convert_many(self, direction, items, gender="MALE", window=DEFAULT_WINDOW):
+        """Convert many records over one connection, with up to window requests in flight
+
+        Yields (result, error) tuples in input order, error being None on success.
+        """
+        responses = {}
+        first_id = self._next_id
+        next_yield = first_id
+        items = iter(items)
+        exhausted = False
+
+        while True:
+            # Send the next requests together, up to the window
+            requests = []
+            while not exhausted and self._next_id - next_yield < window:
+                data = next(items, _END)
+                if data is _END:
+                    exhausted = True
+                    break
+                requests.append(_encode({"id": self._next_id, "direction": direction, "data": data, "gender": gender}))
+                self._next_id += 1
+            if requests:
+                self._socket.sendall(b"".join(requests))
+
+            if next_yield == self._next_id:
+                return
+
+            while next_yield not in responses:
+                response = self._read_response()
+                responses[response.get("id")] = response
+            response = responses.pop(next_yield)
+            next_yield += 1
+            yield response.get("result"), response.get("error")
+
+    def close(self):
+        self._responses.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def main(args):
+    """Daemon entry point: python main.py serve [--socket PATH | --port PORT]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve conversions over a local socket until interrupted")
+    parser.add_argument("--socket", default=None, help=f"Unix socket path (default: {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--host", default=None, help=f"serve over TCP on this host instead (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", default=None, type=int, help=f"serve over TCP on this port instead (default: {DEFAULT_PORT})")
+    parser.add_argument("--max-concurrency", default=DEFAULT_MAX_CONCURRENCY, type=int, help="requests in flight at a time")
+    parser.add_argument("-w", "--workers", default=1, type=int, help="worker processes, 0 for one per core (default: 1, in the server process)")
+    parser.add_argument("--cache", action="store_true", help="reuse the results of outfits already converted")
+    parser.add_argument("--cache-db", nargs="?", const=cache.DEFAULT_DB_PATH, help=f"also keep the cache in a SQLite file (default: {cache.DEFAULT_DB_PATH})")
+    add_profile_arguments(parser)
+    options = parser.parse_args(args)
+
+    enable_profiling(parser, options)
+    if options.cache or options.cache_db:
+        cache.enable_cache(db_path=options.cache_db)
+
+    conversion_server = ConversionServer(options.max_concurrency, options.workers or os.cpu_count() or 1)
+
+    def ready(address):
+        print(f"🛰️  Conversion server listening on {address} (Ctrl+C to stop)", file=sys.stderr)
+
+    try:
+        asyncio.run(conversion_server.serve(options.socket, options.host, options.port, ready))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Server error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        cache.disable_cache()
+
+    print(f"📊 Served {conversion_server.served} conversions, {conversion_server.failed} failed", file=sys.stderr)
+    return 0
@@ -0,0 +1,301 @@
+"""Staged folder conversion: reading, converting and writing overlap
+
+Converting a folder file by file leaves the CPU idle while a file is read or
+written, and the disk idle while an outfit is converted. Here each step is a
+stage with its own threads, joined by bounded queues:
+
+    reader threads ──(read queue)──▶ conversion ──(write queue)──▶ writer threads
+
+Readers load the source files, the conversion stage runs the usual converters
+(pipeline.convert, in this process or a process pool) and writers serialize
+and write each result as the converters would. A full queue blocks the stage
+feeding it, so memory stays bounded whichever stage is the slowest, and the
+run takes about as long as that stage alone.
+
+Outputs mirror the source tree, with the extension of the output format, as
+with sync (but without a manifest: every source is converted).
+"""
+
+import collections
+import os
+import queue
+import threading
+import time
+
+from . import parallel, pipeline
+from .output_sink import ensure_directory, write_files
+from .sync import EXTENSIONS, check_output_dir, default_output_dir, scan_sources, serializer
+
+DEFAULT_READERS = 2
+DEFAULT_WRITERS = 2
+DEFAULT_QUEUE_SIZE = 256
+
+StagedReport = collections.namedtuple("StagedReport", "converted failed elapsed stages")
+
+_DONE = object()
+
+class StageStats:
+    """Counters of one stage: items handled, time spent working and the depth of its input queue"""
+
+    def __init__(self, name, threads):
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.failed = 0
+        self.busy = 0.0          # seconds spent working, summed over the stage's threads (None if not measured)
+        self.depth_total = 0     # queue depth seen by each item put on the input queue
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def add(self, busy, failed=False):
+        with self._lock:
+            self.items += 1
+            self.failed += failed
+            if self.busy is not None:
+                self.busy += busy
+
+    def saw_depth(self, depth):
+        with self._lock:
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def summary(self, elapsed):
+        """Dict of the counters and the rates over elapsed seconds"""
+        return {
+            "stage": self.name,
+            "threads": self.threads,
+            "items": self.items,
+            "failed": self.failed,
+            "per_second": self.items / elapsed if elapsed else 0.0,
+            "busy": self.busy,
+            "utilization": self.busy / (elapsed * self.threads) if self.busy is not None and elapsed else None,
+            "queue_mean": self.depth_total / self.items if self.items else 0.0,
+            "queue_max": self.depth_max,
+        }
+
+class StagedConverter:
+    """Converts every source file of a folder into an output folder through the three stages
+
+    Raises ValueError when the outputs would overwrite their sources (see sync.check_output_dir).
+    """
+
+    def __init__(self, source_dir, direction, output_dir=None, gender="MALE", readers=DEFAULT_READERS, writers=DEFAULT_WRITERS,
+                 workers=1, queue_size=DEFAULT_QUEUE_SIZE, fsync="none", report=None):
+        if direction not in pipeline.DIRECTIONS:
+            raise ValueError(f"Unknown conversion direction: {direction}")
+        input_format, output_format = pipeline.DIRECTIONS[direction]
+        self.source_dir = source_dir
+        self.direction = direction
+        self.output_dir = output_dir or default_output_dir(direction, source_dir)
+        self.gender = gender
+        self.workers = workers or os.cpu_count() or 1
+        self.fsync = fsync
+        self.report = report or (lambda action, source, detail: None)
+        self._input_extension = EXTENSIONS[input_format]
+        self._output_extension = EXTENSIONS[output_format]
+        check_output_dir(source_dir, self.output_dir, self._input_extension, self._output_extension)
+        self._serialize = serializer(direction)
+
+        self._read_queue = queue.Queue(maxsize=max(1, queue_size))
+        self._write_queue = queue.Queue(maxsize=max(1, queue_size))
+        self._read_stats = StageStats("read", max(1, readers))
+        self._convert_stats = StageStats("convert", self.workers)
+        self._write_stats = StageStats("write", max(1, writers))
+        if self.workers > 1:
+            # Conversions run in the pool; their time is not seen from here
+            self._convert_stats.busy = None
+        # Items between the read queue and the write queue: a process pool would
+        # otherwise take every read file and keep every result it is not yet asked for
+        self._in_flight = threading.BoundedSemaphore(max(1, queue_size))
+        self._waited = 0.0   # time the conversion stage spent waiting for reads
+        self._sources = None
+        self._sources_lock = threading.Lock()
+        self._report_lock = threading.Lock()
+        self._start = None
+
+    def stats(self):
+        """Per-stage summaries so far, in pipeline order"""
+        elapsed = time.perf_counter() - self._start if self._start is not None else 0.0
+        return [stage.summary(elapsed) for stage in (self._read_stats, self._convert_stats, self._write_stats)]
+
+    def _report(self, action, source, detail):
+        with self._report_lock:
+            self.report(action, source, detail)
+
+    def _put(self, stage_queue, stats, item):
+        stage_queue.put(item)
+        stats.saw_depth(stage_queue.qsize())
+
+    def _next_source(self):
+        with self._sources_lock:
+            return next(self._sources, None)
+
+    def _reader(self):
+        while True:
+            entry = self._next_source()
+            if entry is None:
+                return
+            source = entry[0]
+            start = time.perf_counter()
+            try:
+                text = parallel.read_input_file(os.path.join(self.source_dir, source))
+            except (OSError, UnicodeDecodeError) as e:
+                self._read_stats.add(time.perf_counter() - start, failed=True)
+                self._report("failed", source, f"Error loading file: {e}")
+                continue
+            self._read_stats.add(time.perf_counter() - start)
+            self._put(self._read_queue, self._convert_stats, (source, text))
+
+    def _read_items(self, sources):
+        """Read queue -> texts for convert_many, remembering the source of each index"""
+        while True:
+            self._in_flight.acquire()
+            start = time.perf_counter()
+            item = self._read_queue.get()
+            self._waited += time.perf_counter() - start
+            if item is _DONE:
+                return
+            sources.append(item[0])
+            yield item[1]
+
+    def _writer(self):
+        while True:
+            item = self._write_queue.get()
+            if item is _DONE:
+                return
+            # Write whatever else is already waiting in the same batch
+            items = [item]
+            while len(items) < 64:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    self._write_queue.put(_DONE)
+                    break
+                items.append(item)
+            start = time.perf_counter()
+            files = []
+            for source, output, result in items:
+                path = os.path.join(self.output_dir, output)
+                ensure_directory(os.path.dirname(path))
+                files.append((path, self._serialize(result)))
+            try:
+                write_files(files, self.fsync)
+            except OSError as e:
+                busy = (time.perf_counter() - start) / len(items)
+                for source, _, _ in items:
+                    self._write_stats.add(busy, failed=True)
+                    self._report("failed", source, f"Error writing output: {e}")
+                continue
+            busy = (time.perf_counter() - start) / len(items)
+            for (source, _, _), (path, _) in zip(items, files):
+                self._write_stats.add(busy)
+                self._report("converted", source, path)
+
+    def run(self):
+        """Convert every source; returns a StagedReport"""
+        self._start = time.perf_counter()
+        self._sources = scan_sources(self.source_dir, self._input_extension, os.path.abspath(self.output_dir))
+        readers = [threading.Thread(target=self._reader, name=f"staged-reader-{number}", daemon=True)
+                   for number in range(self._read_stats.threads)]
+        writers = [threading.Thread(target=self._writer, name=f"staged-writer-{number}", daemon=True)
+                   for number in range(self._write_stats.threads)]
+        for thread in readers + writers:
+            thread.start()
+
+        def close_reads():
+            for thread in readers:
+                thread.join()
+            self._read_queue.put(_DONE)
+
+        threading.Thread(target=close_reads, name="staged-reads-done", daemon=True).start()
+
+        sources = []
+        last = time.perf_counter()
+        try:
+            for index, _, result, error in parallel.convert_many(self.direction, self._read_items(sources), self.gender,
+                                                                  self.workers, ordered=False):
+                # In this process, the time since the last result less the wait for reads is conversion time
+                busy = time.perf_counter() - last - self._waited
+                self._waited = 0.0
+                source = sources[index]
+                if not result:
+                    self._convert_stats.add(busy, failed=True)
+                    self._report("failed", source, error)
+                else:
+                    self._convert_stats.add(busy)
+                    output = os.path.splitext(source)[0] + self._output_extension
+                    self._put(self._write_queue, self._write_stats, (source, output, result))
+                self._in_flight.release()
+                last = time.perf_counter()
+        finally:
+            for _ in writers:
+                self._write_queue.put(_DONE)
+            for thread in writers:
+                thread.join()
+
+        elapsed = time.perf_counter() - self._start
+        failed = self._read_stats.failed + self._convert_stats.failed + self._write_stats.failed
+        return StagedReport(self._write_stats.items - self._write_stats.failed, failed, elapsed, self.stats())
+
+def convert_directory(source_dir, direction, output_dir=None, gender="MALE", readers=DEFAULT_READERS, writers=DEFAULT_WRITERS,
+                      workers=1, queue_size=DEFAULT_QUEUE_SIZE, fsync="none", report=None):
+    """Convert every source file under source_dir into output_dir through the staged pipeline; returns a StagedReport
+
+    report(action, source, detail) is called for every converted source (detail
+    is its output path) and every failed one (detail is the error).
+    """
+    return StagedConverter(source_dir, direction, output_dir, gender, readers, writers, workers, queue_size, fsync, report).run()
+
+def main(args):
+    """Staged folder conversion entry point: python main.py convert DIRECTION SOURCE [-o OUTPUT]"""
+    import argparse
+    import sys
+
+    from .cli import add_gender_argument, add_profile_arguments, enable_profiling
+    from .output_sink import FSYNC_MODES
+
+    parser = argparse.ArgumentParser(prog="main.py convert", description="Convert every file of a folder, with reads, conversions and writes overlapping")
+    parser.add_argument("direction", choices=list(pipeline.DIRECTIONS))
+    parser.add_argument("source", help="folder of input files (.txt BBFAS codes or .json), scanned recursively")
+    parser.add_argument("-o", "--output", help="output folder, mirroring the source tree (default: src/output/<BBFAS|CHERAX>/<source folder name>)")
+    add_gender_argument(parser)
+    parser.add_argument("-w", "--workers", default=1, type=int, help="conversion processes, 0 for one per core (default: 1, in this process)")
+    parser.add_argument("--readers", default=DEFAULT_READERS, type=int, help=f"reader threads (default: {DEFAULT_READERS})")
+    parser.add_argument("--writers", default=DEFAULT_WRITERS, type=int, help=f"writer threads (default: {DEFAULT_WRITERS})")
+    parser.add_argument("--queue-size", default=DEFAULT_QUEUE_SIZE, type=int,
+                        help=f"files waiting between two stages before the earlier one pauses (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--fsync", default="none", choices=FSYNC_MODES,
+                        help="fsync no output (none), every output (each) or each batch of outputs at once (batch)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list every converted file")
+    parser.add_argument("--stats", action="store_true", help="print per-stage throughput, utilization and queue depths")
+    add_profile_arguments(parser)
+    options = parser.parse_args(args)
+
+    enable_profiling(parser, options)
+    if not os.path.isdir(options.source):
+        parser.error(f"{options.source} is not a folder")
+
+    def report(action, source, detail):
+        if action == "failed":
+            print(f"❌ {source}: {detail}", file=sys.stderr)
+        elif options.verbose:
+            print(f"➕ {source} -> {detail}")
+
+    try:
+        result = convert_directory(options.source, options.direction, options.output, options.gender, options.readers,
+                                   options.writers, options.workers or None, options.queue_size, options.fsync, report)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    print(f"📊 Convert {options.direction}: {result.converted} converted, {result.failed} failed in {result.elapsed:.2f} s "
+          f"({result.converted / result.elapsed if result.elapsed else 0:.0f} files/s)", file=sys.stderr)
+    if options.stats:
+        print(f"   {'stage':<8} {'threads':>7} {'items':>8} {'items/s':>9} {'busy (s)':>9} {'use':>6} {'queue avg':>10} {'max':>5}", file=sys.stderr)
+        for stage in result.stages:
+            busy = "-" if stage["busy"] is None else f"{stage['busy']:.2f}"
+            use = "-" if stage["utilization"] is None else f"{stage['utilization']:.0%}"
+            print(f"   {stage['stage']:<8} {stage['threads']:>7} {stage['items']:>8} {stage['per_second']:>9.0f} {busy:>9} {use:>6} "
+                  f"{stage['queue_mean']:>10.1f} {stage['queue_max']:>5}", file=sys.stderr)
+    return 1 if result.failed else 0
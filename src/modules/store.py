@@ -0,0 +1,329 @@
+"""Indexed outfit store: every outfit's slots in SQLite, queryable by slot, drawable and texture
+
+Outfits are added from any form the converters produce or read (Cherax JSON,
+BBFAS JSON, BBFAS code, Outfit). Each one is stored once in `outfits` (name,
+model, the 40 slot values as in Outfit.values) and as one `slots` row per
+drawable/texture pair, indexed on (slot, drawable, texture) and (slot, texture).
+Slot rows hold the values the converters would write, so undefined slots are
+found as drawable -1 (and texture 0 / -1) like in the Cherax files.
+
+A slot is named by its BBFAS key (pCI11, or pCT11 for the same pair), its Cherax
+component or prop name ("Tuxedo/Jacket Bib", "Head" is the prop) or its slot
+number (the index of its drawable in SLOT_KEYS).
+"""
+
+import os
+from array import array
+
+from . import load_converter
+from .dedup import canonical_outfit, normalized_values
+from .outfit import CLOTHES_COUNT, PROPS_COUNT, SLOT_KEYS, Outfit
+
+DEFAULT_DB_PATH = os.path.join("src", "output", "outfit_store.sqlite3")
+DEFAULT_BATCH_SIZE = 50000
+CACHE_KIB = 256 * 1024   # SQLite page cache: the slot indexes of a batch are updated in memory
+
+# Drawable/texture value indexes of every slot, the slot number being the drawable index
+SLOT_PAIRS = tuple((index, index + CLOTHES_COUNT) for index in range(CLOTHES_COUNT)) + \
+    tuple((index, index + PROPS_COUNT) for index in range(2 * CLOTHES_COUNT, 2 * CLOTHES_COUNT + PROPS_COUNT))
+
+def _slot_names():
+    """Every name a slot can be given -> slot number"""
+    names = {}
+    for drawable_index, texture_index in SLOT_PAIRS:
+        names[SLOT_KEYS[drawable_index]] = drawable_index
+        names[SLOT_KEYS[texture_index]] = drawable_index
+    json_cherax = load_converter("json_cherax")
+    for drawable_index, _, cherax_key in json_cherax.COMPONENT_SLOTS + json_cherax.PROP_SLOTS:
+        names[cherax_key] = drawable_index
+    return names
+
+_slot_numbers = None
+
+def resolve_slot(slot):
+    """Slot number of a BBFAS key, Cherax component/prop name or slot number; ValueError if unknown"""
+    global _slot_numbers
+    if isinstance(slot, int) and not isinstance(slot, bool):
+        if any(slot == drawable_index for drawable_index, _ in SLOT_PAIRS):
+            return slot
+        raise ValueError(f"Unknown slot number: {slot}")
+    if _slot_numbers is None:
+        _slot_numbers = _slot_names()
+    number = _slot_numbers.get(slot)
+    if number is None:
+        for name, candidate in _slot_numbers.items():
+            if name.lower() == str(slot).lower():
+                return candidate
+        raise ValueError(f"Unknown slot: {slot}")
+    return number
+
+class OutfitStore:
+    """SQLite outfit store; use as a context manager or call close()"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        import sqlite3
+
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        self._db.execute("CREATE TABLE IF NOT EXISTS outfits (id INTEGER PRIMARY KEY, name TEXT, model INTEGER, slot_values BLOB NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS slots (slot INTEGER NOT NULL, drawable INTEGER NOT NULL, texture INTEGER NOT NULL,"
+                         " outfit_id INTEGER NOT NULL, PRIMARY KEY (slot, drawable, texture, outfit_id)) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS slots_texture ON slots (slot, texture)")
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM outfits").fetchone()[0]
+
+    def add(self, data, name=None):
+        """Store one outfit (Cherax JSON, BBFAS JSON, BBFAS code or Outfit); returns its id
+
+        Raises ValueError when data is not an outfit.
+        """
+        outfit = canonical_outfit(data)
+        ids = []
+        self._insert([(name, outfit.model, outfit.values.tobytes())], [normalized_values(outfit)], ids)
+        return ids[0]
+
+    def add_many(self, items, batch_size=DEFAULT_BATCH_SIZE, on_error=None, ids=None):
+        """Store many outfits, batch_size per transaction; returns how many were added
+
+        items yields outfits or (outfit, name) pairs. Items that are not outfits
+        are skipped and passed to on_error(index, ValueError). The new ids are
+        appended to the ids list when one is given.
+        """
+        added = 0
+        outfit_rows = []
+        slot_rows = []
+        for index, item in enumerate(items):
+            data, name = item if isinstance(item, tuple) else (item, None)
+            try:
+                outfit = canonical_outfit(data)
+            except ValueError as e:
+                if on_error is not None:
+                    on_error(index, e)
+                continue
+            outfit_rows.append((name, outfit.model, outfit.values.tobytes()))
+            slot_rows.append(normalized_values(outfit))
+            if len(outfit_rows) >= batch_size:
+                added += self._insert(outfit_rows, slot_rows, ids)
+                outfit_rows, slot_rows = [], []
+        if outfit_rows:
+            added += self._insert(outfit_rows, slot_rows, ids)
+        return added
+
+    def _insert(self, outfit_rows, slot_rows, ids):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            first_id = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM outfits").fetchone()[0]
+            db.executemany("INSERT INTO outfits (id, name, model, slot_values) VALUES (?, ?, ?, ?)",
+                           ((first_id + offset, *row) for offset, row in enumerate(outfit_rows)))
+            # In index order, so each index page is visited once per batch
+            rows = sorted((drawable_index, values[drawable_index], values[texture_index], first_id + offset)
+                          for offset, values in enumerate(slot_rows)
+                          for drawable_index, texture_index in SLOT_PAIRS)
+            db.executemany("INSERT INTO slots (slot, drawable, texture, outfit_id) VALUES (?, ?, ?, ?)", rows)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        if ids is not None:
+            ids.extend(range(first_id, first_id + len(outfit_rows)))
+        return len(outfit_rows)
+
+    def delete(self, outfit_id):
+        """Remove an outfit; returns False if there was none with this id"""
+        try:
+            outfit = self.outfit(outfit_id)
+        except KeyError:
+            return False
+        # The slot rows are found from the stored values, without an index on outfit_id
+        values = normalized_values(outfit)
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("DELETE FROM slots WHERE slot = ? AND drawable = ? AND texture = ? AND outfit_id = ?",
+                           ((drawable_index, values[drawable_index], values[texture_index], outfit_id)
+                            for drawable_index, texture_index in SLOT_PAIRS))
+            db.execute("DELETE FROM outfits WHERE id = ?", (outfit_id,))
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return True
+
+    @staticmethod
+    def _condition(slot, drawable, texture):
+        """SQL selecting the ids of the outfits matching one slot condition, and its parameters"""
+        sql = "SELECT outfit_id FROM slots WHERE slot = ?"
+        parameters = [resolve_slot(slot)]
+        if drawable is not None:
+            sql += " AND drawable = ?"
+            parameters.append(int(drawable))
+        if texture is not None:
+            sql += " AND texture = ?"
+            parameters.append(int(texture))
+        return sql, parameters
+
+    def find(self, slot, drawable=None, texture=None, limit=None):
+        """Ids of the outfits with this drawable and/or texture in slot, in id order"""
+        return self.find_all([(slot, drawable, texture)], limit)
+
+    def find_all(self, conditions, limit=None):
+        """Ids of the outfits matching every (slot, drawable, texture) condition (None matches any value)"""
+        if not conditions:
+            raise ValueError("At least one slot condition is needed")
+        queries = [self._condition(*condition) for condition in conditions]
+        sql = " INTERSECT ".join(query for query, _ in queries) + " ORDER BY outfit_id"
+        parameters = [parameter for _, query_parameters in queries for parameter in query_parameters]
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+        return [row[0] for row in self._db.execute(sql, parameters)]
+
+    def count(self, slot, drawable=None, texture=None):
+        """Number of outfits with this drawable and/or texture in slot"""
+        sql, parameters = self._condition(slot, drawable, texture)
+        return self._db.execute(sql.replace("SELECT outfit_id", "SELECT COUNT(*)", 1), parameters).fetchone()[0]
+
+    def _row(self, outfit_id):
+        row = self._db.execute("SELECT name, model, slot_values FROM outfits WHERE id = ?", (outfit_id,)).fetchone()
+        if row is None:
+            raise KeyError(outfit_id)
+        return row
+
+    def outfit(self, outfit_id):
+        """Outfit stored under an id (KeyError if there is none)"""
+        _, model, slot_values = self._row(outfit_id)
+        return Outfit(model, array("i", slot_values))
+
+    __getitem__ = outfit
+
+    def name(self, outfit_id):
+        """Name the outfit was added with, or None"""
+        return self._row(outfit_id)[0]
+
+    def gender(self, outfit_id, default="MALE"):
+        """Gender of an outfit from its model hash, default when the model is unknown"""
+        model = self._row(outfit_id)[1]
+        for gender, model_hash in load_converter("json_cherax").MODELS.items():
+            if model == model_hash:
+                return gender
+        return default
+
+    def to_cherax_json(self, outfit_id, gender=None, compact=False):
+        """Text of the Cherax JSON file of an outfit, for its model's gender unless one is given"""
+        return load_converter("json_cherax").outfit_to_cherax_json(self.outfit(outfit_id), gender or self.gender(outfit_id), compact)
+
+    def to_bbfas_code(self, outfit_id):
+        return self.outfit(outfit_id).to_bbfas_code()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def slot_names():
+    """Cherax names and BBFAS keys accepted for the slots, by slot number"""
+    names = {}
+    for name, number in _slot_names().items():
+        names.setdefault(number, []).append(name)
+    return names
+
+def parse_slot_condition(text):
+    """SLOT=DRAWABLE[:TEXTURE] (either value may be left empty) -> (slot, drawable, texture)"""
+    slot, separator, values = text.rpartition("=")
+    if not separator or not slot:
+        raise ValueError(f"Expected SLOT=DRAWABLE[:TEXTURE], got {text!r}")
+    drawable, _, texture = values.partition(":")
+    return slot, int(drawable) if drawable else None, int(texture) if texture else None
+
+def main(args):
+    """Outfit store entry point: python main.py store add|find|info"""
+    import argparse
+    import sys
+    import time
+
+    from . import json_stream, parallel
+
+    parser = argparse.ArgumentParser(prog="main.py store", description="Index outfits in a SQLite store and find them by slot")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"store file (default: {DEFAULT_DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="add outfits to the store")
+    add_parser.add_argument("inputs", nargs="*", default=["-"], help="BBFAS codes (one per line), JSON lines or a JSON array of BBFAS / Cherax outfits, or folders of input files (default: stdin)")
+    find_parser = commands.add_parser("find", help="list the outfits matching every condition")
+    find_parser.add_argument("conditions", nargs="+", metavar="SLOT=DRAWABLE[:TEXTURE]",
+                             help='e.g. "Tuxedo/Jacket Bib=15", Head=2:0, pCI4=:3 (Cherax name, BBFAS key or slot number)')
+    find_parser.add_argument("--limit", type=int, help="stop after this many outfits")
+    find_parser.add_argument("--count", action="store_true", help="only print the number of matches")
+    find_parser.add_argument("--to", choices=["ids", "cherax", "bbfas"], default="ids", help="print ids and names, Cherax JSON lines or BBFAS codes")
+    commands.add_parser("info", help="show the number of outfits and the slot names")
+    options = parser.parse_args(args)
+
+    try:
+        outfit_store = OutfitStore(options.db)
+    except Exception as e:   # sqlite3.Error: not a database, locked...
+        print(f"❌ Store error: {e}", file=sys.stderr)
+        return 1
+
+    with outfit_store:
+        if options.command == "info":
+            print(f"🗄️  {options.db}: {len(outfit_store)} outfits")
+            for number, names in sorted(slot_names().items()):
+                print(f"   slot {number:>2}: {', '.join(names)}")
+            return 0
+
+        if options.command == "add":
+            failed = 0
+
+            def items():
+                for source in options.inputs:
+                    if source != "-" and os.path.isdir(source):
+                        for path in parallel.iter_input_files(source):
+                            try:
+                                yield parallel.read_input_file(path), os.path.splitext(os.path.basename(path))[0]
+                            except (OSError, UnicodeDecodeError) as e:
+                                report_error(path, e)
+                    else:
+                        yield from json_stream.iter_json_records(sys.stdin if source == "-" else source)
+
+            def report_error(source, error):
+                nonlocal failed
+                failed += 1
+                print(f"❌ {source if isinstance(source, str) else f'Record {source + 1}'}: {error}", file=sys.stderr)
+
+            start = time.perf_counter()
+            added = outfit_store.add_many(items(), on_error=report_error)
+            print(f"🗄️  Added {added} outfits to {options.db} in {time.perf_counter() - start:.1f} s "
+                  f"({len(outfit_store)} in total), {failed} failed", file=sys.stderr)
+            return 1 if failed else 0
+
+        try:
+            conditions = [parse_slot_condition(text) for text in options.conditions]
+            if options.count and len(conditions) == 1:
+                print(outfit_store.count(*conditions[0]))
+                return 0
+            ids = outfit_store.find_all(conditions, options.limit)
+        except ValueError as e:
+            parser.error(str(e))
+        if options.count:
+            print(len(ids))
+        for outfit_id in ids:
+            if options.to == "cherax":
+                print(outfit_store.to_cherax_json(outfit_id, compact=True))
+            elif options.to == "bbfas":
+                print(outfit_store.to_bbfas_code(outfit_id))
+            elif not options.count:
+                print(f"{outfit_id}\t{outfit_store.name(outfit_id) or ''}")
+    return 0
@@ -0,0 +1,293 @@
+"""Incremental directory sync: mirror a folder of inputs into converted outputs
+
+Every source file (recursively) is converted to the same relative path in the
+output folder, with the extension of the output format, so a re-run overwrites
+its previous output instead of adding "-1", "-2"... copies. A manifest next to
+the outputs records each source's size, mtime, content hash and output path:
+
+- a source whose size and mtime are unchanged (and whose output still exists)
+  is not even opened,
+- a source whose size or mtime changed is hashed and only reconverted when its
+  content (or the direction/gender) changed,
+- outputs whose source is gone are removed.
+
+A source that fails to convert keeps its previous output and manifest entry,
+so it is retried on the next run.
+"""
+
+import collections
+import hashlib
+import os
+
+from . import cache, load_converter, parallel, pipeline
+from .output_naming import write_output
+from .output_sink import ensure_directory, flush_outputs
+
+MANIFEST_NAME = ".sync_manifest.sqlite3"
+OUTPUT_ROOT = os.path.join("src", "output")
+
+# Extension of the input and output files of each format
+EXTENSIONS = {"code": ".txt", "json": ".json"}
+
+SyncReport = collections.namedtuple("SyncReport", "added changed unchanged removed failed")
+
+# Manifest row of a source file
+Entry = collections.namedtuple("Entry", "size mtime_ns hash output settings")
+
+def default_output_dir(direction, source_dir):
+    """src/output/<BBFAS|CHERAX>/<source folder name>"""
+    folder = "CHERAX" if direction.endswith("cherax") else "BBFAS"
+    return os.path.join(OUTPUT_ROOT, folder, os.path.basename(os.path.abspath(source_dir)))
+
+def check_output_dir(source_dir, output_dir, input_extension, output_extension):
+    """Raise ValueError when outputs would be written over their own sources
+
+    That is when the output folder is the source folder or one of its parents
+    and both formats use the same extension.
+    """
+    if input_extension != output_extension:
+        return
+    source = os.path.realpath(source_dir)
+    output = os.path.realpath(output_dir)
+    if source == output or source.startswith(os.path.join(output, "")):
+        raise ValueError(f"The output folder {output_dir} contains the sources of {source_dir}: "
+                         f"the {output_extension} outputs would overwrite them")
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class SyncManifest:
+    """Source relative path -> Entry, in a SQLite file"""
+
+    def __init__(self, path):
+        import sqlite3
+
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS files (source TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                         " hash TEXT NOT NULL, output TEXT NOT NULL, settings TEXT NOT NULL)")
+
+    def load(self):
+        """Every entry, as a dict"""
+        rows = self._db.execute("SELECT source, size, mtime_ns, hash, output, settings FROM files")
+        return {row[0]: Entry(*row[1:]) for row in rows}
+
+    def update(self, entries, removed=()):
+        """Store (source, Entry) pairs and drop the removed sources, in one transaction"""
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany("INSERT OR REPLACE INTO files (source, size, mtime_ns, hash, output, settings) VALUES (?, ?, ?, ?, ?, ?)",
+                                 ((source, *entry) for source, entry in entries))
+            self._db.executemany("DELETE FROM files WHERE source = ?", ((source,) for source in removed))
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+def scan_sources(source_dir, extension, skip_dir=None):
+    """Yield (relative path, size, mtime_ns) of the files with extension under source_dir
+
+    skip_dir (an absolute path) is left out, for an output folder inside the sources.
+    """
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        with os.scandir(os.path.join(source_dir, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name)
+                if entry.is_dir():
+                    if skip_dir is None or os.path.abspath(entry.path) != skip_dir:
+                        pending.append(relative_path)
+                elif entry.name.lower().endswith(extension) and entry.is_file():
+                    stat = entry.stat()
+                    yield relative_path, stat.st_size, stat.st_mtime_ns
+
+def scan_outputs(output_dir):
+    """Relative paths of every file under output_dir (without a stat per file)"""
+    found = set()
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            with os.scandir(os.path.join(output_dir, relative_dir)) as entries:
+                for entry in entries:
+                    relative_path = os.path.join(relative_dir, entry.name)
+                    if entry.is_dir():
+                        pending.append(relative_path)
+                    else:
+                        found.add(relative_path)
+        except FileNotFoundError:
+            pass
+    return found
+
+def serializer(direction):
+    """Function turning a conversion result into the text of its output file, as the converters write it"""
+    output_format = pipeline.DIRECTIONS[direction][1]
+    if output_format == "code":
+        return str
+    if direction == "bbfas-json":
+        return load_converter("bbfas_json").serialize_bbfas_json
+    return load_converter("json_cherax").serialize_cherax_json
+
+def _remove_output(output_dir, relative_path):
+    """Delete an output and the folders it leaves empty"""
+    path = os.path.join(output_dir, relative_path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(relative_path)
+    while directory:
+        try:
+            os.rmdir(os.path.join(output_dir, directory))
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+def sync_directory(source_dir, direction, output_dir=None, gender="MALE", manifest_path=None, workers=1, dry_run=False, report=None):
+    """Bring output_dir up to date with the sources under source_dir; returns a SyncReport
+
+    report(action, source, detail) is called for every added, changed, removed
+    or failed source (action is one of those words; detail is the output path,
+    or the error for a failure). With dry_run=True nothing is converted, written
+    or removed; the counts tell what a real run would do (changed-looking files
+    are counted as changed without being hashed). Raises ValueError when the
+    outputs would overwrite their sources (see check_output_dir).
+    """
+    if direction not in pipeline.DIRECTIONS:
+        raise ValueError(f"Unknown conversion direction: {direction}")
+    input_format, output_format = pipeline.DIRECTIONS[direction]
+    input_extension = EXTENSIONS[input_format]
+    output_extension = EXTENSIONS[output_format]
+    output_dir = output_dir or default_output_dir(direction, source_dir)
+    check_output_dir(source_dir, output_dir, input_extension, output_extension)
+    manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+    settings = f"{direction}\0{gender.upper() if direction in cache.GENDER_DIRECTIONS else ''}"
+    report = report or (lambda action, source, detail: None)
+
+    manifest = SyncManifest(manifest_path) if not dry_run or os.path.exists(manifest_path) else None
+    try:
+        entries = manifest.load() if manifest is not None else {}
+        outputs = scan_outputs(output_dir)
+        output_abspath = os.path.abspath(output_dir)
+
+        unchanged = 0
+        failed = 0
+        touched = []     # (source, Entry): same content, new size/mtime
+        pending = []     # (source, size, mtime_ns, hash, text, previous Entry) to convert
+        for source, size, mtime_ns in scan_sources(source_dir, input_extension, output_abspath):
+            entry = entries.pop(source, None)
+            current = entry is not None and entry.settings == settings and entry.output in outputs
+            if current and entry.size == size and entry.mtime_ns == mtime_ns:
+                unchanged += 1
+                continue
+            if dry_run:
+                report("changed" if entry else "added", source, None)
+                pending.append((source, size, mtime_ns, None, None, entry))
+                continue
+            try:
+                with open(os.path.join(source_dir, source), "rb") as f:
+                    data = f.read()
+                text = data.decode("utf-8").strip()
+            except (OSError, UnicodeDecodeError) as e:
+                report("failed", source, f"Error loading file: {e}")
+                failed += 1
+                continue
+            data_hash = content_hash(data)
+            if current and entry.hash == data_hash:
+                touched.append((source, entry._replace(size=size, mtime_ns=mtime_ns)))
+                unchanged += 1
+                continue
+            pending.append((source, size, mtime_ns, data_hash, text, entry))
+
+        # Sources left in the manifest are gone
+        removed = list(entries)
+        if dry_run:
+            added = sum(1 for item in pending if item[5] is None)
+            for source in removed:
+                report("removed", source, os.path.join(output_dir, entries[source].output))
+            return SyncReport(added, len(pending) - added, unchanged, len(removed), 0)
+
+        updates = list(touched)
+        changed = 0
+        serialize = serializer(direction)
+        for index, _, result, error in parallel.convert_many(direction, (item[4] for item in pending), gender, workers, ordered=False):
+            source, size, mtime_ns, data_hash, _, entry = pending[index]
+            if not result:
+                report("failed", source, error)
+                failed += 1
+                continue
+            output = os.path.splitext(source)[0] + output_extension
+            ensure_directory(os.path.dirname(os.path.join(output_dir, output)))
+            write_output(os.path.join(output_dir, output), serialize(result))
+            if entry is not None and entry.output != output:
+                _remove_output(output_dir, entry.output)
+            changed += entry is not None
+            report("changed" if entry else "added", source, os.path.join(output_dir, output))
+            updates.append((source, Entry(size, mtime_ns, data_hash, output, settings)))
+
+        for source in removed:
+            _remove_output(output_dir, entries[source].output)
+            report("removed", source, os.path.join(output_dir, entries[source].output))
+        # The manifest must not list outputs still waiting in a write buffer
+        flush_outputs()
+        manifest.update(updates, removed)
+        added = len(updates) - len(touched) - changed
+        return SyncReport(added, changed, unchanged, len(removed), failed)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+def main(args):
+    """Incremental sync entry point: python main.py sync DIRECTION SOURCE [-o OUTPUT]"""
+    import argparse
+    import sys
+
+    from .cli import add_gender_argument, add_profile_arguments, add_write_arguments, enable_output_sink, enable_profiling
+
+    parser = argparse.ArgumentParser(prog="main.py sync", description="Convert the new and changed files of a folder, and remove the outputs of deleted ones")
+    parser.add_argument("direction", choices=list(pipeline.DIRECTIONS))
+    parser.add_argument("source", help="folder of input files (.txt BBFAS codes or .json), scanned recursively")
+    parser.add_argument("-o", "--output", help="output folder, mirroring the source tree (default: src/output/<BBFAS|CHERAX>/<source folder name>)")
+    add_gender_argument(parser)
+    parser.add_argument("-w", "--workers", default=1, type=int, help="worker processes, 0 for one per core (default: 1)")
+    parser.add_argument("--manifest", help=f"manifest file (default: {MANIFEST_NAME} in the output folder)")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="only list what would be converted or removed")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list every added, changed and removed file")
+    add_write_arguments(parser)
+    add_profile_arguments(parser)
+    options = parser.parse_args(args)
+
+    enable_profiling(parser, options)
+    if not os.path.isdir(options.source):
+        parser.error(f"{options.source} is not a folder")
+    enable_output_sink(options)
+
+    icons = {"added": "➕", "changed": "🔄", "removed": "🗑️ ", "failed": "❌"}
+
+    def report(action, source, detail):
+        if action == "failed":
+            print(f"❌ {source}: {detail}", file=sys.stderr)
+        elif options.verbose or options.dry_run:
+            print(f"{icons[action]} {source}" + (f" -> {detail}" if detail else ""))
+
+    try:
+        result = sync_directory(options.source, options.direction, options.output, options.gender, options.manifest,
+                                options.workers or None, options.dry_run, report)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    prefix = "📊 Sync (dry run)" if options.dry_run else "📊 Sync"
+    print(f"{prefix} {options.direction}: {result.added} added, {result.changed} changed, {result.unchanged} unchanged, "
+          f"{result.removed} removed, {result.failed} failed", file=sys.stderr)
+    return 1 if result.failed else 0
@@ -0,0 +1,315 @@
+"""Fast-reject validation of converter inputs, with structured error codes
+
+Checks that an input can be converted before any decoding into dicts,
+conversion or output file happens:
+
+    empty       nothing to convert
+    base64      characters outside the base64 alphabet, or a length that is not a multiple of 4
+    utf8        the decoded payload is not UTF-8 text
+    structure   section markers (DI/DT/Pi/Pt) or key/value pairing out of place (strict only)
+    json        not valid JSON
+    schema      wrong type for the document, a section or an entry
+    value       a slot value that is not an integer
+    range       a slot value outside MIN_VALUE..MAX_VALUE (a 32-bit Outfit slot)
+
+A check returns None for a valid input or a Rejection(code, detail). Payloads
+laid out as the converters write them are accepted with one precompiled
+regular expression; anything else is walked line by line with the pairing
+rules of parse_bbfas_payload.
+"""
+
+import base64
+import binascii
+import collections
+import json
+import re
+
+try:
+    from modules.outfit import MAX_VALUE, MIN_VALUE, SECTIONS
+except ImportError:
+    from outfit import MAX_VALUE, MIN_VALUE, SECTIONS
+
+CODES = ("empty", "base64", "utf8", "structure", "json", "schema", "value", "range")
+
+class Rejection(collections.namedtuple("Rejection", "code detail")):
+    __slots__ = ()
+
+    def __str__(self):
+        return f"[{self.code}] {self.detail}"
+
+_BASE64 = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+_NOT_BASE64 = re.compile(r"[^A-Za-z0-9+/=\s]")
+_WHITESPACE = re.compile(r"\s+")
+_PAIRS = r"(?:p[^\s]*\n-?[0-9]+\n)*"
+_CANONICAL_PAYLOAD = re.compile(
+    "Item\n" + "".join(f"{marker}\n{_PAIRS}/{marker}\n" for marker, _, _, _ in SECTIONS) + "/Item")
+_LONG_NUMBER = re.compile(r"^-?[0-9]{10,}$", re.M)   # shorter values always fit a slot
+
+# Section marker -> {BBFAS key: slot index} of the keys an Outfit reads from it
+_SECTION_KEYS = {marker: slots for marker, _, _, slots in SECTIONS}
+
+def _range_rejection(where, value):
+    if MIN_VALUE <= value <= MAX_VALUE:
+        return None
+    return Rejection("range", f"{where}: {value} is outside {MIN_VALUE}..{MAX_VALUE}")
+
+def check_base64(code):
+    """Cheap first gate of a BBFAS code: not empty, base64 alphabet and length
+
+    Whitespace inside the code is ignored, as base64 wrapped over several lines decodes fine.
+    """
+    if not isinstance(code, str):
+        return Rejection("schema", f"a BBFAS code is text, not {type(code).__name__}")
+    code = code.strip()
+    if not code:
+        return Rejection("empty", "empty BBFAS code")
+    if not _BASE64.fullmatch(code):
+        match = _NOT_BASE64.search(code)
+        if match is not None:
+            return Rejection("base64", f"character {match.group()!r} at position {match.start() + 1} is not base64")
+        code = _WHITESPACE.sub("", code)
+        if not _BASE64.fullmatch(code):
+            return Rejection("base64", "'=' padding in the middle of the code")
+    if len(code) % 4:
+        return Rejection("base64", f"length {len(code)} is not a multiple of 4")
+    return None
+
+def _check_payload(payload, strict, values):
+    """Walk a decoded payload with the pairing rules of parse_bbfas_payload"""
+    section_keys = None
+    marker = None
+    key = None
+    key_line = 0
+    for number, line in enumerate(payload.split("\n"), 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line in _SECTION_KEYS:
+            if strict and (key is not None or marker is not None):
+                return Rejection("structure", f"line {number}: section '{line}' opened inside '{marker}'"
+                                 if key is None else f"line {key_line}: key '{key}' has no value")
+            section_keys, marker, key = _SECTION_KEYS[line], line, None
+            continue
+        if line.startswith("/"):
+            if strict and key is not None:
+                return Rejection("structure", f"line {key_line}: key '{key}' has no value")
+            if strict and marker is not None and line[1:] != marker:
+                return Rejection("structure", f"line {number}: '{line}' closes section '{marker}'")
+            section_keys, marker, key = None, None, None
+            continue
+        if marker is None:
+            continue
+        if key is None or line.startswith("p"):
+            if not line.startswith("p"):
+                if strict:
+                    return Rejection("structure", f"line {number}: value '{line}' has no key")
+                continue
+            if strict and key is not None:
+                return Rejection("structure", f"line {key_line}: key '{key}' has no value")
+            key, key_line = line, number
+            continue
+        if line.isalpha():
+            if strict:
+                return Rejection("structure", f"line {number}: '{line}' is not a valid value for '{key}'")
+        elif values and key in section_keys:
+            try:
+                value = int(line)
+            except ValueError:
+                return Rejection("value", f"line {number}: '{line}' is not an integer value for '{key}'")
+            rejection = _range_rejection(f"line {number} ({key})", value)
+            if rejection:
+                return rejection
+        key = None
+    if strict and key is not None:
+        return Rejection("structure", f"line {key_line}: key '{key}' has no value")
+    if strict and marker is not None:
+        return Rejection("structure", f"section '{marker}' is never closed")
+    return None
+
+def check_bbfas_code(code, strict=False, values=True):
+    """Check a BBFAS code; None if it converts
+
+    values=False skips the slot value checks, for BBFAS JSON output which keeps
+    values as they are. strict=True also rejects what parse_bbfas_payload only
+    warns about.
+    """
+    rejection = check_base64(code)
+    if rejection:
+        return rejection
+    try:
+        payload = base64.b64decode(code.strip()).decode("utf-8").strip()
+    except binascii.Error as e:
+        return Rejection("base64", str(e))
+    except UnicodeDecodeError as e:
+        return Rejection("utf8", f"payload byte {e.start + 1} is not UTF-8")
+
+    if _CANONICAL_PAYLOAD.fullmatch(payload):
+        if values:
+            for match in _LONG_NUMBER.finditer(payload):
+                rejection = _range_rejection("value", int(match.group()))
+                if rejection:
+                    return rejection
+        return None
+    return _check_payload(payload, strict, values)
+
+def _load_object(data, kind):
+    """(dict, None) of a JSON document given as text or object, or (None, Rejection)"""
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            return None, Rejection("json", str(e))
+    if not isinstance(data, dict):
+        return None, Rejection("schema", f"a {kind} is a JSON object, not {type(data).__name__}")
+    return data, None
+
+def _value_rejection(where, value, bbfas=False):
+    """Rejection of a slot value that is not a plain int in range, or None if it converts anyway
+
+    Integral floats are accepted; BBFAS JSON values may also be {"ID": value} or integer text.
+    """
+    if bbfas and isinstance(value, dict):
+        value = value.get("ID")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif bbfas and isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            pass
+    if type(value) is not int:
+        return Rejection("value", f"{where}: {value!r} is not an integer")
+    return _range_rejection(where, value)
+
+def check_bbfas_json(data):
+    """Check a BBFAS JSON (text or object) for the JSON → CHERAX conversion; None if it converts"""
+    data, rejection = _load_object(data, "BBFAS JSON")
+    if rejection:
+        return rejection
+    items = data.get("Item")
+    if type(items) is not dict:
+        return Rejection("schema", "missing \"Item\" object" if items is None else "\"Item\" is not an object")
+    for marker, section, item_type, slots in SECTIONS:
+        entries = items.get(section, {})
+        if type(entries) is not dict:
+            return Rejection("schema", f"Item.{section} is not an object")
+        entries = entries.get(item_type, {})
+        if type(entries) is not dict:
+            return Rejection("schema", f"Item.{section}.{item_type} is not an object")
+        for key, value in entries.items():
+            # Plain ints in range are the common case; unknown keys are ignored by the converter
+            if type(value) is int and MIN_VALUE <= value <= MAX_VALUE or key not in slots:
+                continue
+            rejection = _value_rejection(f"Item.{section}.{item_type}.{key}", value, bbfas=True)
+            if rejection:
+                return rejection
+    return None
+
+# Cherax sections -> fields of their entries
+_CHERAX_FIELDS = {
+    "components": ("drawable", "texture", "palette"),
+    "props": ("drawable", "texture"),
+}
+
+def check_cherax_json(data):
+    """Check a Cherax JSON (text or object) for the CHERAX → BBFAS conversion; None if it converts"""
+    data, rejection = _load_object(data, "Cherax outfit")
+    if rejection:
+        return rejection
+    if "components" not in data and "props" not in data:
+        return Rejection("schema", "no \"components\" or \"props\": not a Cherax outfit")
+    for section, fields in _CHERAX_FIELDS.items():
+        entries = data.get(section, {})
+        if type(entries) is not dict:
+            return Rejection("schema", f"\"{section}\" is not an object")
+        for name, entry in entries.items():
+            if type(entry) is not dict:
+                return Rejection("schema", f"{section}.{name} is not an object")
+            for field in fields:
+                value = entry.get(field, 0)
+                if type(value) is int and MIN_VALUE <= value <= MAX_VALUE:
+                    continue
+                rejection = _value_rejection(f"{section}.{name}.{field}", value)
+                if rejection:
+                    return rejection
+    return None
+
+# Conversion direction -> check of its input
+DIRECTION_CHECKS = {
+    "bbfas-json": lambda code: check_bbfas_code(code, values=False),
+    "json-cherax": check_bbfas_json,
+    "cherax-bbfas": check_cherax_json,
+    "bbfas-cherax": check_bbfas_code,
+    "bbfas-cherax-bbfas": check_bbfas_code,
+}
+
+def checker(direction, strict=False):
+    """Check function of a direction's inputs; strict applies to BBFAS codes"""
+    if strict and direction in ("bbfas-json", "bbfas-cherax", "bbfas-cherax-bbfas"):
+        values = direction != "bbfas-json"
+        return lambda code: check_bbfas_code(code, strict=True, values=values)
+    return DIRECTION_CHECKS[direction]
+
+def check(direction, data, strict=False):
+    """Check one input of a conversion direction; None if it converts"""
+    return checker(direction, strict)(data)
+
+def check_batch(direction, records, strict=False):
+    """Check many inputs of one direction; a list holding None or a Rejection per record"""
+    check_record = checker(direction, strict)
+    return [check_record(record) for record in records]
+
+def main(args):
+    """Validation entry point: python main.py validate DIRECTION [-i INPUT]"""
+    import argparse
+    import itertools
+    import os
+    import sys
+
+    from modules import json_stream, parallel, pipeline
+    from modules.cli import close_stream, iter_stream_records, open_input
+
+    parser = argparse.ArgumentParser(prog="main.py validate", description="Check that inputs would convert, without converting or writing anything")
+    parser.add_argument("direction", choices=list(pipeline.DIRECTIONS))
+    parser.add_argument("-i", "--input", default="-", help="input file with one code per line, JSON lines or a JSON array, or a directory of input files (default: stdin)")
+    parser.add_argument("--strict", action="store_true", help="also reject BBFAS codes with misplaced section markers or unpaired keys")
+    parser.add_argument("--chunk-size", default=1000, type=int, help="records checked at a time")
+    options = parser.parse_args(args)
+
+    from_files = options.input != "-" and os.path.isdir(options.input)
+    input_stream = None
+    if from_files:
+        sources = list(parallel.iter_input_files(options.input))
+        records = map(parallel.read_input_file, sources)
+    else:
+        input_stream = open_input(options.input)
+        if pipeline.DIRECTIONS[options.direction][0] == "json":
+            records = json_stream.iter_json_records(input_stream)
+        else:
+            records = iter_stream_records(input_stream)
+
+    direction = options.direction
+    total = 0
+    rejected = collections.Counter()
+    try:
+        while True:
+            chunk = list(itertools.islice(records, max(1, options.chunk_size)))
+            if not chunk:
+                break
+            for offset, rejection in enumerate(check_batch(direction, chunk, options.strict)):
+                if rejection is not None:
+                    source = sources[total + offset] if from_files else f"Record {total + offset + 1}"
+                    print(f"❌ {source}: {rejection}")
+                    rejected[rejection.code] += 1
+            total += len(chunk)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"❌ Error reading input: {e}", file=sys.stderr)
+        return 1
+    finally:
+        close_stream(input_stream)
+
+    summary = f"📊 Validate {direction}: {total} records, {total - sum(rejected.values())} valid, {sum(rejected.values())} rejected"
+    if rejected:
+        summary += " (" + ", ".join(f"{code} {count}" for code, count in rejected.most_common()) + ")"
+    print(summary, file=sys.stderr)
+    return 1 if rejected else 0
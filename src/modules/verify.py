@@ -0,0 +1,325 @@
+"""Round-trip verifier: BBFAS → CHERAX → BBFAS in memory, over a corpus or generated codes
+
+Every code goes through the same chain as the complete conversion
+(pipeline.bbfas_round_trip), then the slot values of the original and of the
+regenerated code are compared key by key. A difference is one of:
+
+    forced    a slot Cherax has no place for (pCI0/pCT0), always read back as -1
+    filled    a slot the code did not define, read back as the converter default
+    dropped   a key the converters do not know, lost on the way
+    changed   anything else: a real conversion bug
+
+The entries json_to_cherax adds without any BBFAS slot behind them (the Head
+component and Hip prop defaults) are counted as injected. Only changed slots
+and failed conversions make a run fail; the other losses are how the formats
+map and are reported so they can be tracked.
+
+Codes are verified in chunks across a process pool. Generated codes are
+built in the workers from the seed, so only the reports cross processes.
+"""
+
+import collections
+import contextlib
+import io
+import itertools
+import os
+import random
+
+from . import json_stream, load_converter, parallel, pipeline
+from .outfit import CLOTHES_COUNT, MAX_VALUE, MISSING, SECTIONS, SLOT_COUNT, SLOT_INDEX, SLOT_KEYS, Outfit
+
+DEFAULT_CHUNK_SIZE = 2000
+MAX_EXAMPLES = 10
+KINDS = ("forced", "filled", "dropped", "changed")
+
+def _unmapped_keys():
+    """BBFAS keys json_to_cherax has no Cherax slot for"""
+    json_cherax = load_converter("json_cherax")
+    mapped = set()
+    for drawable_index, texture_index, _ in json_cherax.COMPONENT_SLOTS + json_cherax.PROP_SLOTS:
+        mapped.update((drawable_index, texture_index))
+    return frozenset(key for index, key in enumerate(SLOT_KEYS) if index not in mapped)
+
+def default_value(key):
+    """Value a slot the code does not define comes back with: texture 0 for clothes, -1 otherwise"""
+    index = SLOT_INDEX[key]
+    return 0 if CLOTHES_COUNT <= index < 2 * CLOTHES_COUNT else -1
+
+class RoundTripReport:
+    """Totals of a verification run; reports of separate chunks add up with merge()"""
+
+    def __init__(self):
+        self.outfits = 0
+        self.identical = 0
+        self.failed = 0
+        self.slots = collections.Counter()      # (kind, slot label) -> occurrences
+        self.injected = collections.Counter()   # Cherax entry -> occurrences
+        self.examples = []                      # (source, number, code, problem) of failures and changed slots
+
+    @property
+    def changed(self):
+        return sum(count for (kind, _), count in self.slots.items() if kind == "changed")
+
+    @property
+    def ok(self):
+        return self.failed == 0 and self.changed == 0
+
+    def by_kind(self, kind):
+        """slot label -> occurrences of one kind of difference, most frequent first"""
+        return {label: count for (slot_kind, label), count in self.slots.most_common() if slot_kind == kind}
+
+    def add_example(self, source, number, code, problem):
+        if len(self.examples) < MAX_EXAMPLES:
+            self.examples.append((source, number, code, problem))
+
+    def merge(self, other):
+        self.outfits += other.outfits
+        self.identical += other.identical
+        self.failed += other.failed
+        self.slots.update(other.slots)
+        self.injected.update(other.injected)
+        for example in other.examples:
+            self.add_example(*example)
+        return self
+
+class RoundTripChecker:
+    """Verifies codes one by one in the current process, adding to a report"""
+
+    def __init__(self, gender="MALE"):
+        self.gender = gender
+        self._bbfas_json = load_converter("bbfas_json")
+        self._unmapped = _unmapped_keys()
+        json_cherax = load_converter("json_cherax")
+        self._component_keys = frozenset(cherax_key for _, _, cherax_key in json_cherax.COMPONENT_SLOTS)
+        self._prop_keys = frozenset(cherax_key for _, _, cherax_key in json_cherax.PROP_SLOTS)
+
+    def check(self, code, report, number=0, source="record"):
+        """Round-trip one code; converter messages are expected to be captured by the caller"""
+        report.outfits += 1
+        try:
+            bbfas_data, cherax_outfit, regenerated = pipeline.bbfas_round_trip(code, self.gender)
+        except Exception as e:
+            bbfas_data, regenerated = None, None
+            print(f"❌ Error during conversion: {e}")
+        if not regenerated:
+            report.failed += 1
+            return False
+
+        self._count_injected(cherax_outfit, report)
+
+        bbfas_json = self._bbfas_json
+        items, errors = bbfas_json.parse_bbfas_payload(bbfas_json.decode_bbfas_code(regenerated))
+        if errors:
+            report.failed += 1
+            print(f"❌ Regenerated code is malformed - {errors[0]}")
+            return False
+
+        before_items = bbfas_data["Item"]
+        identical = True
+        slots = report.slots
+        for marker, section, item_type, section_slots in SECTIONS:
+            before = before_items.get(section, {}).get(item_type, {})
+            after = items[section][item_type]
+            if before == after:
+                continue
+            identical = False
+            for key in before.keys() | after.keys():
+                value = before.get(key, MISSING)
+                new_value = after.get(key, MISSING)
+                if value == new_value:
+                    continue
+                known = key in section_slots
+                label = key if known else f"{key} (in {marker})"
+                if known and key in self._unmapped and new_value == -1:
+                    kind = "forced"
+                elif known and value == MISSING and new_value == default_value(key):
+                    kind = "filled"
+                elif new_value == MISSING:
+                    kind = "dropped"
+                else:
+                    kind = "changed"
+                    report.add_example(source, number, code, f"{label}: {value} -> {'missing' if new_value == MISSING else new_value}")
+                slots[kind, label] += 1
+        if identical:
+            report.identical += 1
+        return True
+
+    def _count_injected(self, cherax_outfit, report):
+        injected = report.injected
+        for section, keys in (("components", self._component_keys), ("props", self._prop_keys)):
+            for cherax_key, entry in cherax_outfit.get(section, {}).items():
+                if cherax_key not in keys:
+                    values = "/".join(str(entry.get(field)) for field in ("drawable", "texture") if field in entry)
+                    injected[f"{section[:-1]} {cherax_key} = {values}"] += 1
+
+    def check_many(self, codes, first_number=0, source="record"):
+        """Report of a sequence of codes, numbered from first_number; converter messages explain the failures"""
+        report = RoundTripReport()
+        messages = io.StringIO()
+        with contextlib.redirect_stdout(messages):
+            for number, code in enumerate(codes, first_number):
+                start = messages.tell()
+                if not self.check(code, report, number, source):
+                    output = messages.getvalue()[start:]
+                    report.add_example(source, number, code, parallel.error_message(output) or "conversion failed")
+        return report
+
+def generate_codes(seed, count):
+    """count BBFAS codes with random values, some slots undefined and some at the edges of their range"""
+    rng = random.Random(seed)
+    edges = (-1, 0, 1, 255, 32767, -32768, MAX_VALUE)
+    codes = []
+    for _ in range(count):
+        values = []
+        for _ in range(SLOT_COUNT):
+            roll = rng.random()
+            if roll < 0.2:
+                values.append(MISSING)
+            elif roll < 0.25:
+                values.append(rng.choice(edges))
+            else:
+                values.append(rng.randrange(-1, 256))
+        codes.append(Outfit(None, values).to_bbfas_code())
+    return codes
+
+def iter_corpus_codes(sources):
+    """BBFAS codes of files (one code per line, or JSON records with a "Code"), folders of .txt files or "-" for stdin"""
+    import sys
+
+    for source in sources:
+        if source != "-" and os.path.isdir(source):
+            for path in parallel.iter_input_files(source, (".txt",)):
+                yield parallel.read_input_file(path)
+            continue
+        for record in json_stream.iter_json_records(sys.stdin if source == "-" else source):
+            yield record.get("Code", "") if isinstance(record, dict) else str(record).strip()
+
+def _chunks(codes, chunk_size):
+    """("record", first record number, codes) tasks"""
+    chunk = []
+    for number, code in enumerate(codes):
+        chunk.append(code)
+        if len(chunk) >= chunk_size:
+            yield "record", number + 1 - len(chunk), chunk
+            chunk = []
+    if chunk:
+        yield "record", number + 1 - len(chunk), chunk
+
+# Checker of a worker process, created once by _init_worker
+_checker = None
+
+def _init_worker(gender):
+    global _checker
+    _checker = RoundTripChecker(gender)
+
+def _verify_task(task):
+    """Worker entry point: a (source, first number, codes) task, codes being a (seed, count) pair to generate"""
+    source, first, codes = task
+    if isinstance(codes, tuple):
+        codes = generate_codes(*codes)
+    return _checker.check_many(codes, first, source)
+
+def verify_round_trip(codes=None, generate=0, seed=0, gender="MALE", workers=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Verify the codes of an iterable, then generate codes to verify; returns the merged RoundTripReport
+
+    workers=None uses every core and workers=1 verifies in the current process.
+    progress(report) is called with the running totals after every chunk.
+    """
+    chunk_size = max(1, chunk_size)
+    tasks = _chunks(codes, chunk_size) if codes is not None else iter(())
+    if generate:
+        # Each chunk is generated from its own seed, the same whatever the number of workers
+        generated = (("generated", start, (f"{seed}:{start}", min(chunk_size, generate - start)))
+                     for start in range(0, generate, chunk_size))
+        tasks = itertools.chain(tasks, generated)
+
+    report = RoundTripReport()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(gender)
+        results = map(_verify_task, tasks)
+    else:
+        import multiprocessing
+
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(gender,))
+        results = pool.imap_unordered(_verify_task, tasks)
+
+    try:
+        for chunk_report in results:
+            report.merge(chunk_report)
+            if progress is not None:
+                progress(report)
+    finally:
+        if workers != 1:
+            pool.terminate()
+    report.examples.sort()
+    return report
+
+def main(args):
+    """Round-trip verifier entry point: python main.py verify [INPUTS] [--generate N]"""
+    import argparse
+    import sys
+    import time
+
+    from .cli import add_gender_argument
+
+    parser = argparse.ArgumentParser(prog="main.py verify", description="Run BBFAS → CHERAX → BBFAS in memory and compare the slots of every outfit")
+    parser.add_argument("inputs", nargs="*", help='BBFAS codes (one per line), JSON lines of BBFAS JSON, folders of .txt codes, or "-" for stdin')
+    parser.add_argument("--generate", type=int, default=0, metavar="N", help="also verify N generated codes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated codes (default: 0)")
+    add_gender_argument(parser)
+    parser.add_argument("-w", "--workers", default=0, type=int, help="worker processes, 0 for one per core (default: 0)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"codes per worker task (default: {DEFAULT_CHUNK_SIZE})")
+    options = parser.parse_args(args)
+
+    if not options.inputs and not options.generate:
+        parser.error("give input files or folders, or --generate N")
+
+    show_progress = sys.stderr.isatty()
+
+    def progress(report):
+        if show_progress:
+            print(f"\r🔍 {report.outfits} verified", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    try:
+        codes = iter_corpus_codes(options.inputs) if options.inputs else None
+        report = verify_round_trip(codes, options.generate, options.seed, options.gender,
+                                   options.workers or None, options.chunk_size, progress)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Error reading inputs: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    if show_progress:
+        print(file=sys.stderr)
+
+    total = report.outfits or 1
+    print(f"📊 Round trip BBFAS → CHERAX → BBFAS ({options.gender}): {report.outfits} outfits in {elapsed:.1f} s "
+          f"({report.outfits / elapsed:.0f}/s)")
+    print(f"   {report.identical} identical, {report.outfits - report.identical - report.failed} with differences, {report.failed} failed")
+
+    labels = {
+        "forced": "forced to -1 (no Cherax slot)",
+        "filled": "undefined, filled with the default",
+        "dropped": "unknown key, dropped",
+        "changed": "CHANGED",
+    }
+    for kind in KINDS:
+        slots = report.by_kind(kind)
+        if not slots:
+            continue
+        print(f"\n{'⚠️ ' if kind != 'changed' else '❌'} {labels[kind]}: {sum(slots.values())} slots")
+        for label, count in slots.items():
+            print(f"   {label:<16} {count:>10} outfits ({count / total:.1%})")
+    if report.injected:
+        print("\nℹ️  Added to the Cherax outfit without a BBFAS slot:")
+        for entry, count in report.injected.most_common():
+            print(f"   {entry:<26} {count:>10} outfits ({count / total:.1%})")
+
+    if report.examples:
+        print("\n❌ First problems:")
+        for source, number, code, problem in report.examples:
+            print(f"   {source} {number + 1}: {problem}")
+            print(f"      {code[:100]}{'…' if len(code) > 100 else ''}")
+    print("\n✅ No changed slots or failed conversions" if report.ok else "\n❌ Round trip is not faithful")
+    return 0 if report.ok else 1
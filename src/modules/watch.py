@@ -0,0 +1,415 @@
+"""Watch mode: convert outfit files as soon as they land in a folder
+
+New or rewritten files under the watched folder (recursively) are converted
+with the file converters, by their kind:
+
+    .txt                BBFAS code   -> convert_bbfas_to_json   (src/output/BBFAS/<name>.json)
+    .json with "Item"   BBFAS JSON   -> convert_json_to_cherax  (src/output/CHERAX/<name>.json)
+    other .json         Cherax JSON  -> convert_cherax_to_bbfas (src/output/BBFAS/<name>.txt)
+
+Each output is named after its source, so rewriting a file replaces its output.
+The output folders (and src/output) are never watched, even inside the watched
+folder, so outputs are not converted again; a folder inside one is refused.
+Changes are seen through inotify on Linux (called through ctypes, no extra
+package) and by polling the folder elsewhere. Events for the same file are
+debounced: a file is converted once nothing happened to it for `debounce`
+seconds, so a burst of writes gives one conversion. Conversions run in a small
+thread pool with a bounded number of files in flight; when it is full, events
+wait in the kernel queue (inotify) or for the next scan (polling).
+"""
+
+import collections
+import json
+import os
+import select
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import load_converter, output_sink, parallel
+from .sync import OUTPUT_ROOT
+
+DEFAULT_DEBOUNCE = 0.02        # seconds without events before a file is converted
+DEFAULT_POLL_INTERVAL = 0.05   # seconds between two scans of the polling watcher
+DEFAULT_WORKERS = 4
+EXTENSIONS = (".txt", ".json")
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+# What a watcher reports: the file is done being written (ready) or still changing (modified)
+READY = "ready"
+MODIFIED = "modified"
+
+def is_watched_file(name):
+    """Outfit files only: no hidden, temporary or backup files"""
+    return name.lower().endswith(EXTENSIONS) and not name.startswith((".", "~"))
+
+def output_dirs():
+    """Absolute paths of the folders the converters write to, and of src/output"""
+    dirs = {os.path.abspath(OUTPUT_ROOT)}
+    for module_name in ("bbfas_json", "json_cherax", "cherax_bbfas"):
+        dirs.add(os.path.abspath(load_converter(module_name).OUTPUT_DIR))
+    return dirs
+
+class InotifyWatcher:
+    """Linux inotify watcher over a folder tree, through ctypes; the skip_dirs subtrees (absolute paths) are left out"""
+
+    def __init__(self, directory, skip_dirs=()):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directory = directory
+        self.skip_dirs = frozenset(skip_dirs)
+        self._paths = {}   # watch descriptor -> folder
+        self._add_tree(directory, [])
+
+    def _add_tree(self, directory, events):
+        """Watch a folder and its subfolders; files already in subfolders created after start are reported"""
+        import ctypes
+
+        pending = [directory]
+        while pending:
+            folder = pending.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+            if wd < 0:
+                if folder == directory:
+                    raise OSError(ctypes.get_errno(), f"cannot watch {folder}")
+                continue
+            self._paths[wd] = folder
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.abspath(entry.path) not in self.skip_dirs:
+                                pending.append(entry.path)
+                        elif folder != directory and is_watched_file(entry.name):
+                            events.append((entry.path, READY))
+            except OSError:
+                pass
+
+    def wait(self, timeout):
+        """(path, READY | MODIFIED) events, after waiting up to timeout seconds (None: forever) for one"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        events = []
+        while True:
+            try:
+                buffer = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = _EVENT.unpack_from(buffer, offset)
+                name = buffer[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost: report every file of the tree
+                    events.extend((path, READY) for path in scan_tree(self.directory, self.skip_dirs))
+                    continue
+                if mask & IN_IGNORED:
+                    self._paths.pop(wd, None)
+                    continue
+                folder = self._paths.get(wd)
+                if folder is None or not name:
+                    continue
+                path = os.path.join(folder, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.abspath(path) not in self.skip_dirs:
+                        self._add_tree(path, events)
+                elif is_watched_file(os.path.basename(path)):
+                    if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        events.append((path, READY))
+                    elif mask & IN_MODIFY:
+                        events.append((path, MODIFIED))
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+def scan_tree(directory, skip_dirs=()):
+    """{path: (size, mtime_ns)} of the watched files under directory, outside the skip_dirs subtrees"""
+    found = {}
+    pending = [directory]
+    while pending:
+        folder = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if os.path.abspath(entry.path) not in skip_dirs:
+                            pending.append(entry.path)
+                    elif is_watched_file(entry.name):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+    return found
+
+class PollingWatcher:
+    """Portable watcher: rescans the folder tree every interval seconds"""
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL, skip_dirs=()):
+        self.directory = directory
+        self.interval = interval
+        self.skip_dirs = frozenset(skip_dirs)
+        self._files = scan_tree(directory, self.skip_dirs)
+        self._next_scan = time.monotonic() + interval
+
+    def wait(self, timeout):
+        delay = self._next_scan - time.monotonic()
+        if timeout is not None:
+            delay = min(delay, timeout)
+        if delay > 0:
+            time.sleep(delay)
+        if time.monotonic() < self._next_scan:
+            return []
+        self._next_scan = time.monotonic() + self.interval
+
+        files = scan_tree(self.directory, self.skip_dirs)
+        # A changed file may still be being written: it is converted once it stops changing
+        events = [(path, READY) for path, state in files.items() if self._files.get(path) != state]
+        self._files = files
+        return events
+
+    def close(self):
+        pass
+
+def create_watcher(directory, polling=False, interval=DEFAULT_POLL_INTERVAL, skip_dirs=()):
+    """inotify watcher where available, else a polling one"""
+    if not polling:
+        try:
+            return InotifyWatcher(directory, skip_dirs)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, interval, skip_dirs)
+
+def convert_file(path, gender="MALE"):
+    """Convert one dropped file with the converter for its kind; returns the output path or None"""
+    name, extension = os.path.splitext(os.path.basename(path))
+    if extension.lower() == ".txt":
+        code = parallel.read_input_file(path)
+        return load_converter("bbfas_json").convert_bbfas_to_json(code, f"{name}.json")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "Item" in data:
+        return load_converter("json_cherax").convert_json_to_cherax(path, gender, f"{name}.json")
+    return load_converter("cherax_bbfas").convert_cherax_to_bbfas(path, gender, f"{name}.txt")
+
+class FolderWatcher:
+    """Debounces the events of a watcher and converts the files in a bounded thread pool
+
+    on_result(path, output, error, latency) is called from a worker thread after
+    each conversion; latency is the time from the file's first event to the end
+    of its conversion. Raises ValueError for a folder inside an output folder.
+    """
+
+    def __init__(self, directory, gender="MALE", workers=DEFAULT_WORKERS, debounce=DEFAULT_DEBOUNCE,
+                 polling=False, interval=DEFAULT_POLL_INTERVAL, existing=False, on_result=None):
+        # The outputs must not be converted again: they would be rewritten, seen and converted forever
+        skip_dirs = output_dirs()
+        folder = os.path.abspath(directory)
+        for output_dir in skip_dirs:
+            if folder == output_dir or folder.startswith(os.path.join(output_dir, "")):
+                raise ValueError(f"{directory} is inside the output folder {output_dir}")
+        self.directory = directory
+        self.gender = gender
+        self.workers = max(1, workers)
+        self.max_pending = 4 * self.workers
+        self.debounce = debounce
+        self.converted = 0
+        self.failed = 0
+        self.latencies = collections.deque(maxlen=10000)
+        self.on_result = on_result
+        # output_dirs() loaded the converters: worker threads must not import them concurrently
+        self.watcher = create_watcher(directory, polling, interval, skip_dirs)
+        if isinstance(self.watcher, PollingWatcher):
+            # The file must be seen unchanged by a later scan before it is converted
+            self.debounce = max(debounce, interval * 1.5)
+
+        self._due = {}              # path -> (first event time, conversion deadline)
+        self._running = set()       # paths being converted
+        self._again = {}            # path -> first event time, for files changed while being converted
+        self._finished = collections.deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._stop = threading.Event()
+        self._executor = None
+        if existing:
+            now = time.monotonic()
+            for path in scan_tree(directory, skip_dirs):
+                self._due[path] = (now, now)
+
+    def _on_event(self, path, kind, now):
+        entry = self._due.get(path)
+        if entry is not None:
+            self._due[path] = (entry[0], now + self.debounce)
+        elif kind == READY:
+            self._due[path] = (now, now + self.debounce)
+
+    def _convert(self, path, first_seen):
+        try:
+            output = convert_file(path, self.gender)
+            error = None if output else "conversion failed"
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            output, error = None, f"Error loading file: {e}"
+        except Exception as e:
+            output, error = None, f"Error during conversion: {e}"
+        latency = time.monotonic() - first_seen
+        with self._lock:
+            if output:
+                self.converted += 1
+                self.latencies.append(latency)
+            else:
+                self.failed += 1
+            self._running.discard(path)
+        self._finished.append(path)
+        self._slots.release()
+        if self.on_result is not None:
+            self.on_result(path, output, error, latency)
+
+    def _dispatch(self, now):
+        """Start the conversions that are due, while there is room in the pool"""
+        # Files changed while they were being converted are converted again
+        while self._finished:
+            path = self._finished.popleft()
+            first_seen = self._again.pop(path, None)
+            if first_seen is not None and path not in self._due:
+                self._due[path] = (first_seen, now)
+
+        for path, (first_seen, deadline) in sorted(self._due.items(), key=lambda item: item[1][1]):
+            if deadline > now:
+                break
+            with self._lock:
+                running = path in self._running
+            if running:
+                self._again.setdefault(path, first_seen)
+                del self._due[path]
+                continue
+            if not self._slots.acquire(blocking=False):
+                break
+            del self._due[path]
+            with self._lock:
+                self._running.add(path)
+            self._executor.submit(self._convert, path, first_seen)
+
+    def _timeout(self, now):
+        """How long the watcher may block before something is due"""
+        if self._due:
+            return max(0.0, min(deadline for _, deadline in self._due.values()) - now)
+        with self._lock:
+            busy = bool(self._running)
+        return self.debounce if busy or self._finished else 0.5
+
+    def run(self):
+        """Watch until stop() is called (or KeyboardInterrupt)"""
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="watch")
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                for path, kind in self.watcher.wait(self._timeout(now)):
+                    self._on_event(path, kind, time.monotonic())
+                self._dispatch(time.monotonic())
+                with self._lock:
+                    idle = not self._running
+                if idle and not self._due:
+                    # Nothing left to convert: write what a buffered output sink holds
+                    self._flush_outputs()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.watcher.close()
+
+    def _flush_outputs(self):
+        try:
+            output_sink.flush_outputs()
+        except OSError as e:
+            if self.on_result is not None:
+                self.on_result(e.filename or self.directory, None, f"Error writing outputs: {e}", 0.0)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        """Conversion counts and latency percentiles (seconds) of the recent conversions"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            converted, failed = self.converted, self.failed
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else None
+
+        return {"converted": converted, "failed": failed, "p50": percentile(0.5), "p99": percentile(0.99),
+                "backend": "inotify" if isinstance(self.watcher, InotifyWatcher) else "polling"}
+
+def main(args):
+    """Watch mode entry point: python main.py watch FOLDER"""
+    import argparse
+    import contextlib
+    import signal
+    import sys
+
+    from .cli import add_gender_argument, add_write_arguments, enable_output_sink
+
+    parser = argparse.ArgumentParser(prog="main.py watch", description="Convert the outfit files dropped in a folder as they arrive (Ctrl+C to stop)")
+    parser.add_argument("folder", help="folder to watch, with its subfolders")
+    add_gender_argument(parser)
+    parser.add_argument("-w", "--workers", default=DEFAULT_WORKERS, type=int, help=f"conversion threads (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--debounce", default=DEFAULT_DEBOUNCE * 1000, type=float, metavar="MS",
+                        help=f"quiet time before a changed file is converted (default: {DEFAULT_DEBOUNCE * 1000:.0f} ms)")
+    parser.add_argument("--poll", nargs="?", const=DEFAULT_POLL_INTERVAL * 1000, type=float, metavar="MS",
+                        help=f"scan the folder every MS milliseconds instead of using inotify (default: {DEFAULT_POLL_INTERVAL * 1000:.0f})")
+    parser.add_argument("--existing", action="store_true", help="also convert the files already in the folder")
+    parser.add_argument("-q", "--quiet", action="store_true", help="hide the converter messages, only report errors")
+    add_write_arguments(parser)
+    options = parser.parse_args(args)
+
+    if not os.path.isdir(options.folder):
+        parser.error(f"{options.folder} is not a folder")
+    enable_output_sink(options)
+
+    def on_result(path, output, error, latency):
+        if error:
+            print(f"❌ {path}: {error}", file=sys.stderr)
+
+    try:
+        watcher = FolderWatcher(options.folder, options.gender, options.workers, options.debounce / 1000,
+                                options.poll is not None, options.poll / 1000 if options.poll else DEFAULT_POLL_INTERVAL,
+                                options.existing, on_result)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"👀 Watching {options.folder} ({watcher.stats()['backend']}), Ctrl+C to stop", file=sys.stderr)
+    # Stop cleanly on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    with contextlib.ExitStack() as stack:
+        if options.quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+
+    stats = watcher.stats()
+    latency = f", latency p50 {stats['p50'] * 1000:.1f} ms / p99 {stats['p99'] * 1000:.1f} ms" if stats["p50"] is not None else ""
+    print(f"📊 Watch: {stats['converted']} converted, {stats['failed']} failed{latency}", file=sys.stderr)
+    return 0
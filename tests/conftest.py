@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from modules import output_naming, output_sink
+from modules.verify import generate_codes
+
+@pytest.fixture
+def codes():
+    """BBFAS codes with random values, undefined slots and values at the edges of their range"""
+    return generate_codes(1234, 20)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """An empty working directory: the converters write under src/output of the working directory"""
+    monkeypatch.chdir(tmp_path)
+    # Output folders and name suffixes are remembered by relative path
+    monkeypatch.setattr(output_sink, "_known_dirs", set())
+    monkeypatch.setattr(output_naming, "_next_suffix", {})
+    return tmp_path
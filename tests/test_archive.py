@@ -0,0 +1,44 @@
+import pytest
+
+from modules import load_converter
+from modules.archive import ArchiveReader, ArchiveWriter
+from modules.outfit import MAX_VALUE, MIN_VALUE, Outfit
+
+def test_round_trip(tmp_path, codes):
+    outfit = Outfit()
+    outfit.set("pCI1", MAX_VALUE)
+    outfit.set("pPt7", MIN_VALUE)
+    with ArchiveWriter(str(tmp_path / "outfits.ofa")) as writer:
+        for number, code in enumerate(codes):
+            assert writer.add_bbfas_code(code, f"o{number}") == number
+        assert writer.add_bbfas_code("not a code") is None
+        writer.add(outfit)
+
+    with ArchiveReader(str(tmp_path / "outfits.ofa")) as reader:
+        assert len(reader) == len(codes) + 1
+        for number, code in enumerate(codes):
+            assert reader.to_bbfas_code(number) == code
+            assert reader.name(number) == f"o{number}"
+        assert list(reader.values(-1)) == list(outfit.values)
+        json_cherax = load_converter("json_cherax")
+        assert reader.to_cherax_json(0, "MALE") == json_cherax.outfit_to_cherax_json(reader.outfit(0), "MALE")
+        with pytest.raises(IndexError):
+            reader.values(len(codes) + 1)
+
+def test_close_raises_while_a_view_is_alive(tmp_path, codes):
+    with ArchiveWriter(str(tmp_path / "outfits.ofa")) as writer:
+        writer.add_bbfas_code(codes[0])
+    reader = ArchiveReader(str(tmp_path / "outfits.ofa"))
+    values = reader.values(0)
+    with pytest.raises(BufferError):
+        reader.close()
+    # Still open and usable
+    assert reader.to_bbfas_code(0) == codes[0]
+    values.release()
+    reader.close()
+    reader.close()
+
+def test_not_an_archive(tmp_path):
+    (tmp_path / "plain.ofa").write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        ArchiveReader(str(tmp_path / "plain.ofa"))
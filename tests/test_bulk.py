@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from modules import bulk, load_converter
+from modules.outfit import MAX_VALUE, MIN_VALUE, Outfit
+
+def test_decode_matches_the_converter(codes):
+    bbfas_json = load_converter("bbfas_json")
+    matrix, errors = bulk.decode_bbfas_codes(codes + ["not a code"])
+    assert errors.keys() == {len(codes)}
+    for row, code in enumerate(codes):
+        assert matrix[row].tolist() == list(bbfas_json.bbfas_to_outfit(code).values)
+
+def test_encode_is_byte_identical(codes):
+    matrix, _ = bulk.decode_bbfas_codes(codes)
+    assert bulk.encode_bbfas_codes(matrix) == codes
+    assert bulk.encode_bbfas_codes(matrix[:0]) == []
+
+def test_values_outside_the_field_table(codes):
+    outfit = Outfit()
+    for key, value in (("pCI1", 40000), ("pCT1", -32769), ("pPi0", MAX_VALUE), ("pPt0", MIN_VALUE), ("pCI2", -32768)):
+        outfit.set(key, value)
+    code = outfit.to_bbfas_code()
+    matrix, errors = bulk.decode_bbfas_codes([codes[0], code])
+    assert not errors
+    assert matrix[1].tolist() == list(outfit.values)
+    assert bulk.encode_bbfas_codes(matrix) == [codes[0], code]
+
+def test_encode_rejects_values_beyond_an_outfit_slot():
+    matrix = bulk.empty_matrix(1).astype(np.int64)
+    matrix[0, 0] = MAX_VALUE + 1
+    assert not bulk.validate_matrix(matrix).any()
+    with pytest.raises(ValueError):
+        bulk.encode_bbfas_codes(matrix)
+
+@pytest.mark.parametrize("gender", ["MALE", "FEMALE"])
+def test_cherax_records_match_the_converter(codes, gender):
+    json_cherax = load_converter("json_cherax")
+    matrix, _ = bulk.decode_bbfas_codes(codes)
+    records = bulk.encode_cherax_records(matrix, gender)
+    bbfas_json = load_converter("bbfas_json")
+    assert records == [json_cherax.outfit_to_cherax(bbfas_json.bbfas_to_outfit(code), gender) for code in codes]
+    matrix_back, errors = bulk.matrix_from_cherax(records)
+    assert not errors
+    assert bulk.encode_cherax_records(matrix_back, gender) == records
@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from modules import dedup, load_converter, pipeline
+
+@pytest.fixture
+def folders(workdir, codes):
+    """BBFAS codes and the Cherax JSON of the same outfits, with one duplicate in each folder"""
+    bbfas = workdir / "BBFAS"
+    cherax = workdir / "CHERAX"
+    bbfas.mkdir()
+    cherax.mkdir()
+    for number, code in enumerate(codes[:3]):
+        (bbfas / f"o{number}.txt").write_text(code, encoding="utf-8")
+        (cherax / f"o{number}.json").write_text(json.dumps(pipeline.bbfas_to_cherax(code), indent=2), encoding="utf-8")
+    (bbfas / "p0.txt").write_text(codes[0], encoding="utf-8")
+    (cherax / "p1.json").write_text(json.dumps(pipeline.bbfas_to_cherax(codes[1])), encoding="utf-8")
+    return bbfas, cherax
+
+@pytest.fixture
+def active_dedup():
+    yield dedup.enable_dedup("skip")
+    dedup.disable_dedup()
+
+def test_fingerprint_is_the_same_for_every_form(codes):
+    for code in codes:
+        bbfas_json = load_converter("bbfas_json").bbfas_to_json(code)
+        assert dedup.fingerprint(code) == dedup.fingerprint(bbfas_json) == dedup.fingerprint(json.dumps(bbfas_json))
+        # pCI0/pCT0 have no Cherax slot: a Cherax file matches the code it converts back to
+        cherax = pipeline.bbfas_to_cherax(code)
+        assert dedup.fingerprint(cherax) == dedup.fingerprint(json.dumps(cherax, indent=2)) == dedup.fingerprint(pipeline.bbfas_round_trip(code)[2])
+
+def test_data_format():
+    assert dedup.data_format("SXRlbQ==") == "bbfas_code"
+    assert dedup.data_format({"Item": {}}) == "bbfas_json"
+    assert dedup.data_format('{"components": {}}') == "cherax_json"
+    assert dedup.data_format("") is None
+
+def test_scan_keeps_formats_separate(folders):
+    bbfas, cherax = folders
+    index = dedup.DedupIndex()
+    paths = sorted(str(path) for folder in folders for path in folder.iterdir())
+    duplicates = sorted(list(index.scan(paths)))
+    assert duplicates == [(str(bbfas / "p0.txt"), str(bbfas / "o0.txt")), (str(cherax / "p1.json"), str(cherax / "o1.json"))]
+
+@pytest.mark.parametrize("action", ["--link", "--remove"])
+def test_main_only_replaces_files_of_the_same_format(folders, action):
+    bbfas, cherax = folders
+    assert dedup.main([str(bbfas), str(cherax), "--db", "index.sqlite3", action]) == 0
+    kept = sorted(path.name for folder in folders for path in folder.iterdir())
+    if action == "--remove":
+        assert kept == ["o0.json", "o0.txt", "o1.json", "o1.txt", "o2.json", "o2.txt"]
+    else:
+        assert os.path.samefile(bbfas / "p0.txt", bbfas / "o0.txt")
+        assert os.path.samefile(cherax / "p1.json", cherax / "o1.json")
+        for number in range(3):
+            assert (bbfas / f"o{number}.txt").read_text(encoding="utf-8").strip() != ""
+            assert json.loads((cherax / f"o{number}.json").read_text(encoding="utf-8"))["format"] == "Cherax Entity"
+
+def test_converters_skip_only_outputs_of_their_format(workdir, codes, active_dedup):
+    outfit = load_converter("bbfas_json").bbfas_to_outfit(codes[0])
+    json_cherax = load_converter("json_cherax")
+    cherax_bbfas = load_converter("cherax_bbfas")
+
+    cherax_path = json_cherax.save_cherax_json(outfit)
+    with open(cherax_path, encoding="utf-8") as f:
+        code = cherax_bbfas.cherax_to_bbfas(json.load(f), "MALE")
+    code_path = cherax_bbfas.save_bbfas_code(code, "MALE")
+    assert code_path != cherax_path
+    with open(code_path, encoding="utf-8") as f:
+        assert f.read().strip() == code
+
+    assert json_cherax.save_cherax_json(outfit) == cherax_path
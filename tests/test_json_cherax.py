@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from modules import load_converter
+
+@pytest.mark.parametrize("gender", ["MALE", "FEMALE"])
+@pytest.mark.parametrize("compact", [False, True])
+def test_template_output_matches_json_dumps(codes, gender, compact):
+    bbfas_json = load_converter("bbfas_json")
+    json_cherax = load_converter("json_cherax")
+    for code in codes:
+        outfit = bbfas_json.bbfas_to_outfit(code)
+        expected = json_cherax.serialize_cherax_json(json_cherax.outfit_to_cherax(outfit, gender), compact)
+        assert json_cherax.outfit_to_cherax_json(outfit, gender, compact) == expected
+
+def test_serialized_output_is_the_cherax_record(codes):
+    json_cherax = load_converter("json_cherax")
+    outfit = load_converter("bbfas_json").bbfas_to_outfit(codes[0])
+    record = json.loads(json_cherax.outfit_to_cherax_json(outfit, "FEMALE"))
+    assert record == json_cherax.outfit_to_cherax(outfit, "FEMALE")
+    assert record["model"] == json_cherax.MODELS["FEMALE"]
+
+def test_saved_file_is_the_serialized_record(workdir, codes):
+    json_cherax = load_converter("json_cherax")
+    outfit = load_converter("bbfas_json").bbfas_to_outfit(codes[1])
+    path = json_cherax.save_cherax_json(outfit, "MALE")
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == json_cherax.outfit_to_cherax_json(outfit, "MALE")
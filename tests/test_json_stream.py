@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+
+from modules.json_stream import JsonRecordWriter, iter_json_records
+
+def records(text, **kwargs):
+    return list(iter_json_records(io.StringIO(text), **kwargs))
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 16])
+def test_reads_lines_arrays_and_concatenated_documents(chunk_size):
+    assert records('{"a": 1}\n{"b":\n2}\n', chunk_size=chunk_size) == [{"a": 1}, {"b": 2}]
+    assert records('{"a": 1}{"b": 2}', chunk_size=chunk_size) == [{"a": 1}, {"b": 2}]
+    assert records(' [ {"a": 1},\n{"b": 2}\n]\n', chunk_size=chunk_size) == [{"a": 1}, {"b": 2}]
+    assert records("[]", chunk_size=chunk_size) == []
+    assert records("12\n34", chunk_size=chunk_size) == [12, 34]
+
+def test_bad_line_is_yielded_as_text():
+    assert records('{bad\n{"a": 1}\n') == ["{bad", {"a": 1}]
+
+def test_bad_line_is_reported_at_its_line_break():
+    class CountingReader(io.StringIO):
+        read_size = 0
+
+        def read(self, size=-1):
+            text = super().read(size)
+            self.read_size += len(text)
+            return text
+
+    stream = CountingReader('{"x": bad\n{"a": 1}\n' + " " * (1 << 20))
+    assert next(iter_json_records(stream, chunk_size=64)) == '{"x": bad'
+    assert stream.read_size < 1024
+
+@pytest.mark.parametrize("text", ["[1,,,2]", "[,1]", "[1,]", "[1 2]", "[1] [2]", "[1]x", "[1, 2"])
+def test_malformed_array_raises(text):
+    with pytest.raises(ValueError):
+        records(text)
+
+def test_writer_lines_and_array():
+    lines = io.StringIO()
+    with JsonRecordWriter(lines) as writer:
+        writer.write({"a": 1})
+        writer.write({"b": "é"})
+    assert lines.getvalue() == '{"a":1}\n{"b":"é"}\n'
+
+    array = io.StringIO()
+    with JsonRecordWriter(array, as_array=True) as writer:
+        writer.write({"a": 1})
+        writer.write({"b": 2})
+    assert json.loads(array.getvalue()) == [{"a": 1}, {"b": 2}]
+    assert records(array.getvalue()) == [{"a": 1}, {"b": 2}]
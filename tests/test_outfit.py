@@ -0,0 +1,31 @@
+from modules import load_converter, pipeline
+from modules.outfit import MAX_VALUE, MIN_VALUE, MISSING, SLOT_COUNT, Outfit
+
+def test_values_outside_int16_convert_unchanged():
+    data = {"Item": {"Clothes": {"Drawable": {"pCI1": 40000, "pCI2": -32768}, "Texture": {"pCT1": MAX_VALUE}}}}
+    cherax = load_converter("json_cherax").json_to_cherax(data)
+    assert cherax["components"]["Beard"] == {"drawable": 40000, "texture": MAX_VALUE, "palette": 0}
+    assert cherax["components"]["Hair"]["drawable"] == -32768
+
+def test_minus_32768_is_a_value_not_missing():
+    outfit = Outfit()
+    outfit.set("pCI3", -32768)
+    assert outfit.get("pCI3") == -32768
+    assert outfit.get("pCI4") is None
+    assert MISSING < MIN_VALUE
+
+def test_values_beyond_32_bits_are_rejected(capsys):
+    data = {"Item": {"Clothes": {"Drawable": {"pCI1": MAX_VALUE + 1}}}}
+    assert load_converter("json_cherax").json_to_cherax(data) is None
+    assert "[range]" in capsys.readouterr().out
+
+def test_bbfas_code_round_trip(codes):
+    bbfas_json = load_converter("bbfas_json")
+    for code in codes:
+        assert bbfas_json.bbfas_to_outfit(code).to_bbfas_code() == code
+        assert None not in pipeline.bbfas_round_trip(code)
+
+def test_empty_outfit_has_every_slot_missing():
+    outfit = Outfit()
+    assert list(outfit.values) == [MISSING] * SLOT_COUNT
+    assert outfit.to_bbfas_items() == {"Clothes": {"Drawable": {}, "Texture": {}}, "Props": {"Drawable": {}, "Texture": {}}}
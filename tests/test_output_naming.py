@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from modules import output_sink
+from modules.output_naming import get_unique_filename
+
+def test_names_are_unique_and_reserved(workdir):
+    (workdir / "outfit-3.json").write_text("{}", encoding="utf-8")
+    first = get_unique_filename(str(workdir), "outfit", "json")
+    second = get_unique_filename(str(workdir), "outfit", "json")
+    assert (os.path.basename(first), os.path.basename(second)) == ("outfit-4.json", "outfit-5.json")
+    assert os.path.getsize(first) == 0
+
+def test_failed_write_removes_the_placeholders_left(workdir):
+    first = get_unique_filename(str(workdir), "outfit", "json")
+    second = get_unique_filename(str(workdir), "outfit", "json")
+    with pytest.raises(TypeError):
+        output_sink.write_files([(first, "{}"), (second, None)])
+    assert (workdir / "outfit.json").read_text(encoding="utf-8") == "{}"
+    assert not os.path.exists(second)
+
+def test_placeholders_never_written_are_removed_at_exit(workdir):
+    path = get_unique_filename(str(workdir), "outfit", "json")
+    written = get_unique_filename(str(workdir), "outfit", "json")
+    output_sink.write_files([(written, "{}")])
+    output_sink._flush_at_exit()
+    assert not os.path.exists(path)
+    assert os.path.exists(written)
@@ -0,0 +1,45 @@
+import json
+import zipfile
+
+import pytest
+
+from modules import load_converter, pipeline
+from modules.packs import convert_pack
+
+@pytest.fixture
+def pack(workdir, codes):
+    path = workdir / "pack.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        for number, code in enumerate(codes):
+            archive.writestr(f"codes/o{number}.txt", code)
+        archive.writestr("cherax/c0.json", json.dumps(pipeline.bbfas_to_cherax(codes[0])))
+        archive.writestr("json/b0.json", json.dumps(load_converter("bbfas_json").bbfas_to_json(codes[1])))
+        archive.writestr("codes/bad.txt", "not a code")
+        archive.writestr("readme.md", "not an outfit")
+    return path
+
+def read_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name).decode("utf-8") for name in archive.namelist()}
+
+def test_members_are_converted_by_kind(pack, codes):
+    failures = []
+    report = convert_pack(str(pack), str(pack.parent / "out.zip"),
+                          report=lambda action, member, detail: action == "failed" and failures.append(member))
+    assert report == (len(codes) + 2, 1, 1)
+    assert failures == ["codes/bad.txt"]
+    outputs = read_zip(pack.parent / "out.zip")
+    assert json.loads(outputs["codes/o3.json"]) == pipeline.bbfas_to_cherax(codes[3])
+    assert outputs["cherax/c0.txt"] == pipeline.bbfas_round_trip(codes[0])[2]
+    assert json.loads(outputs["json/b0.json"]) == pipeline.bbfas_to_cherax(codes[1])
+
+def test_workers_give_the_same_archive(pack):
+    convert_pack(str(pack), str(pack.parent / "one.zip"), workers=1)
+    convert_pack(str(pack), str(pack.parent / "two.zip"), workers=2, chunk_size=2)
+    assert read_zip(pack.parent / "one.zip") == read_zip(pack.parent / "two.zip")
+
+def test_not_an_archive(workdir):
+    (workdir / "plain.txt").write_text("text", encoding="utf-8")
+    with pytest.raises(ValueError):
+        convert_pack(str(workdir / "plain.txt"), str(workdir / "out.zip"))
+    assert not (workdir / "out.zip").exists()
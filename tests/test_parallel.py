@@ -0,0 +1,27 @@
+from modules import load_converter, parallel
+
+def test_convert_many_keeps_the_input_order(codes):
+    items = codes[:6] + ["not a code"] + codes[6:10]
+    bbfas_json = load_converter("bbfas_json")
+    for workers in (1, 2):
+        results = list(parallel.convert_many("bbfas-json", items, workers=workers, chunk_size=2, max_in_flight=4))
+        assert [index for index, _, _, _ in results] == list(range(len(items)))
+        assert results[6][2] is None and results[6][3]
+        for index, item, result, error in results[:6]:
+            assert item == codes[index]
+            assert error is None
+            assert result == bbfas_json.bbfas_to_json(codes[index])
+
+def test_unordered_results_cover_every_item(codes):
+    results = parallel.convert_many("bbfas-cherax", codes, workers=2, chunk_size=3, ordered=False)
+    assert sorted(index for index, _, _, _ in results) == list(range(len(codes)))
+
+def test_error_message_strips_one_mark_per_line():
+    assert parallel.error_message("❌ Error: ⚠️ inner\n\n  ⚠ other \n") == "Error: ⚠️ inner | other"
+    assert parallel.error_message("") == ""
+
+def test_run_quiet_reports_the_converter_message(capsys):
+    result, error = parallel.run_quiet("bbfas-json", "not a code")
+    assert result is None
+    assert error and not error.startswith("❌")
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from modules import profiling
+
+@profiling.stage("test")
+def decorated_before_enable(value):
+    return value * 2
+
+@pytest.fixture
+def profile(monkeypatch):
+    monkeypatch.delenv(profiling.ENV_VAR, raising=False)
+    profiling.take_stats()
+    profiling.enable(report_at_exit=False)
+    yield
+    profiling.report(io.StringIO())
+
+def test_calls_are_only_timed_while_enabled():
+    assert decorated_before_enable(2) == 4
+    assert "test" not in (profiling.take_stats() or {})
+
+def test_stage_decorated_before_enable_is_counted(profile):
+    assert decorated_before_enable(3) == 6
+    decorated_before_enable(4)
+    assert profiling.take_stats()["test"][0] == 2
+
+def test_report_disables_profiling(profile):
+    decorated_before_enable(1)
+    output = io.StringIO()
+    profiling.report(output)
+    assert "test" in output.getvalue()
+    assert not profiling.is_enabled()
+    profiling.take_stats()
+    decorated_before_enable(1)
+    assert profiling.take_stats() is None
+
+def test_parse_modes():
+    assert profiling.parse_modes("1") == ("stages",)
+    assert profiling.parse_modes("tracemalloc, stages") == ("stages", "tracemalloc")
+    with pytest.raises(ValueError):
+        profiling.parse_modes("bogus")
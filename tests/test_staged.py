@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from modules import load_converter, pipeline
+from modules.staged import convert_directory, main as staged_main
+
+def test_outputs_mirror_the_source_tree(workdir, codes):
+    source = workdir / "sources"
+    (source / "nested").mkdir(parents=True)
+    for number, code in enumerate(codes[:6]):
+        folder = source / "nested" if number % 2 else source
+        (folder / f"o{number}.txt").write_text(code, encoding="utf-8")
+    (source / "bad.txt").write_text("not a code", encoding="utf-8")
+
+    for workers in (1, 2):
+        output = workdir / f"out{workers}"
+        result = convert_directory(str(source), "bbfas-cherax", str(output), workers=workers, queue_size=2)
+        assert (result.converted, result.failed) == (6, 1)
+        assert json.loads((output / "nested" / "o1.json").read_text(encoding="utf-8")) == pipeline.bbfas_to_cherax(codes[1])
+
+def test_refuses_to_write_outputs_over_their_sources(workdir, codes):
+    source = workdir / "sources"
+    source.mkdir()
+    bbfas_json = load_converter("bbfas_json")
+    (source / "o0.json").write_text(json.dumps(bbfas_json.bbfas_to_json(codes[0])), encoding="utf-8")
+    before = (source / "o0.json").read_text(encoding="utf-8")
+    for output in (source, workdir):
+        with pytest.raises(ValueError):
+            convert_directory(str(source), "json-cherax", str(output))
+    assert staged_main(["json-cherax", str(source), "-o", str(source)]) == 2
+    assert (source / "o0.json").read_text(encoding="utf-8") == before
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from modules import load_converter
+from modules.sync import MANIFEST_NAME, main as sync_main, sync_directory
+
+def write_sources(source, codes):
+    (source / "nested").mkdir(parents=True, exist_ok=True)
+    for number, code in enumerate(codes):
+        folder = source / "nested" if number % 2 else source
+        (folder / f"o{number}.txt").write_text(code, encoding="utf-8")
+
+def test_add_change_remove(workdir, codes):
+    source = workdir / "sources"
+    output = workdir / "out"
+    write_sources(source, codes[:4])
+    bbfas_json = load_converter("bbfas_json")
+
+    report = sync_directory(str(source), "bbfas-json", str(output))
+    assert (report.added, report.changed, report.unchanged, report.removed, report.failed) == (4, 0, 0, 0, 0)
+    assert json.loads((output / "nested" / "o1.json").read_text(encoding="utf-8")) == bbfas_json.bbfas_to_json(codes[1])
+    assert (output / MANIFEST_NAME).exists()
+
+    assert sync_directory(str(source), "bbfas-json", str(output)).unchanged == 4
+
+    (source / "o0.txt").write_text(codes[5], encoding="utf-8")
+    os.utime(source / "o0.txt", ns=(1, 1))
+    report = sync_directory(str(source), "bbfas-json", str(output))
+    assert (report.added, report.changed, report.unchanged) == (0, 1, 3)
+    assert json.loads((output / "o0.json").read_text(encoding="utf-8")) == bbfas_json.bbfas_to_json(codes[5])
+
+def test_removal_deletes_only_the_output_of_the_removed_source(workdir, codes):
+    source = workdir / "sources"
+    output = workdir / "out"
+    write_sources(source, codes[:4])
+    sync_directory(str(source), "bbfas-json", str(output))
+    (output / "notes.txt").write_text("kept", encoding="utf-8")
+
+    (source / "nested" / "o1.txt").unlink()
+    (source / "nested" / "o3.txt").unlink()
+    report = sync_directory(str(source), "bbfas-json", str(output))
+    assert (report.removed, report.unchanged) == (2, 2)
+    assert not (output / "nested").exists()
+    assert sorted(path.name for path in output.iterdir()) == [MANIFEST_NAME, "notes.txt", "o0.json", "o2.json"]
+
+def test_dry_run_changes_nothing(workdir, codes):
+    source = workdir / "sources"
+    output = workdir / "out"
+    write_sources(source, codes[:2])
+    sync_directory(str(source), "bbfas-json", str(output))
+    (source / "o0.txt").unlink()
+    write_sources(source / "more", codes[2:3])
+
+    before = sorted(str(path) for path in output.rglob("*"))
+    report = sync_directory(str(source), "bbfas-json", str(output), dry_run=True)
+    assert (report.added, report.removed) == (1, 1)
+    assert sorted(str(path) for path in output.rglob("*")) == before
+
+def test_output_folder_inside_the_sources_is_not_read(workdir, codes):
+    source = workdir / "sources"
+    write_sources(source, codes[:2])
+    output = source / "converted"
+    sync_directory(str(source), "bbfas-json", str(output))
+    (output / "stray.txt").write_text(codes[3], encoding="utf-8")
+    report = sync_directory(str(source), "bbfas-json", str(output))
+    assert (report.added, report.unchanged) == (0, 2)
+
+def test_failed_source_is_reported_and_retried(workdir, codes):
+    source = workdir / "sources"
+    output = workdir / "out"
+    source.mkdir()
+    (source / "bad.txt").write_text("not a code", encoding="utf-8")
+    failures = []
+    report = sync_directory(str(source), "bbfas-json", str(output), report=lambda action, path, detail: action == "failed" and failures.append(path))
+    assert (report.added, report.failed) == (0, 1)
+    assert failures == ["bad.txt"]
+    assert sync_directory(str(source), "bbfas-json", str(output)).failed == 1
+
+def test_refuses_to_write_outputs_over_their_sources(workdir, codes):
+    source = workdir / "sources"
+    source.mkdir()
+    bbfas_json = load_converter("bbfas_json")
+    (source / "o0.json").write_text(json.dumps(bbfas_json.bbfas_to_json(codes[0])), encoding="utf-8")
+    before = (source / "o0.json").read_text(encoding="utf-8")
+    for output in (source, workdir):
+        with pytest.raises(ValueError):
+            sync_directory(str(source), "json-cherax", str(output))
+    assert sync_main(["json-cherax", str(source), "-o", str(source)]) == 2
+    assert (source / "o0.json").read_text(encoding="utf-8") == before
+    assert sorted(path.name for path in source.iterdir()) == ["o0.json"]
+
+    # Outputs with another extension cannot overwrite a source
+    (source / "o1.txt").write_text(codes[1], encoding="utf-8")
+    assert sync_directory(str(source), "bbfas-json", str(source)).added == 1
@@ -0,0 +1,29 @@
+import base64
+import json
+
+from modules import load_converter, pipeline
+from modules.outfit import MAX_VALUE
+from modules.validate import check_bbfas_code, check_bbfas_json, check_cherax_json
+
+def encode(payload):
+    return base64.b64encode(payload.encode("utf-8")).decode("ascii")
+
+def test_converted_outfits_are_accepted(codes):
+    bbfas_json = load_converter("bbfas_json")
+    for code in codes:
+        assert check_bbfas_code(code) is None
+        assert check_bbfas_json(bbfas_json.bbfas_to_json(code)) is None
+        assert check_cherax_json(json.dumps(pipeline.bbfas_to_cherax(code))) is None
+
+def test_rejections():
+    assert check_bbfas_code("").code == "empty"
+    assert check_bbfas_code("*not base64*").code == "base64"
+    assert check_bbfas_code(base64.b64encode(b"\xff\xfe").decode("ascii")).code == "utf8"
+    assert check_bbfas_json("{").code == "json"
+    assert check_bbfas_json({"Clothes": {}}).code == "schema"
+    assert check_cherax_json("[]").code == "schema"
+
+def test_value_range():
+    assert check_bbfas_code(encode(f"Item\nDI\npCI1\n{MAX_VALUE}\n/DI\nDT\n/DT\nPi\n/Pi\nPt\n/Pt\n/Item")) is None
+    assert check_bbfas_code(encode(f"Item\nDI\npCI1\n{MAX_VALUE + 1}\n/DI\nDT\n/DT\nPi\n/Pi\nPt\n/Pt\n/Item")).code == "range"
+    assert check_bbfas_json({"Item": {"Clothes": {"Drawable": {"pCI1": -2 ** 31}}}}).code == "range"
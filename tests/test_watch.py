@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import pytest
+
+from modules import load_converter
+from modules.watch import FolderWatcher, output_dirs, scan_tree
+
+def run_until(watcher, condition, timeout=10.0):
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        # Long enough for outputs picked up by mistake to be converted too
+        time.sleep(0.3)
+    finally:
+        watcher.stop()
+        thread.join()
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_outputs_are_not_converted_again(workdir, codes, polling):
+    for number, code in enumerate(codes[:5]):
+        (workdir / f"o{number}.txt").write_text(code, encoding="utf-8")
+    results = []
+    watcher = FolderWatcher(str(workdir), workers=2, polling=polling, existing=True,
+                            on_result=lambda path, output, error, latency: results.append((path, output, error)))
+    run_until(watcher, lambda: len(results) >= 5)
+
+    assert watcher.stats()["converted"] == 5
+    assert watcher.stats()["failed"] == 0
+    assert sorted(os.path.basename(path) for path, _, _ in results) == [f"o{number}.txt" for number in range(5)]
+    output_dir = os.path.abspath(load_converter("bbfas_json").OUTPUT_DIR)
+    assert sorted(os.listdir(output_dir)) == [f"o{number}.json" for number in range(5)]
+
+def test_dropped_file_is_converted(workdir, codes):
+    results = []
+    watcher = FolderWatcher(str(workdir), workers=1, on_result=lambda path, output, error, latency: results.append(output))
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        time.sleep(0.1)
+        (workdir / "dropped.txt").write_text(codes[0], encoding="utf-8")
+        deadline = time.monotonic() + 10
+        while not results and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        watcher.stop()
+        thread.join()
+    assert len(results) == 1
+    with open(results[0], encoding="utf-8") as f:
+        assert f.read() == load_converter("bbfas_json").serialize_bbfas_json(load_converter("bbfas_json").bbfas_to_json(codes[0]))
+
+def test_refuses_a_folder_inside_an_output_folder(workdir):
+    for output_dir in output_dirs():
+        os.makedirs(os.path.join(output_dir, "inbox"), exist_ok=True)
+        with pytest.raises(ValueError):
+            FolderWatcher(os.path.join(output_dir, "inbox"))
+        with pytest.raises(ValueError):
+            FolderWatcher(output_dir)
+
+def test_scan_tree_skips_output_folders(workdir, codes):
+    (workdir / "a.txt").write_text(codes[0], encoding="utf-8")
+    skipped = workdir / "out"
+    skipped.mkdir()
+    (skipped / "b.json").write_text("{}", encoding="utf-8")
+    (workdir / ".hidden.txt").write_text(codes[0], encoding="utf-8")
+    assert [os.path.basename(path) for path in scan_tree(str(workdir), {str(skipped)})] == ["a.txt"]